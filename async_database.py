@@ -0,0 +1,186 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import Database
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabase:
+    """
+    Асинхронная обертка над Database.
+
+    Все публичные методы Database доступны как корутины с теми же аргументами:
+    вызов выполняется в ограниченном пуле потоков, поэтому запросы к SQLite
+    не блокируют цикл событий aiogram.
+
+    В режиме отложенной записи регистрации, отзывы и рейтинги попадают
+    в WriteBehindQueue и записываются пачками.
+    """
+
+    def __init__(self, database: Database, max_workers: Optional[int] = None,
+                 write_behind: bool = False, max_batch_size: int = 500, max_delay: float = 0.05):
+        """
+        Инициализация асинхронной обертки
+
+        :param database: Синхронный объект базы данных
+        :param max_workers: Максимальное количество потоков (по умолчанию - число соединений пула)
+        :param write_behind: Включить отложенную запись
+        :param max_batch_size: Максимальный размер пачки отложенной записи
+        :param max_delay: Максимальная задержка отложенной записи (в секундах)
+        """
+        self.database = database
+        # Один поток на каждое соединение для чтения и один для записи
+        self.max_workers = max_workers or database.pool.readers_count + 1
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db')
+        self.write_queue = WriteBehindQueue(self, max_batch_size, max_delay) if write_behind else None
+        self._write_listeners: List[Callable[[str, Tuple], None]] = []
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Выполнение синхронной функции в пуле потоков базы данных
+
+        :param func: Синхронная функция
+        :return: Результат функции
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def add_write_listener(self, listener: Callable[[str, Tuple], None]) -> None:
+        """
+        Подписка на новые отзывы и рейтинги.
+        Слушатель вызывается в цикле событий с типом записи (feedback или ratings)
+        и ее параметрами после записи в базу данных (в режиме отложенной записи -
+        после записи пачки, в которую она попала).
+
+        :param listener: Функция listener(kind, row)
+        """
+        self._write_listeners.append(listener)
+
+    def notify_write(self, kind: str, row: Tuple) -> None:
+        """
+        Оповещение слушателей о записанном отзыве или рейтинге.
+        Ошибка слушателя не прерывает запись.
+        """
+        for listener in self._write_listeners:
+            try:
+                listener(kind, row)
+            except Exception:
+                logger.exception("Ошибка слушателя записей")
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Получение асинхронной версии метода Database
+
+        :param name: Имя атрибута
+        :return: Корутинная функция или значение атрибута
+        """
+        attr = getattr(self.database, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args: Any, **kwargs: Any) -> Any:
+            return await self.run(attr, *args, **kwargs)
+
+        return method
+
+    async def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Получение продукта; при загруженном каталоге - напрямую из памяти без пула потоков
+        """
+        if self.database.catalog_loaded:
+            return self.database.get_product_by_id(product_id)
+        return await self.run(self.database.get_product_by_id, product_id)
+
+    async def get_products_by_category(self, category: str) -> List[Dict[str, Any]]:
+        """
+        Получение продуктов категории; при загруженном каталоге - напрямую из памяти
+        """
+        if self.database.catalog_loaded:
+            return self.database.get_products_by_category(category)
+        return await self.run(self.database.get_products_by_category, category)
+
+    async def get_products(self) -> List[Dict[str, Any]]:
+        """
+        Получение всех продуктов; при загруженном каталоге - напрямую из памяти
+        """
+        if self.database.catalog_loaded:
+            return self.database.get_products()
+        return await self.run(self.database.get_products)
+
+    async def register_user(self, user_id: int, username: str, first_name: str, last_name: str) -> None:
+        """
+        Регистрация пользователя (в режиме отложенной записи - постановка в очередь).
+        Неизмененные профили недавних пользователей не записываются.
+        """
+        if not self.database.should_register_user(user_id, username, first_name, last_name):
+            return
+        if self.write_queue:
+            self.write_queue.register_user(user_id, username, first_name, last_name)
+            return
+        await self.run(self.database.register_user, user_id, username, first_name, last_name)
+
+    async def add_feedback(self, user_id: int, product_id: int, text: str) -> Optional[int]:
+        """
+        Добавление отзыва
+
+        :return: ID отзыва или None в режиме отложенной записи
+        """
+        if self.write_queue:
+            self.write_queue.add_feedback(user_id, product_id, text)
+            return None
+        feedback_id = await self.run(self.database.add_feedback, user_id, product_id, text)
+        self.notify_write('feedback', (user_id, product_id, text))
+        return feedback_id
+
+    async def add_rating(self, user_id: int, product_id: int, rating: int) -> Optional[int]:
+        """
+        Добавление или обновление рейтинга
+
+        :return: ID рейтинга или None в режиме отложенной записи
+        """
+        if self.write_queue:
+            self.write_queue.add_rating(user_id, product_id, rating)
+            return None
+        rating_id = await self.run(self.database.add_rating, user_id, product_id, rating)
+        self.notify_write('ratings', (user_id, product_id, rating))
+        return rating_id
+
+    async def get_user_rating(self, user_id: int, product_id: int) -> Optional[int]:
+        """
+        Получение рейтинга пользователя с учетом еще не записанных оценок
+        """
+        if self.write_queue:
+            pending = self.write_queue.get_pending_rating(user_id, product_id)
+            if pending is not None:
+                return pending
+        return await self.run(self.database.get_user_rating, user_id, product_id)
+
+    async def get_average_rating(self, product_id: int) -> Optional[float]:
+        """
+        Получение среднего рейтинга продукта.
+        Если в очереди есть рейтинги продукта, сначала дожидаемся их записи.
+        """
+        if self.write_queue:
+            await self.write_queue.wait_for_product(product_id)
+        return await self.run(self.database.get_average_rating, product_id)
+
+    async def flush(self) -> None:
+        """
+        Ожидание записи всех элементов очереди отложенной записи
+        """
+        if self.write_queue:
+            await self.write_queue.flush()
+
+    async def close(self) -> None:
+        """
+        Запись очереди, завершение пула потоков и закрытие соединений с базой данных
+        """
+        if self.write_queue:
+            await self.write_queue.close()
+        await self.run(self.database.close)
+        self._executor.shutdown(wait=True)
\ No newline at end of file
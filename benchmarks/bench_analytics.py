@@ -0,0 +1,178 @@
+# Бенчмарк аналитики /stats на синтетических данных (по умолчанию 5 млн рейтингов).
+#
+# База заполняется через соединение записи пула, поэтому сводные таблицы
+# поддерживаются триггерами так же, как в боте. На заполненной базе замеряются
+# время и пиковая память Python (tracemalloc) расчета данных /stats по сводным
+# таблицам: общая статистика, категории, распределение оценок, топ продуктов
+# и динамика отзывов. Строки отзывов и рейтингов в память не загружаются,
+# поэтому оба показателя не должны зависеть от количества строк.
+#
+# Скрипт завершается с кодом 1, если расчет /stats занимает больше --max-ms
+# миллисекунд или больше --max-peak-kb килобайт памяти.
+#
+# Запуск: python benchmarks/bench_analytics.py [--ratings 5000000] [--db bench.db]
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from leaderboard import Leaderboard
+from sql_analytics import SqlAnalytics
+
+def seed(db: Database, ratings: int, ratings_per_user: int, feedback: int, days: int, seed: int = 1) -> None:
+    """
+    Заполнение базы синтетическими пользователями, рейтингами и отзывами
+
+    :param db: Объект базы данных с созданными таблицами
+    :param ratings: Количество рейтингов
+    :param ratings_per_user: Количество рейтингов на пользователя (не больше числа продуктов)
+    :param feedback: Количество отзывов
+    :param days: Количество последних дней, по которым распределяются даты
+    :param seed: Начальное значение генератора случайных чисел
+    """
+    rnd = random.Random(seed)
+    product_ids = [product['id'] for product in db.get_products()]
+    ratings_per_user = min(ratings_per_user, len(product_ids))
+    users = -(-ratings // ratings_per_user)
+    now = datetime.now()
+
+    def created_at() -> str:
+        return (now - timedelta(seconds=rnd.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    def rating_rows():
+        remaining = ratings
+        for user_id in range(1, users + 1):
+            for product_id in rnd.sample(product_ids, min(ratings_per_user, remaining)):
+                yield user_id, product_id, rnd.randint(1, 5), created_at()
+            remaining -= ratings_per_user
+
+    with db.pool.writer() as conn:
+        conn.executemany(
+            'INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)',
+            ((user_id, f'user{user_id}', 'Имя', None) for user_id in range(1, users + 1))
+        )
+    with db.pool.writer() as conn:
+        conn.executemany('INSERT INTO ratings (user_id, product_id, rating, created_at) VALUES (?, ?, ?, ?)',
+                         rating_rows())
+    with db.pool.writer() as conn:
+        conn.executemany(
+            'INSERT INTO feedback (user_id, product_id, text, created_at) VALUES (?, ?, ?, ?)',
+            ((rnd.randint(1, users), rnd.choice(product_ids), f'Отзыв {number}', created_at())
+             for number in range(feedback))
+        )
+
+def measure(func: Callable[[], Any], repeats: int) -> float:
+    """
+    Медианное время выполнения функции
+
+    :param func: Замеряемая функция
+    :param repeats: Количество повторов
+    :return: Время в миллисекундах
+    """
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def peak_memory(func: Callable[[], Any]) -> float:
+    """
+    Пиковый объем памяти Python, выделенной при выполнении функции
+
+    :param func: Замеряемая функция
+    :return: Пик в килобайтах
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def run(db: Database, args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Замеры на заполненной базе
+
+    :param db: Объект базы данных
+    :param args: Аргументы командной строки
+    :return: Медианное время (мс) и пиковая память (КБ) расчета /stats
+    """
+    sql_analytics = SqlAnalytics(db)
+    stats = sql_analytics.get_general_stats()
+    print(f"Рейтингов: {stats['total_ratings']}, отзывов: {stats['total_feedback']}")
+
+    leaderboard = Leaderboard()
+    trend_since = (datetime.now() - timedelta(days=89)).strftime('%Y-%m-%d')
+
+    def sql_stats():
+        # Данные отчета /stats из сводных таблиц
+        sql_analytics.get_general_stats()
+        sql_analytics.get_category_stats()
+        db.get_rating_counts()
+        leaderboard.load(db)
+        leaderboard.top(db, 5)
+        db.get_daily_activity(trend_since)
+
+    timings = [
+        ('общая статистика', measure(sql_analytics.get_general_stats, args.repeats)),
+        ('статистика категорий', measure(sql_analytics.get_category_stats, args.repeats)),
+        ('распределение рейтингов', measure(db.get_rating_counts, args.repeats)),
+        ('топ продуктов', measure(lambda: (leaderboard.load(db), leaderboard.top(db, 5)), args.repeats)),
+        ('динамика отзывов', measure(lambda: db.get_daily_activity(trend_since), args.repeats)),
+        ('/stats целиком', measure(sql_stats, args.repeats)),
+    ]
+
+    print(f"\n{'мс':>10}  расчет")
+    for name, elapsed in timings:
+        print(f"{elapsed:>10.1f}  {name}")
+
+    peak_kb = peak_memory(sql_stats)
+    print(f"\nПиковая память Python при расчете /stats: {peak_kb:.0f} КБ")
+
+    return {'stats_ms': timings[-1][1], 'peak_kb': peak_kb}
+
+def main() -> int:
+    """
+    Запуск бенчмарка
+
+    :return: Код завершения (0 - расчет /stats укладывается в --max-ms и --max-peak-kb)
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарк времени и памяти аналитики /stats")
+    parser.add_argument('--ratings', type=int, default=5000000, help='Количество рейтингов')
+    parser.add_argument('--ratings-per-user', type=int, default=5, help='Количество рейтингов на пользователя')
+    parser.add_argument('--feedback', type=int, default=1000000, help='Количество отзывов')
+    parser.add_argument('--days', type=int, default=365, help='Период, по которому распределяются даты')
+    parser.add_argument('--repeats', type=int, default=3, help='Количество повторов каждого замера')
+    parser.add_argument('--max-ms', type=float, default=100.0, help='Допустимое время расчета /stats')
+    parser.add_argument('--max-peak-kb', type=float, default=1024.0,
+                        help='Допустимая пиковая память Python при расчете /stats')
+    parser.add_argument('--db', help='Файл базы для повторных запусков (заполняется, если пуст)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(args.db or os.path.join(directory, 'bench.db'))
+        db.create_tables()
+        try:
+            if not SqlAnalytics(db).get_general_stats()['total_ratings']:
+                started = time.perf_counter()
+                seed(db, args.ratings, args.ratings_per_user, args.feedback, args.days)
+                print(f"База заполнена за {time.perf_counter() - started:.0f} с")
+            result = run(db, args)
+        finally:
+            db.close()
+
+    print(f"Допустимо: {args.max_ms} мс, {args.max_peak_kb} КБ")
+    return 0 if result['stats_ms'] <= args.max_ms and result['peak_kb'] <= args.max_peak_kb else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
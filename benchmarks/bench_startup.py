@@ -0,0 +1,112 @@
+# Замер запуска бота: время импорта модулей бота и пиковая память процесса.
+#
+# В отдельном процессе под python -X importtime импортируются main и handlers
+# (main.py импортирует обработчики при запуске бота), после чего скрипт выводит
+# общее время импорта, самые долгие модули и пиковый RSS.
+# matplotlib нужен только процессам отрисовки графиков, поэтому скрипт завершается
+# с кодом 1, если после импорта он оказался в sys.modules.
+#
+# Запуск: python benchmarks/bench_startup.py [--top 10]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться при запуске бота
+FORBIDDEN_MODULES = ('matplotlib',)
+
+# Код, выполняемый в дочернем процессе: импорт бота и отчет о загруженных модулях и памяти
+PROBE = '''
+import json
+import sys
+
+import main
+import handlers
+
+try:
+    import resource
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss измеряется в килобайтах, в macOS - в байтах
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    peak_rss_mb = None
+
+print(json.dumps({
+    'forbidden': [name for name in %r if name in sys.modules],
+    'modules': len(sys.modules),
+    'peak_rss_mb': peak_rss_mb,
+}))
+''' % (FORBIDDEN_MODULES,)
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Разбор вывода -X importtime
+
+    :param output: Содержимое stderr дочернего процесса
+    :return: Список (модуль, собственное время в мкс, суммарное время в мкс)
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # Строка заголовка
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+def run_probe() -> Tuple[Dict[str, Any], List[Tuple[str, int, int]]]:
+    """
+    Импорт модулей бота в отдельном процессе
+
+    :return: Отчет дочернего процесса и времена импорта модулей
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+
+    # Запуск из временного каталога, чтобы импорт ничего не создал рядом с базой бота
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=directory, env=env, capture_output=True, text=True
+        )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Импорт бота завершился с ошибкой:\n{result.stderr[-2000:]}")
+
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def main() -> int:
+    """
+    Запуск замера
+
+    :return: Код завершения (0 - при запуске не загружен matplotlib)
+    """
+    parser = argparse.ArgumentParser(description="Замер времени запуска и памяти бота")
+    parser.add_argument('--top', type=int, default=10, help='Количество самых долгих модулей в отчете')
+    args = parser.parse_args()
+
+    report, modules = run_probe()
+
+    total_ms = sum(cumulative for name, _, cumulative in modules if name in ('main', 'handlers')) / 1000
+    print(f"Импорт main и handlers: {total_ms:.0f} мс, модулей загружено: {report['modules']}")
+    if report['peak_rss_mb'] is not None:
+        print(f"Пиковый RSS: {report['peak_rss_mb']:.1f} МБ")
+
+    print(f"\n{'собств., мс':>12} {'всего, мс':>10}  модуль")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>12.1f} {cumulative_us / 1000:>10.1f}  {name}")
+
+    if report['forbidden']:
+        print(f"\nПри запуске загружены тяжелые модули: {', '.join(report['forbidden'])}")
+        return 1
+
+    print(f"\nМодули {', '.join(FORBIDDEN_MODULES)} при запуске не загружаются")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
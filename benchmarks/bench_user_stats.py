@@ -0,0 +1,123 @@
+# Бенчмарк статистики пользователей: стоимость не должна расти с активностью пользователя.
+#
+# Для одного и того же количества пользователей создаются базы с разным числом
+# отзывов и рейтингов на пользователя, и на каждой замеряются:
+# - прежний запрос с LEFT JOIN users x feedback x ratings и COUNT(DISTINCT);
+# - точный подсчет отдельными индексными подзапросами (count_user_stats);
+# - чтение счетчиков, поддерживаемых триггерами (get_user_stats).
+#
+# Скрипт завершается с кодом 1, если время get_user_stats на самой активной базе
+# больше времени на наименее активной более чем в --max-growth раз.
+#
+# Запуск: python benchmarks/bench_user_stats.py [--users 2000] [--activity 1 4 16 64]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+# Прежний запрос статистики пользователей (до счетчиков)
+OLD_USER_STATS_QUERY = '''
+SELECT COUNT(DISTINCT u.user_id) as total_users,
+       COUNT(DISTINCT f.user_id) as users_with_feedback,
+       COUNT(DISTINCT r.user_id) as users_with_ratings
+FROM users u
+LEFT JOIN feedback f ON u.user_id = f.user_id
+LEFT JOIN ratings r ON u.user_id = r.user_id
+'''
+
+def seed(db: Database, users: int, activity: int) -> None:
+    """
+    Заполнение базы: у каждого пользователя activity отзывов и activity рейтингов
+    (рейтинг - один на продукт, поэтому при необходимости добавляются продукты)
+
+    :param db: Объект базы данных
+    :param users: Количество пользователей
+    :param activity: Количество отзывов и рейтингов на пользователя
+    """
+    for number in range(len(db.get_products()), activity):
+        db.add_product(f'Бенчмарк {number}', 'Другое')
+    product_ids = [product['id'] for product in db.get_products()]
+
+    with db.pool.writer() as conn:
+        conn.executemany(
+            'INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)',
+            ((user_id, f'user{user_id}', 'Имя', None) for user_id in range(1, users + 1))
+        )
+        conn.executemany(
+            'INSERT INTO feedback (user_id, product_id, text) VALUES (?, ?, ?)',
+            ((user_id, product_ids[i % len(product_ids)], 'Отзыв')
+             for user_id in range(1, users + 1) for i in range(activity))
+        )
+        conn.executemany(
+            'INSERT INTO ratings (user_id, product_id, rating) VALUES (?, ?, ?)',
+            ((user_id, product_ids[i], 1 + (user_id + i) % 5)
+             for user_id in range(1, users + 1) for i in range(activity))
+        )
+
+def measure(func, repeats: int) -> float:
+    """
+    Медианное время вызова в миллисекундах
+
+    :param func: Замеряемая функция
+    :param repeats: Количество вызовов
+    :return: Медианное время (в миллисекундах)
+    """
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main() -> int:
+    """
+    Запуск бенчмарка
+
+    :return: Код завершения (0 - время get_user_stats не растет с активностью)
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарк статистики пользователей")
+    parser.add_argument('--users', type=int, default=2000, help='Количество пользователей')
+    parser.add_argument('--activity', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help='Количество отзывов и рейтингов на пользователя')
+    parser.add_argument('--repeats', type=int, default=5, help='Количество повторов каждого замера')
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help='Допустимый рост времени get_user_stats между крайними базами')
+    args = parser.parse_args()
+
+    print(f"{'на польз.':>10} {'JOIN, мс':>12} {'подзапросы, мс':>15} {'счетчики, мс':>13}")
+    counter_timings = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for activity in args.activity:
+            db = Database(os.path.join(directory, f'bench_{activity}.db'))
+            db.create_tables()
+            seed(db, args.users, activity)
+
+            def old_query():
+                with db.pool.reader() as conn:
+                    return dict(conn.execute(OLD_USER_STATS_QUERY).fetchone())
+
+            expected = db.count_user_stats()
+            assert old_query() == expected == db.get_user_stats(), "Статистика пользователей не совпадает"
+
+            old_ms = measure(old_query, max(1, args.repeats // 2))
+            subqueries_ms = measure(db.count_user_stats, args.repeats)
+            counters_ms = measure(db.get_user_stats, args.repeats * 20)
+            counter_timings.append(counters_ms)
+            db.close()
+
+            print(f"{activity:>10} {old_ms:>12.2f} {subqueries_ms:>15.2f} {counters_ms:>13.3f}")
+
+    # Небольшой абсолютный допуск: время чтения одной строки близко к точности замера
+    growth = max(counter_timings[-1], 0.05) / max(counter_timings[0], 0.05)
+    print(f"Рост времени get_user_stats: x{growth:.2f} (допустимо x{args.max_growth})")
+    return 0 if growth <= args.max_growth else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
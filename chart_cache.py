@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ChartCache:
+    """
+    Кэш отрисованных графиков, привязанный к версии данных.
+
+    График хранится по ключу (имя графика, версия данных): пока данные
+    не изменились, повторный /stats отправляет готовую картинку без отрисовки.
+    После первой отправки сохраняется file_id из Telegram, и дальше картинка
+    отправляется по file_id без повторной загрузки байтов.
+    Записи хранятся в памяти (LRU) и, если указан каталог, на диске;
+    на диске хранится только последняя версия каждого графика.
+    """
+
+    def __init__(self, max_entries: int = 16, directory: Optional[str] = None):
+        """
+        Инициализация кэша
+
+        :param max_entries: Максимальное количество графиков в памяти
+        :param directory: Каталог для хранения графиков на диске (None - только память)
+        """
+        self.max_entries = max(1, max_entries)
+        self.directory = directory
+        self._entries: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str, version: str) -> str:
+        """
+        Путь к файлу графика на диске
+        """
+        digest = hashlib.sha1(version.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f'{name}-{digest}')
+
+    def _remove_old_versions(self, name: str, version: str) -> None:
+        """
+        Удаление с диска файлов прежних версий графика
+        """
+        current = os.path.basename(self._path(name, version))
+        pattern = re.compile(re.escape(name) + r'-[0-9a-f]{16}\.(png|file_id)')
+
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return
+
+        for filename in filenames:
+            if pattern.fullmatch(filename) and not filename.startswith(current + '.'):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    logger.warning("Не удалось удалить устаревший график %s", filename)
+
+    def _remember(self, key: Tuple[str, str], entry: Dict[str, Any]) -> None:
+        """
+        Сохранение записи в памяти с вытеснением самых старых
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение графика из кэша
+
+        :param name: Имя графика
+        :param version: Версия данных
+        :return: Словарь с ключами data (PNG) и file_id (или None) либо None, если графика нет
+        """
+        key = (name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if not self.directory:
+            return None
+
+        path = self._path(name, version)
+        try:
+            with open(path + '.png', 'rb') as f:
+                entry = {'data': f.read(), 'file_id': None}
+        except OSError:
+            return None
+
+        try:
+            with open(path + '.file_id', 'r', encoding='utf-8') as f:
+                entry['file_id'] = f.read().strip() or None
+        except OSError:
+            pass
+
+        self._remember(key, entry)
+        return entry
+
+    def put(self, name: str, version: str, data: bytes) -> None:
+        """
+        Сохранение отрисованного графика
+
+        :param name: Имя графика
+        :param version: Версия данных
+        :param data: Изображение в формате PNG
+        """
+        self._remember((name, version), {'data': data, 'file_id': None})
+
+        if self.directory:
+            try:
+                with open(self._path(name, version) + '.png', 'wb') as f:
+                    f.write(data)
+            except OSError:
+                logger.exception("Не удалось сохранить график %s на диск", name)
+            else:
+                # Версия меняется при каждом изменении данных, поэтому прежние версии больше не нужны
+                self._remove_old_versions(name, version)
+
+    def set_file_id(self, name: str, version: str, file_id: str) -> None:
+        """
+        Сохранение file_id, полученного от Telegram после отправки графика
+
+        :param name: Имя графика
+        :param version: Версия данных
+        :param file_id: Идентификатор файла в Telegram
+        """
+        with self._lock:
+            entry = self._entries.get((name, version))
+            if entry is not None:
+                entry['file_id'] = file_id
+
+        if self.directory:
+            try:
+                with open(self._path(name, version) + '.file_id', 'w', encoding='utf-8') as f:
+                    f.write(file_id)
+            except OSError:
+                logger.exception("Не удалось сохранить file_id графика %s", name)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+from chart_worker import render_chart
+
+class ChartRenderer:
+    """
+    Отрисовка графиков в ограниченном пуле процессов.
+
+    Отрисовка не блокирует цикл событий бота, а число одновременных отрисовок
+    ограничено. Если отрисовка не уложилась в таймаут, пул отбрасывается: ожидающие
+    задачи отменяются, рабочие процессы завершаются после текущей отрисовки,
+    а следующая отрисовка запускает новый пул.
+    """
+
+    def __init__(self, max_workers: int = 2, max_concurrent: int = 2, timeout: float = 60.0):
+        """
+        Инициализация пула (процессы запускаются при первой отрисовке)
+
+        :param max_workers: Количество рабочих процессов
+        :param max_concurrent: Максимальное количество одновременных отрисовок
+        :param timeout: Максимальное время ожидания одного графика (в секундах)
+        """
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Получение пула процессов (создается при первом обращении)
+        """
+        if self._executor is None:
+            # spawn: рабочие процессы не наследуют потоки и соединения с базой данных
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Отказ от пула процессов: следующая отрисовка создаст новый пул
+
+        :param executor: Пул процессов
+        """
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, chart: str, **data: Any) -> bytes:
+        """
+        Отрисовка графика в пуле процессов
+
+        :param chart: Имя графика (ratings_chart, feedback_by_time_chart, ...)
+        :param data: Агрегированные данные для графика
+        :return: Изображение в формате PNG
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                future = loop.run_in_executor(executor, render_chart, chart, data)
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                # Долгая отрисовка не занимает место в пуле для следующих графиков
+                self._discard(executor)
+                raise
+            except BrokenProcessPool:
+                # Рабочий процесс аварийно завершился
+                self._discard(executor)
+                raise
+
+    def close(self) -> None:
+        """
+        Остановка рабочих процессов
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
\ No newline at end of file
@@ -0,0 +1,15 @@
+# Точка входа рабочих процессов отрисовки графиков.
+# Процессы запускаются методом spawn и импортируют только этот модуль
+# (и модуль charts при первой отрисовке), а не обработчики бота.
+
+def render_chart(chart: str, data: dict) -> bytes:
+    """
+    Отрисовка графика в рабочем процессе.
+    Модуль charts (и matplotlib) импортируется только в рабочих процессах.
+
+    :param chart: Имя графика (функция render_<имя> из модуля charts)
+    :param data: Аргументы функции отрисовки
+    :return: Изображение в формате PNG
+    """
+    import charts
+    return getattr(charts, f'render_{chart}')(**data)
\ No newline at end of file
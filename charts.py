@@ -0,0 +1,127 @@
+import io
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+# Функции отрисовки графиков.
+# Используется объектный API matplotlib (Figure без pyplot) и бэкенд Agg, поэтому
+# функции не зависят от глобального состояния и могут выполняться в разных процессах.
+# На вход принимаются простые агрегированные данные, которые можно передать между процессами.
+
+def _to_png(fig: Figure) -> bytes:
+    """
+    Сохранение графика в PNG
+
+    :param fig: Объект графика
+    :return: Изображение в формате PNG
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100)
+    return buf.getvalue()
+
+def render_ratings_chart(rating_counts: Dict[int, int]) -> bytes:
+    """
+    Отрисовка графика распределения рейтингов
+
+    :param rating_counts: Количество оценок по значениям рейтинга (1-5)
+    :return: Изображение в формате PNG
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.set_xlabel('Рейтинг')
+    ax.set_ylabel('Количество')
+
+    if not rating_counts:
+        ax.set_title('Нет данных о рейтингах')
+        return _to_png(fig)
+
+    ratings = sorted(rating_counts)
+    bars = ax.bar(ratings, [rating_counts[rating] for rating in ratings], color='skyblue')
+
+    # Добавляем значения над столбцами
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height,
+                f'{int(height)}',
+                ha='center', va='bottom')
+
+    ax.set_title('Распределение рейтингов')
+    ax.set_xticks([1, 2, 3, 4, 5])
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    return _to_png(fig)
+
+def render_feedback_by_time_chart(daily_counts: List[Tuple[str, int]]) -> bytes:
+    """
+    Отрисовка графика количества отзывов по дням
+
+    :param daily_counts: Список пар (дата в формате YYYY-MM-DD, количество отзывов)
+    :return: Изображение в формате PNG
+    """
+    if not daily_counts:
+        fig = Figure(figsize=(10, 6))
+        ax = fig.add_subplot()
+        ax.set_title('Нет данных об отзывах')
+        ax.set_xlabel('Дата')
+        ax.set_ylabel('Количество отзывов')
+        return _to_png(fig)
+
+    dates = [datetime.date.fromisoformat(day) for day, _ in daily_counts]
+    counts = [count for _, count in daily_counts]
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.add_subplot()
+    ax.plot(dates, counts, marker='o', linestyle='-', color='blue')
+
+    ax.set_title('Количество отзывов по дням')
+    ax.set_xlabel('Дата')
+    ax.set_ylabel('Количество отзывов')
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    # Форматируем оси
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    return _to_png(fig)
+
+def render_product_chart(rating_counts: Dict[int, int], weekly: List[Tuple[str, int, Optional[float]]]) -> bytes:
+    """
+    Отрисовка сводного графика продукта: распределение оценок
+    и количество отзывов со средней новой оценкой по неделям
+
+    :param rating_counts: Количество оценок по значениям рейтинга (1-5)
+    :param weekly: Список троек (первый день недели в формате YYYY-MM-DD, количество отзывов,
+                   средняя оценка за неделю или None)
+    :return: Изображение в формате PNG
+    """
+    fig = Figure(figsize=(10, 4))
+    ratings_ax, trend_ax = fig.subplots(1, 2, gridspec_kw={'width_ratios': [1, 2]})
+
+    ratings_ax.bar(list(rating_counts), list(rating_counts.values()), color='skyblue')
+    ratings_ax.set_title('Оценки')
+    ratings_ax.set_xticks([1, 2, 3, 4, 5])
+    ratings_ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    if not weekly:
+        trend_ax.set_title('Нет данных за период')
+    else:
+        weeks = [datetime.date.fromisoformat(week) for week, _, _ in weekly]
+        trend_ax.bar(weeks, [count for _, count, _ in weekly], width=5, color='lightgray', label='Отзывы')
+        trend_ax.set_ylabel('Отзывов за неделю')
+        trend_ax.set_title('Динамика по неделям')
+        trend_ax.tick_params(axis='x', labelrotation=45)
+
+        # Средняя оценка на второй оси (недели без оценок пропускаются)
+        rated = [(week, avg) for week, (_, _, avg) in zip(weeks, weekly) if avg is not None]
+        if rated:
+            rating_ax = trend_ax.twinx()
+            rating_ax.plot([week for week, _ in rated], [avg for _, avg in rated],
+                           marker='o', linestyle='-', color='orange')
+            rating_ax.set_ylim(1, 5)
+            rating_ax.set_ylabel('Средняя оценка')
+
+    fig.tight_layout()
+    return _to_png(fig)
\ No newline at end of file
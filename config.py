@@ -24,4 +24,100 @@ PRODUCT_CATEGORIES = [
     "Доставка",
     "Обслуживание клиентов",
     "Другое"
-]
\ No newline at end of file
+]
+
+# Размер пула соединений для чтения из базы данных
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '4'))
+
+# Время ожидания блокировки базы данных (в секундах)
+DB_TIMEOUT = float(os.getenv('DB_TIMEOUT', '30'))
+
+# Отложенная запись (write-behind): отзывы, рейтинги и регистрации пишутся пачками
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', '0') == '1'
+
+# Максимальный размер пачки отложенной записи
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', '500'))
+
+# Максимальная задержка отложенной записи (в секундах)
+WRITE_BEHIND_MAX_DELAY = float(os.getenv('WRITE_BEHIND_MAX_DELAY', '0.05'))
+
+
+# Максимальное количество отзывов на одной странице /view_feedback
+# (страница заполняется целыми отзывами, пока помещается в одно сообщение)
+FEEDBACK_PAGE_SIZE = int(os.getenv('FEEDBACK_PAGE_SIZE', '5'))
+
+# Максимальная длина текста отзыва: любой отзыв помещается на страницу /view_feedback целиком
+FEEDBACK_MAX_LENGTH = int(os.getenv('FEEDBACK_MAX_LENGTH', '3500'))
+
+# Размер кэша недавно зарегистрированных пользователей (повторные /start не пишут в базу)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+
+# Количество результатов на одной странице /search
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '5'))
+
+# Количество графиков /stats в кэше памяти
+CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '16'))
+
+# Каталог для хранения графиков на диске (пусто - только в памяти)
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', '') or None
+
+# Количество процессов для отрисовки графиков
+CHART_RENDER_WORKERS = int(os.getenv('CHART_RENDER_WORKERS', '2'))
+
+# Максимальное количество одновременно отрисовываемых графиков
+CHART_RENDER_CONCURRENCY = int(os.getenv('CHART_RENDER_CONCURRENCY', '2'))
+
+# Максимальное время отрисовки одного графика (в секундах)
+CHART_RENDER_TIMEOUT = float(os.getenv('CHART_RENDER_TIMEOUT', '60'))
+
+# Количество последних дней на графике динамики отзывов (0 - за все время)
+CHART_TREND_DAYS = int(os.getenv('CHART_TREND_DAYS', '90'))
+
+# Режим аналитики /stats: exact - точные агрегаты, approximate - скетчи (HyperLogLog) для количества пользователей
+# и раздел с распределением оценок по категориям из гистограмм скетчей
+ANALYTICS_MODE = os.getenv('ANALYTICS_MODE', 'exact')
+
+# Период фонового пересчета отчета /stats (в минутах, 0 - пересчет только по запросу).
+# Фоновый пересчет запускается при старте бота, если задан ADMIN_IDS
+STATS_REFRESH_INTERVAL = float(os.getenv('STATS_REFRESH_INTERVAL', '10')) * 60
+
+# Количество новых отзывов и рейтингов, после которого отчет /stats пересчитывается досрочно (0 - только по времени)
+STATS_REFRESH_WRITES = int(os.getenv('STATS_REFRESH_WRITES', '1000'))
+
+# Вес среднего рейтинга всех продуктов в байесовской оценке /top (в количестве оценок)
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv('LEADERBOARD_PRIOR_WEIGHT', '10'))
+
+# Количество продуктов в /top
+TOP_PRODUCTS_LIMIT = int(os.getenv('TOP_PRODUCTS_LIMIT', '10'))
+
+# Количество отзывов, анализируемых (тональность и ключевые слова) за одну транзакцию
+ANALYSIS_BATCH_SIZE = int(os.getenv('ANALYSIS_BATCH_SIZE', '500'))
+
+# Период проверки новых отзывов фоновым анализом (в секундах, 0 - анализ отключен).
+# Новый отзыв запускает анализ сразу, не дожидаясь окончания периода
+ANALYSIS_INTERVAL = float(os.getenv('ANALYSIS_INTERVAL', '60'))
+
+# Количество строк, читаемых из базы данных за один шаг выгрузки /export
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))
+
+# Способ получения обновлений: polling - опрос Telegram, webhook - встроенный сервер вебхука
+DELIVERY_MODE = os.getenv('DELIVERY_MODE', 'polling')
+
+# Публичный HTTPS-адрес, по которому Telegram доступен сервер вебхука (без пути), например https://bot.example.com
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+
+# Путь вебхука
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+
+# Адрес и порт встроенного сервера вебхука
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+
+# Секретный токен вебхука (A-Z, a-z, 0-9, _ и -; пусто - случайный токен при каждом запуске)
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+
+# Максимальное количество одновременно обрабатываемых обновлений в режиме вебхука
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', '32'))
+
+# Максимальное время обработки принятых обновлений при остановке (в секундах)
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '30'))
\ No newline at end of file
@@ -1,127 +1,298 @@
 import sqlite3
 import datetime
-from typing import List, Dict, Tuple, Optional, Any, Union
+import queue
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Optional, Any, Union, Iterator
 
-class Database:
-    def __init__(self, db_name: str):
+from migrations import (
+    ACTIVITY_ROLLUPS, LATEST_VERSION, apply_migrations, get_schema_version,
+    rebuild_activity_rollups, rebuild_rating_stats, rebuild_user_stats
+)
+
+def build_search_query(text: str) -> Optional[str]:
+    """
+    Преобразование пользовательского запроса в запрос FTS5.
+    Каждое слово экранируется и ищется по префиксу, поэтому операторы FTS5
+    во вводе пользователя не интерпретируются, а «батаре» находит «батарея» и «батареи».
+    
+    :param text: Текст запроса
+    :return: Запрос для MATCH или None, если в тексте нет слов
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+class ConnectionPool:
+    """
+    Пул долгоживущих соединений с SQLite: несколько соединений для чтения
+    и одно выделенное соединение для записи.
+    
+    В режиме WAL читатели не блокируют писателя и друг друга, а все записи
+    проходят через одно соединение под блокировкой, поэтому писатели
+    не конкурируют за блокировку файла базы данных.
+    """
+
+    # Настройки, применяемые к каждому соединению
+    PRAGMAS = (
+        'PRAGMA synchronous = NORMAL',
+        'PRAGMA temp_store = MEMORY',
+        'PRAGMA cache_size = -16000',
+        'PRAGMA mmap_size = 268435456',
+    )
+
+    def __init__(self, db_name: str, readers: int = 4, timeout: float = 30.0):
         """
-        Инициализация соединения с базой данных
+        Инициализация пула (соединения открываются при первом обращении)
         
         :param db_name: Имя файла базы данных SQLite
+        :param readers: Количество соединений для чтения
+        :param timeout: Время ожидания блокировки или свободного соединения (в секундах)
         """
         self.db_name = db_name
-        self.conn = None
-        self.cursor = None
+        self.readers_count = max(1, readers)
+        self.timeout = timeout
+        self._readers: Optional[queue.Queue] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._connections: List[sqlite3.Connection] = []
+        self._writer_lock = threading.Lock()
+        self._open_lock = threading.Lock()
 
-    def connect(self) -> None:
+    def _create_connection(self) -> sqlite3.Connection:
         """
-        Установка соединения с базой данных
+        Создание нового соединения с настроенными параметрами
+        
+        :return: Соединение с базой данных
         """
-        self.conn = sqlite3.connect(self.db_name)
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False)
         # Настройка для получения результатов запросов в виде словарей
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {int(self.timeout * 1000)}')
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _ensure_open(self) -> None:
+        """
+        Открытие соединений пула, если они еще не открыты
+        """
+        if self._writer is not None:
+            return
+        
+        with self._open_lock:
+            if self._writer is not None:
+                return
+            
+            writer = self._create_connection()
+            # Режим WAL сохраняется в файле базы, достаточно включить его один раз
+            writer.execute('PRAGMA journal_mode = WAL')
+            
+            readers = queue.Queue(maxsize=self.readers_count)
+            connections = [writer]
+            for _ in range(self.readers_count):
+                conn = self._create_connection()
+                readers.put(conn)
+                connections.append(conn)
+            
+            self._readers = readers
+            self._connections = connections
+            self._writer = writer
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Получение соединения для чтения из пула
+        
+        :return: Соединение для чтения (возвращается в пул после использования)
+        """
+        self._ensure_open()
+        readers = self._readers
+        try:
+            conn = readers.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Нет свободных соединений для чтения")
+        
+        try:
+            yield conn
+        finally:
+            readers.put(conn)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Получение выделенного соединения для записи.
+        Транзакция фиксируется при успешном выходе из блока и откатывается при ошибке.
+        
+        :return: Соединение для записи
+        """
+        self._ensure_open()
+        with self._writer_lock:
+            conn = self._writer
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def close(self) -> None:
+        """
+        Закрытие всех соединений пула
+        """
+        with self._open_lock, self._writer_lock:
+            if self._writer is None:
+                return
+            
+            # Переносим содержимое WAL в основной файл базы данных
+            try:
+                self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            except sqlite3.Error:
+                pass
+            
+            for conn in self._connections:
+                conn.close()
+            
+            self._connections = []
+            self._readers = None
+            self._writer = None
+
+
+class Database:
+    def __init__(self, db_name: str, read_pool_size: int = 4, timeout: float = 30.0,
+                 user_cache_size: int = 10000):
+        """
+        Инициализация базы данных с пулом соединений
+        
+        :param db_name: Имя файла базы данных SQLite
+        :param read_pool_size: Количество соединений для чтения
+        :param timeout: Время ожидания блокировки базы данных (в секундах)
+        :param user_cache_size: Размер LRU-кэша недавно зарегистрированных пользователей
+        """
+        self.db_name = db_name
+        self.pool = ConnectionPool(db_name, read_pool_size, timeout)
+        
+        # Кэш каталога продуктов: каталог меняется редко, поэтому хранится в памяти
+        self._catalog: Optional[Dict[str, Any]] = None
+        self._catalog_lock = threading.Lock()
+        self._catalog_hits = 0
+        self._catalog_misses = 0
+        
+        # LRU-кэш недавно записанных профилей: user_id -> хэш профиля
+        self.user_cache_size = max(1, user_cache_size)
+        self._recent_users: 'OrderedDict[int, int]' = OrderedDict()
+        self._users_lock = threading.Lock()
+        self._registration_stats = {'skipped': 0, 'unchanged': 0, 'written': 0}
 
-    def disconnect(self) -> None:
+    def close(self) -> None:
         """
-        Закрытие соединения с базой данных
+        Закрытие всех соединений с базой данных
         """
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
+        self.pool.close()
 
     def create_tables(self) -> None:
         """
-        Создание необходимых таблиц в базе данных, если они не существуют
-        """
-        self.connect()
-        
-        # Таблица пользователей
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER UNIQUE,
-            username TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Таблица продуктов/услуг
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY,
-            name TEXT UNIQUE,
-            category TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # Предварительное заполнение таблицы продуктов
-        self.cursor.execute('''
-        INSERT OR IGNORE INTO products (name, category) VALUES 
-        ('iPhone 15', 'Смартфоны'),
-        ('Samsung Galaxy S23', 'Смартфоны'),
-        ('MacBook Pro', 'Ноутбуки'),
-        ('Dell XPS 13', 'Ноутбуки'),
-        ('AirPods Pro', 'Наушники'),
-        ('Apple Watch Series 9', 'Умные часы'),
-        ('iPad Pro', 'Планшеты'),
-        ('Доставка курьером', 'Доставка'),
-        ('Техническая поддержка', 'Обслуживание клиентов')
-        ''')
-        
-        # Таблица отзывов
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            product_id INTEGER,
-            text TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (user_id),
-            FOREIGN KEY (product_id) REFERENCES products (id)
-        )
-        ''')
-        
-        # Таблица рейтингов
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ratings (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            product_id INTEGER,
-            rating INTEGER CHECK (rating BETWEEN 1 AND 5),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (user_id),
-            FOREIGN KEY (product_id) REFERENCES products (id),
-            UNIQUE (user_id, product_id)
-        )
-        ''')
-        
-        self.conn.commit()
-        self.disconnect()
+        Приведение схемы базы данных к актуальной версии.
+        Если схема уже актуальна, DDL и заполнение каталога не выполняются.
+        """
+        with self.pool.reader() as conn:
+            if get_schema_version(conn) >= LATEST_VERSION:
+                return
+        
+        with self.pool.writer() as conn:
+            apply_migrations(conn)
+
+    # Вставка пользователя или обновление профиля без удаления строки:
+    # registered_at сохраняется, а неизмененный профиль не перезаписывается
+    UPSERT_USER_QUERY = '''
+    INSERT INTO users (user_id, username, first_name, last_name)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name
+    WHERE username IS NOT excluded.username
+       OR first_name IS NOT excluded.first_name
+       OR last_name IS NOT excluded.last_name
+    '''
+
+    def should_register_user(self, user_id: int, username: str, first_name: str, last_name: str) -> bool:
+        """
+        Проверка, нужно ли записывать профиль пользователя в базу данных.
+        Профили недавно зарегистрированных пользователей хранятся в LRU-кэше.
+        
+        :return: False, если такой же профиль уже записан
+        """
+        profile_hash = hash((username, first_name, last_name))
+        
+        with self._users_lock:
+            if self._recent_users.get(user_id) == profile_hash:
+                self._recent_users.move_to_end(user_id)
+                self._registration_stats['skipped'] += 1
+                return False
+        
+        return True
+
+    def _remember_users(self, users: List[Tuple[int, str, str, str]]) -> None:
+        """
+        Сохранение записанных профилей в LRU-кэше недавних пользователей
+        
+        :param users: Кортежи (user_id, username, first_name, last_name)
+        """
+        with self._users_lock:
+            for user_id, username, first_name, last_name in users:
+                self._recent_users[user_id] = hash((username, first_name, last_name))
+                self._recent_users.move_to_end(user_id)
+            
+            while len(self._recent_users) > self.user_cache_size:
+                self._recent_users.popitem(last=False)
+
+    def _upsert_users(self, conn: sqlite3.Connection, users: List[Tuple[int, str, str, str]]) -> None:
+        """
+        Запись профилей пользователей с подсчетом фактических изменений
+        
+        :param conn: Соединение для записи
+        :param users: Кортежи (user_id, username, first_name, last_name)
+        """
+        written = 0
+        for user in users:
+            written += conn.execute(self.UPSERT_USER_QUERY, user).rowcount
+        
+        with self._users_lock:
+            self._registration_stats['written'] += written
+            self._registration_stats['unchanged'] += len(users) - written
 
     def register_user(self, user_id: int, username: str, first_name: str, last_name: str) -> None:
         """
-        Регистрация нового пользователя или обновление существующего
+        Регистрация нового пользователя или обновление существующего.
+        Запись выполняется, только если профиль изменился.
         
         :param user_id: ID пользователя в Telegram
         :param username: Username пользователя
         :param first_name: Имя пользователя
         :param last_name: Фамилия пользователя
         """
-        self.connect()
+        if not self.should_register_user(user_id, username, first_name, last_name):
+            return
         
-        # Используем INSERT OR REPLACE для обновления существующих пользователей
-        self.cursor.execute('''
-        INSERT OR REPLACE INTO users (user_id, username, first_name, last_name)
-        VALUES (?, ?, ?, ?)
-        ''', (user_id, username, first_name, last_name))
+        user = (user_id, username, first_name, last_name)
+        with self.pool.writer() as conn:
+            self._upsert_users(conn, [user])
         
-        self.conn.commit()
-        self.disconnect()
+        self._remember_users([user])
+
+    def get_registration_stats(self) -> Dict[str, int]:
+        """
+        Получение счетчиков регистрации пользователей
+        
+        :return: Словарь с ключами skipped (пропущено по кэшу), unchanged (профиль не изменился)
+                 и written (записано в базу)
+        """
+        with self._users_lock:
+            return dict(self._registration_stats)
 
     def add_product(self, name: str, category: str) -> int:
         """
@@ -131,20 +302,75 @@ class Database:
         :param category: Категория продукта/услуги
         :return: ID добавленного продукта
         """
-        self.connect()
+        with self.pool.writer() as conn:
+            conn.execute('''
+            INSERT OR IGNORE INTO products (name, category) VALUES (?, ?)
+            ''', (name, category))
+            
+            # Получаем ID добавленного или существующего продукта
+            product_id = conn.execute('SELECT id FROM products WHERE name = ?', (name,)).fetchone()[0]
         
-        self.cursor.execute('''
-        INSERT OR IGNORE INTO products (name, category) VALUES (?, ?)
-        ''', (name, category))
+        # Каталог изменился: кэш будет загружен заново при следующем обращении
+        self.invalidate_catalog()
         
-        # Получаем ID добавленного или существующего продукта
-        self.cursor.execute('SELECT id FROM products WHERE name = ?', (name,))
-        product_id = self.cursor.fetchone()[0]
+        return product_id
+
+    @property
+    def catalog_loaded(self) -> bool:
+        """
+        Загружен ли каталог продуктов в память
+        """
+        return self._catalog is not None
+
+    def invalidate_catalog(self) -> None:
+        """
+        Сброс кэша каталога продуктов
+        """
+        with self._catalog_lock:
+            self._catalog = None
+
+    def _get_catalog(self) -> Dict[str, Any]:
+        """
+        Получение кэша каталога продуктов (с загрузкой из базы при необходимости)
         
-        self.conn.commit()
-        self.disconnect()
+        :return: Словарь с ключами all (все продукты), by_id и by_category
+        """
+        # Счетчики обращений меняются только под блокировкой: += не атомарен между потоками пула
+        with self._catalog_lock:
+            if self._catalog is not None:
+                self._catalog_hits += 1
+                return self._catalog
+            
+            self._catalog_misses += 1
+            with self.pool.reader() as conn:
+                cursor = conn.execute('SELECT id, name, category FROM products ORDER BY category, name')
+                products = [dict(row) for row in cursor.fetchall()]
+            
+            # Продукты уже отсортированы по категории и названию,
+            # поэтому списки по категориям сохраняют порядок ORDER BY name
+            by_category: Dict[str, List[Dict[str, Any]]] = {}
+            for product in products:
+                by_category.setdefault(product['category'], []).append(product)
+            
+            self._catalog = {
+                'all': products,
+                'by_id': {product['id']: product for product in products},
+                'by_category': by_category
+            }
+            return self._catalog
+
+    def get_catalog_stats(self) -> Dict[str, Any]:
+        """
+        Получение счетчиков обращений к кэшу каталога
         
-        return product_id
+        :return: Словарь с ключами hits, misses и loaded
+        """
+        with self._catalog_lock:
+            return {
+                'hits': self._catalog_hits,
+                'misses': self._catalog_misses,
+                'loaded': self._catalog is not None
+            }
 
     def get_products(self) -> List[Dict[str, Any]]:
         """
@@ -152,14 +378,7 @@ class Database:
         
         :return: Список словарей с информацией о продуктах
         """
-        self.connect()
-        
-        self.cursor.execute('SELECT id, name, category FROM products ORDER BY category, name')
-        products = [dict(row) for row in self.cursor.fetchall()]
-        
-        self.disconnect()
-        
-        return products
+        return [dict(product) for product in self._get_catalog()['all']]
 
     def get_products_by_category(self, category: str) -> List[Dict[str, Any]]:
         """
@@ -168,20 +387,8 @@ class Database:
         :param category: Категория продуктов/услуг
         :return: Список словарей с информацией о продуктах
         """
-        self.connect()
-        
-        self.cursor.execute('''
-        SELECT id, name, category 
-        FROM products 
-        WHERE category = ? 
-        ORDER BY name
-        ''', (category,))
-        
-        products = [dict(row) for row in self.cursor.fetchall()]
-        
-        self.disconnect()
-        
-        return products
+        products = self._get_catalog()['by_category'].get(category, [])
+        return [dict(product) for product in products]
 
     def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -190,13 +397,7 @@ class Database:
         :param product_id: ID продукта
         :return: Словарь с информацией о продукте или None, если продукт не найден
         """
-        self.connect()
-        
-        self.cursor.execute('SELECT id, name, category FROM products WHERE id = ?', (product_id,))
-        product = self.cursor.fetchone()
-        
-        self.disconnect()
-        
+        product = self._get_catalog()['by_id'].get(product_id)
         return dict(product) if product else None
 
     def add_feedback(self, user_id: int, product_id: int, text: str) -> int:
@@ -208,47 +409,79 @@ class Database:
         :param text: Текст отзыва
         :return: ID добавленного отзыва
         """
-        self.connect()
-        
-        self.cursor.execute('''
-        INSERT INTO feedback (user_id, product_id, text) VALUES (?, ?, ?)
-        ''', (user_id, product_id, text))
-        
-        feedback_id = self.cursor.lastrowid
-        
-        self.conn.commit()
-        self.disconnect()
+        with self.pool.writer() as conn:
+            cursor = conn.execute('''
+            INSERT INTO feedback (user_id, product_id, text) VALUES (?, ?, ?)
+            ''', (user_id, product_id, text))
+            
+            feedback_id = cursor.lastrowid
         
         return feedback_id
 
-    def get_feedback_by_product(self, product_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_feedback_page(self, product_id: int, before: Optional[Tuple[str, int]] = None,
+                          after: Optional[Tuple[str, int]] = None, limit: int = 5) -> Dict[str, Any]:
         """
-        Получение отзывов о конкретном продукте
+        Получение страницы отзывов о продукте с курсорной пагинацией по (created_at, id).
+        Стоимость запроса не зависит от номера страницы: выборка начинается
+        с позиции курсора в индексе feedback(product_id, created_at).
         
         :param product_id: ID продукта
-        :param limit: Ограничение на количество отзывов
-        :return: Список словарей с информацией об отзывах
+        :param before: Курсор (created_at, id): вернуть более старые отзывы
+        :param after: Курсор (created_at, id): вернуть более новые отзывы
+        :param limit: Количество отзывов на странице
+        :return: Словарь с ключами items (от новых к старым), older и newer (курсоры соседних страниц или None)
         """
-        self.connect()
-        
-        # Получаем отзывы с информацией о пользователях
-        self.cursor.execute('''
+        query = '''
         SELECT f.id, f.text, f.created_at, 
                u.user_id, u.username, u.first_name, u.last_name,
                p.name as product_name
         FROM feedback f
         JOIN users u ON f.user_id = u.user_id
         JOIN products p ON f.product_id = p.id
-        WHERE f.product_id = ?
-        ORDER BY f.created_at DESC
+        WHERE f.product_id = ? {condition}
+        ORDER BY f.created_at {order}, f.id {order}
         LIMIT ?
-        ''', (product_id, limit))
+        '''
+        
+        if after is not None:
+            sql = query.format(condition='AND (f.created_at, f.id) > (?, ?)', order='ASC')
+            params = (product_id, after[0], after[1], limit + 1)
+        elif before is not None:
+            sql = query.format(condition='AND (f.created_at, f.id) < (?, ?)', order='DESC')
+            params = (product_id, before[0], before[1], limit + 1)
+        else:
+            sql = query.format(condition='', order='DESC')
+            params = (product_id, limit + 1)
+        
+        with self.pool.reader() as conn:
+            rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
         
-        feedback_list = [dict(row) for row in self.cursor.fetchall()]
+        # Лишняя строка показывает, есть ли еще отзывы в направлении выборки
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        self.disconnect()
+        if after is not None:
+            rows.reverse()
+            has_newer, has_older = has_more, True
+        else:
+            has_newer, has_older = before is not None, has_more
         
-        return feedback_list
+        return {
+            'items': rows,
+            'older': (rows[-1]['created_at'], rows[-1]['id']) if rows and has_older else None,
+            'newer': (rows[0]['created_at'], rows[0]['id']) if rows and has_newer else None
+        }
+
+    # Вставка рейтинга или изменение оценки пользователя без удаления строки.
+    # В отличие от INSERT OR REPLACE, изменение вызывает триггеры UPDATE,
+    # поэтому агрегаты остаются верными при записи из любого соединения
+    UPSERT_RATING_QUERY = '''
+    INSERT INTO ratings (user_id, product_id, rating)
+    VALUES (?, ?, ?)
+    ON CONFLICT (user_id, product_id) DO UPDATE SET
+        rating = excluded.rating,
+        created_at = CURRENT_TIMESTAMP
+    '''
 
     def add_rating(self, user_id: int, product_id: int, rating: int) -> int:
         """
@@ -257,20 +490,12 @@ class Database:
         :param user_id: ID пользователя
         :param product_id: ID продукта
         :param rating: Оценка от 1 до 5
-        :return: ID добавленного рейтинга
+        :return: ID рейтинга
         """
-        self.connect()
-        
-        # Используем INSERT OR REPLACE для обновления существующих рейтингов
-        self.cursor.execute('''
-        INSERT OR REPLACE INTO ratings (user_id, product_id, rating)
-        VALUES (?, ?, ?)
-        ''', (user_id, product_id, rating))
-        
-        rating_id = self.cursor.lastrowid
-        
-        self.conn.commit()
-        self.disconnect()
+        with self.pool.writer() as conn:
+            # Существующий рейтинг обновляется на месте: агрегаты поддерживают триггеры на изменение
+            rating_id = conn.execute(self.UPSERT_RATING_QUERY + ' RETURNING id',
+                                     (user_id, product_id, rating)).fetchone()[0]
         
         return rating_id
 
@@ -281,20 +506,59 @@ class Database:
         :param product_id: ID продукта
         :return: Средний рейтинг или None, если рейтингов нет
         """
-        self.connect()
+        with self.pool.reader() as conn:
+            # Агрегат поддерживается триггерами, поэтому чтение не зависит от числа рейтингов
+            result = conn.execute('''
+            SELECT ratings_sum, ratings_count
+            FROM product_rating_stats
+            WHERE product_id = ?
+            ''', (product_id,)).fetchone()
         
-        self.cursor.execute('''
-        SELECT AVG(rating) as avg_rating
-        FROM ratings
-        WHERE product_id = ?
-        ''', (product_id,))
+        if not result or not result['ratings_count']:
+            return None
         
-        result = self.cursor.fetchone()
-        avg_rating = result['avg_rating'] if result and result['avg_rating'] is not None else None
+        return round(result['ratings_sum'] / result['ratings_count'], 1)
+
+    def rebuild_rating_stats(self) -> None:
+        """
+        Полный пересчет агрегатов рейтингов по таблице ratings
+        """
+        with self.pool.writer() as conn:
+            rebuild_rating_stats(conn)
+
+    def verify_rating_stats(self) -> List[Dict[str, Any]]:
+        """
+        Сверка агрегатов рейтингов с исходными строками таблицы ratings
+        
+        :return: Список расхождений (пустой, если агрегаты корректны)
+        """
+        columns = ('ratings_count', 'ratings_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+        
+        with self.pool.reader() as conn:
+            expected = {row['product_id']: tuple(row)[1:] for row in conn.execute('''
+            SELECT product_id, COUNT(*), SUM(rating),
+                   SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+            FROM ratings
+            GROUP BY product_id
+            ''')}
+            
+            actual = {row['product_id']: tuple(row)[1:] for row in conn.execute(f'''
+            SELECT product_id, {', '.join(columns)}
+            FROM product_rating_stats
+            WHERE ratings_count != 0
+            ''')}
         
-        self.disconnect()
+        mismatches = []
+        for product_id in sorted(set(expected) | set(actual)):
+            empty = (0,) * len(columns)
+            if expected.get(product_id, empty) != actual.get(product_id, empty):
+                mismatches.append({
+                    'product_id': product_id,
+                    'expected': dict(zip(columns, expected.get(product_id, empty))),
+                    'actual': dict(zip(columns, actual.get(product_id, empty)))
+                })
         
-        return round(avg_rating, 1) if avg_rating is not None else None
+        return mismatches
 
     def get_user_rating(self, user_id: int, product_id: int) -> Optional[int]:
         """
@@ -304,82 +568,676 @@ class Database:
         :param product_id: ID продукта
         :return: Рейтинг или None, если рейтинг не найден
         """
-        self.connect()
+        with self.pool.reader() as conn:
+            result = conn.execute('''
+            SELECT rating
+            FROM ratings
+            WHERE user_id = ? AND product_id = ?
+            ''', (user_id, product_id)).fetchone()
         
-        self.cursor.execute('''
-        SELECT rating
-        FROM ratings
-        WHERE user_id = ? AND product_id = ?
-        ''', (user_id, product_id))
+        return result['rating'] if result else None
+
+    def search_feedback(self, query: str, product_id: Optional[int] = None, category: Optional[str] = None,
+                        limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """
+        Полнотекстовый поиск по отзывам с ранжированием по релевантности (bm25)
         
-        result = self.cursor.fetchone()
+        :param query: Текст запроса (все слова должны встретиться в отзыве)
+        :param product_id: Искать только в отзывах о продукте
+        :param category: Искать только в отзывах о продуктах категории
+        :param limit: Количество результатов на странице
+        :param offset: Смещение страницы
+        :return: Словарь с ключами items (найденные отзывы с фрагментом snippet) и has_more
+        """
+        match = build_search_query(query)
+        if match is None:
+            return {'items': [], 'has_more': False}
         
-        self.disconnect()
+        conditions = ['feedback_fts MATCH ?']
+        params: List[Any] = [match]
         
-        return result['rating'] if result else None
-    
-    def get_all_feedback_and_ratings(self) -> Dict[str, Any]:
+        if product_id is not None:
+            conditions.append('f.product_id = ?')
+            params.append(product_id)
+        
+        if category is not None:
+            conditions.append('p.category = ?')
+            params.append(category)
+        
+        params.extend([limit + 1, offset])
+        
+        with self.pool.reader() as conn:
+            cursor = conn.execute(f'''
+            SELECT f.id, f.text, f.created_at,
+                   snippet(feedback_fts, 0, '«', '»', '…', 16) as snippet,
+                   u.user_id, u.username, u.first_name, u.last_name,
+                   p.id as product_id, p.name as product_name, p.category
+            FROM feedback_fts
+            JOIN feedback f ON f.id = feedback_fts.rowid
+            JOIN products p ON f.product_id = p.id
+            LEFT JOIN users u ON f.user_id = u.user_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY feedback_fts.rank
+            LIMIT ? OFFSET ?
+            ''', params)
+            
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        return {'items': rows[:limit], 'has_more': len(rows) > limit}
+
+    def apply_write_batch(self, users: List[Tuple[int, str, str, str]],
+                          feedback: List[Tuple[int, int, str]],
+                          ratings: List[Tuple[int, int, int]]) -> None:
+        """
+        Запись накопленной пачки пользователей, отзывов и рейтингов одной транзакцией
+
+        :param users: Кортежи (user_id, username, first_name, last_name)
+        :param feedback: Кортежи (user_id, product_id, text)
+        :param ratings: Кортежи (user_id, product_id, rating)
         """
-        Получение всех отзывов и рейтингов для аналитики
+        with self.pool.writer() as conn:
+            # Пользователей записываем первыми, чтобы их отзывы сразу были видны в выборках с JOIN
+            if users:
+                self._upsert_users(conn, users)
+
+            if feedback:
+                conn.executemany('''
+                INSERT INTO feedback (user_id, product_id, text) VALUES (?, ?, ?)
+                ''', feedback)
+
+            if ratings:
+                conn.executemany(self.UPSERT_RATING_QUERY, ratings)
         
-        :return: Словарь с данными для анализа
+        if users:
+            self._remember_users(users)
+
+    # Выборки строк для аналитики и выгрузки (без сортировки и курсора)
+    FEEDBACK_ROWS_QUERY = '''
+    SELECT f.id, f.text, f.created_at, 
+           u.user_id, u.username, u.first_name, u.last_name,
+           p.id as product_id, p.name as product_name, p.category
+    FROM feedback f
+    JOIN users u ON f.user_id = u.user_id
+    JOIN products p ON f.product_id = p.id
+    '''
+
+    RATINGS_ROWS_QUERY = '''
+    SELECT r.id, r.rating, r.created_at,
+           u.user_id, u.username, u.first_name, u.last_name,
+           p.id as product_id, p.name as product_name, p.category
+    FROM ratings r
+    JOIN users u ON r.user_id = u.user_id
+    JOIN products p ON r.product_id = p.id
+    '''
+
+    # Оценки в порядке добавления или последнего изменения (для скетчей).
+    # change_id присваивается триггерами и растет при каждой записи оценки
+    RATING_CHANGES_QUERY = '''
+    SELECT r.change_id, r.rating, r.created_at, u.user_id, r.product_id
+    FROM ratings r
+    JOIN users u ON r.user_id = u.user_id
+    '''
+
+    def get_user_stats(self) -> Dict[str, int]:
         """
-        self.connect()
+        Получение статистики по пользователям
         
-        # Получаем все отзывы
-        self.cursor.execute('''
-        SELECT f.id, f.text, f.created_at, 
-               u.user_id, u.username, u.first_name, u.last_name,
-               p.id as product_id, p.name as product_name, p.category
-        FROM feedback f
-        JOIN users u ON f.user_id = u.user_id
-        JOIN products p ON f.product_id = p.id
-        ORDER BY f.created_at DESC
-        ''')
+        :return: Словарь с ключами total_users, users_with_feedback и users_with_ratings
+        """
+        with self.pool.reader() as conn:
+            # Счетчики поддерживаются триггерами при записи пользователей, отзывов и рейтингов
+            row = conn.execute('''
+            SELECT total_users, users_with_feedback, users_with_ratings
+            FROM user_activity_stats
+            WHERE id = 1
+            ''').fetchone()
         
-        feedback_list = [dict(row) for row in self.cursor.fetchall()]
+        if not row:
+            return {'total_users': 0, 'users_with_feedback': 0, 'users_with_ratings': 0}
         
-        # Получаем все рейтинги
-        self.cursor.execute('''
-        SELECT r.id, r.rating, r.created_at,
-               u.user_id, u.username, u.first_name, u.last_name,
-               p.id as product_id, p.name as product_name, p.category
-        FROM ratings r
-        JOIN users u ON r.user_id = u.user_id
-        JOIN products p ON r.product_id = p.id
-        ORDER BY r.created_at DESC
-        ''')
-        
-        ratings_list = [dict(row) for row in self.cursor.fetchall()]
-        
-        # Получаем средние рейтинги по продуктам
-        self.cursor.execute('''
-        SELECT p.id, p.name, p.category, AVG(r.rating) as avg_rating, COUNT(r.id) as ratings_count
-        FROM products p
-        LEFT JOIN ratings r ON p.id = r.product_id
-        GROUP BY p.id
-        ORDER BY avg_rating DESC
-        ''')
-        
-        products_ratings = [dict(row) for row in self.cursor.fetchall()]
-        
-        # Получаем статистику по пользователям
-        self.cursor.execute('''
-        SELECT COUNT(DISTINCT u.user_id) as total_users,
-               COUNT(DISTINCT f.user_id) as users_with_feedback,
-               COUNT(DISTINCT r.user_id) as users_with_ratings
-        FROM users u
-        LEFT JOIN feedback f ON u.user_id = f.user_id
-        LEFT JOIN ratings r ON u.user_id = r.user_id
-        ''')
-        
-        user_stats = dict(self.cursor.fetchone())
-        
-        self.disconnect()
+        return dict(row)
+
+    def rebuild_user_stats(self) -> None:
+        """
+        Полный пересчет счетчиков активности пользователей
+        """
+        with self.pool.writer() as conn:
+            rebuild_user_stats(conn)
+
+    def count_user_stats(self) -> Dict[str, int]:
+        """
+        Точный подсчет статистики пользователей по исходным таблицам (без счетчиков)
+        
+        :return: Словарь с ключами total_users, users_with_feedback и users_with_ratings
+        """
+        with self.pool.reader() as conn:
+            return dict(conn.execute('''
+            SELECT (SELECT COUNT(*) FROM users) as total_users,
+                   (SELECT COUNT(*) FROM users u
+                    WHERE EXISTS (SELECT 1 FROM feedback f WHERE f.user_id = u.user_id)) as users_with_feedback,
+                   (SELECT COUNT(*) FROM users u
+                    WHERE EXISTS (SELECT 1 FROM ratings r WHERE r.user_id = u.user_id)) as users_with_ratings
+            ''').fetchone())
+
+    def verify_user_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Сверка счетчиков активности пользователей с исходными таблицами
+        
+        :return: Словарь с ключами expected и actual при расхождении или None
+        """
+        expected = self.count_user_stats()
+        actual = self.get_user_stats()
+        
+        return None if expected == actual else {'expected': expected, 'actual': actual}
+
+    def get_activity_totals(self, since: str) -> Dict[str, Any]:
+        """
+        Получение итоговых количеств отзывов и рейтингов из сводных таблиц.
+        Период складывается из полных часовых интервалов и строк первого,
+        неполного часа, поэтому результат точный.
+        
+        :param since: Начало периода в формате 'YYYY-MM-DD HH:MM:SS' для статистики за период
+        :return: Словарь с ключами total_feedback, total_ratings, ratings_sum,
+                 feedback_since, ratings_since и ratings_sum_since
+        """
+        next_hour = (datetime.datetime.strptime(since[:13], '%Y-%m-%d %H')
+                     + datetime.timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        with self.pool.reader() as conn:
+            row = conn.execute('''
+            SELECT (SELECT COALESCE(SUM(feedback_count), 0) FROM activity_daily) as total_feedback,
+                   (SELECT COALESCE(SUM(ratings_count), 0) FROM product_rating_stats) as total_ratings,
+                   (SELECT COALESCE(SUM(ratings_sum), 0) FROM product_rating_stats) as ratings_sum
+            ''').fetchone()
+            
+            hours = conn.execute('''
+            SELECT COALESCE(SUM(feedback_count), 0), COALESCE(SUM(ratings_count), 0), COALESCE(SUM(ratings_sum), 0)
+            FROM activity_hourly
+            WHERE bucket >= ?
+            ''', (next_hour,)).fetchone()
+            
+            # Строки неполного первого часа читаем по индексам created_at
+            partial = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM feedback WHERE created_at > ? AND created_at < ?),
+                   (SELECT COUNT(*) FROM ratings WHERE created_at > ? AND created_at < ?),
+                   (SELECT COALESCE(SUM(rating), 0) FROM ratings WHERE created_at > ? AND created_at < ?)
+            ''', (since, next_hour) * 3).fetchone()
+        
+        return {
+            'total_feedback': row['total_feedback'],
+            'total_ratings': row['total_ratings'],
+            'ratings_sum': row['ratings_sum'],
+            'feedback_since': hours[0] + partial[0],
+            'ratings_since': hours[1] + partial[1],
+            'ratings_sum_since': hours[2] + partial[2]
+        }
+
+    def get_daily_activity(self, since: Optional[str] = None,
+                           product_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Получение количества отзывов и рейтингов по дням из посуточной сводной таблицы
+        
+        :param since: Первый день периода в формате 'YYYY-MM-DD' (None - все дни)
+        :param product_id: ID продукта (None - все продукты)
+        :return: Список словарей с ключами day, feedback_count, ratings_count и ratings_sum
+        """
+        conditions = []
+        params: List[Any] = []
+        if since is not None:
+            conditions.append('bucket >= ?')
+            params.append(since)
+        if product_id is not None:
+            conditions.append('product_id = ?')
+            params.append(product_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        with self.pool.reader() as conn:
+            cursor = conn.execute(f'''
+            SELECT bucket as day, SUM(feedback_count) as feedback_count,
+                   SUM(ratings_count) as ratings_count, SUM(ratings_sum) as ratings_sum
+            FROM activity_daily
+            {where}
+            GROUP BY bucket
+            HAVING SUM(feedback_count) != 0 OR SUM(ratings_count) != 0
+            ORDER BY bucket
+            ''', params)
+            
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_product_stats(self, product_id: int) -> Dict[str, Any]:
+        """
+        Получение итогов по продукту из агрегатов: распределение оценок,
+        количество отзывов и тональность отзывов.
+        Все запросы читают агрегаты по ключу продукта и не зависят от числа отзывов и оценок.
+        
+        :param product_id: ID продукта
+        :return: Словарь с ключами ratings_count, ratings_sum, rating_counts (оценка -> количество),
+                 feedback_count, analyzed_count, positive_count, negative_count и avg_sentiment
+        """
+        with self.pool.reader() as conn:
+            ratings = conn.execute('''
+            SELECT ratings_count, ratings_sum, rating_1, rating_2, rating_3, rating_4, rating_5
+            FROM product_rating_stats
+            WHERE product_id = ?
+            ''', (product_id,)).fetchone()
+            
+            feedback_count = conn.execute(
+                'SELECT COALESCE(SUM(feedback_count), 0) FROM activity_daily WHERE product_id = ?',
+                (product_id,)
+            ).fetchone()[0]
+            
+            sentiment = conn.execute('''
+            SELECT analyzed_count, positive_count, negative_count, sentiment_sum
+            FROM product_sentiment_stats
+            WHERE product_id = ?
+            ''', (product_id,)).fetchone()
+        
+        analyzed_count = sentiment['analyzed_count'] if sentiment else 0
         
         return {
-            'feedback': feedback_list,
-            'ratings': ratings_list,
-            'products_ratings': products_ratings,
-            'user_stats': user_stats
-        }
\ No newline at end of file
+            'ratings_count': ratings['ratings_count'] if ratings else 0,
+            'ratings_sum': ratings['ratings_sum'] if ratings else 0,
+            'rating_counts': {rating: ratings[f'rating_{rating}'] if ratings else 0 for rating in range(1, 6)},
+            'feedback_count': feedback_count,
+            'analyzed_count': analyzed_count,
+            'positive_count': sentiment['positive_count'] if sentiment else 0,
+            'negative_count': sentiment['negative_count'] if sentiment else 0,
+            'avg_sentiment': sentiment['sentiment_sum'] / analyzed_count if analyzed_count else None
+        }
+
+    def rebuild_activity_rollups(self) -> None:
+        """
+        Полный пересчет почасовых и посуточных сводных таблиц
+        """
+        with self.pool.writer() as conn:
+            rebuild_activity_rollups(conn)
+
+    def verify_activity_rollups(self) -> List[Dict[str, Any]]:
+        """
+        Сверка сводных таблиц с исходными строками отзывов и рейтингов
+        
+        :return: Список расхождений (пустой, если сводные таблицы корректны)
+        """
+        columns = ('feedback_count', 'ratings_count', 'ratings_sum')
+        mismatches = []
+        
+        with self.pool.reader() as conn:
+            for table, bucket in ACTIVITY_ROLLUPS:
+                expression = bucket.format(created_at='created_at')
+                expected = {(row[0], row[1]): tuple(row)[2:] for row in conn.execute(f'''
+                SELECT bucket, product_id, SUM(feedback_count), SUM(ratings_count), SUM(ratings_sum)
+                FROM (
+                    SELECT {expression} as bucket, product_id,
+                           COUNT(*) as feedback_count, 0 as ratings_count, 0 as ratings_sum
+                    FROM feedback
+                    GROUP BY 1, 2
+                    UNION ALL
+                    SELECT {expression}, product_id, 0, COUNT(*), SUM(rating)
+                    FROM ratings
+                    GROUP BY 1, 2
+                )
+                GROUP BY bucket, product_id
+                ''')}
+                
+                actual = {(row[0], row[1]): tuple(row)[2:] for row in conn.execute(f'''
+                SELECT bucket, product_id, {', '.join(columns)}
+                FROM {table}
+                WHERE feedback_count != 0 OR ratings_count != 0
+                ''')}
+                
+                empty = (0,) * len(columns)
+                for key in sorted(set(expected) | set(actual)):
+                    if expected.get(key, empty) != actual.get(key, empty):
+                        mismatches.append({
+                            'table': table,
+                            'bucket': key[0],
+                            'product_id': key[1],
+                            'expected': dict(zip(columns, expected.get(key, empty))),
+                            'actual': dict(zip(columns, actual.get(key, empty)))
+                        })
+        
+        return mismatches
+
+    def get_sketch_cursor(self, source: str) -> Optional[int]:
+        """
+        Получение курсора строк, уже учтенных в скетчах
+        
+        :param source: Источник (feedback или ratings)
+        :return: Ключ последней учтенной строки (ID отзыва или change_id оценки)
+                 или None, если скетчи еще не строились
+        """
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT last_id FROM sketch_cursors WHERE source = ?', (source,)).fetchone()
+        
+        return row['last_id'] if row else None
+
+    def get_sketches(self, metric: str, since: Optional[str] = None,
+                     buckets: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Получение суточных скетчей
+        
+        :param metric: Метрика скетча
+        :param since: Первый день периода в формате 'YYYY-MM-DD' (None - все дни)
+        :param buckets: Список дней (None - без ограничения)
+        :return: Список словарей с ключами bucket, product_id и data
+        """
+        query = 'SELECT bucket, product_id, data FROM daily_sketches WHERE metric = ?'
+        params: List[Any] = [metric]
+        if since is not None:
+            query += ' AND bucket >= ?'
+            params.append(since)
+        if buckets is not None:
+            query += f" AND bucket IN ({', '.join('?' * len(buckets))})"
+            params.extend(buckets)
+        
+        with self.pool.reader() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def save_sketches(self, source: str, last_id: int,
+                      sketches: List[Tuple[str, str, int, bytes]]) -> None:
+        """
+        Сохранение скетчей и курсора источника в одной транзакции
+        
+        :param source: Источник (feedback или ratings)
+        :param last_id: Ключ последней учтенной строки (ID отзыва или change_id оценки)
+        :param sketches: Список скетчей (метрика, день, ID продукта, данные)
+        """
+        with self.pool.writer() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO daily_sketches (metric, bucket, product_id, data) VALUES (?, ?, ?, ?)',
+                sketches
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO sketch_cursors (source, last_id) VALUES (?, ?)',
+                (source, last_id)
+            )
+
+    def reset_sketches(self) -> None:
+        """
+        Удаление всех скетчей: следующее обновление построит их заново
+        """
+        with self.pool.writer() as conn:
+            conn.execute('DELETE FROM daily_sketches')
+            conn.execute('DELETE FROM sketch_cursors')
+
+    def get_rating_totals(self, product_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Получение количества и суммы оценок продуктов из агрегатов
+        
+        :param product_ids: Список ID продуктов (None - все продукты с оценками)
+        :return: Список словарей с ключами product_id, ratings_count и ratings_sum
+        """
+        query = 'SELECT product_id, ratings_count, ratings_sum FROM product_rating_stats'
+        params: List[Any] = []
+        if product_ids is not None:
+            query += f" WHERE product_id IN ({', '.join('?' * len(product_ids))})"
+            params = list(product_ids)
+        
+        with self.pool.reader() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_worker_cursor(self, name: str) -> int:
+        """
+        Получение курсора фонового обработчика
+        
+        :param name: Имя обработчика
+        :return: ID последней обработанной строки (0, если обработки еще не было)
+        """
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT last_id FROM worker_cursors WHERE name = ?', (name,)).fetchone()
+        
+        return row['last_id'] if row else 0
+
+    def get_feedback_after(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Получение отзывов с ID больше указанного (в порядке ID)
+        
+        :param after_id: ID последнего обработанного отзыва
+        :param limit: Максимальное количество отзывов
+        :return: Список словарей с ключами id, product_id, text и created_at
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute('''
+            SELECT id, product_id, text, created_at
+            FROM feedback
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            ''', (after_id, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+
+    def save_feedback_analysis(self, name: str, last_id: int, results: List[Dict[str, Any]]) -> None:
+        """
+        Сохранение результатов анализа отзывов и курсора обработчика в одной транзакции.
+        Агрегаты по продуктам, дням и ключевым словам обновляются триггерами.
+        
+        :param name: Имя обработчика
+        :param last_id: ID последнего обработанного отзыва
+        :param results: Список словарей с ключами feedback_id, product_id, created_at,
+                        sentiment, label и keywords
+        """
+        with self.pool.writer() as conn:
+            conn.executemany('''
+            INSERT OR IGNORE INTO feedback_analysis (feedback_id, product_id, bucket, sentiment, label)
+            VALUES (?, ?, date(?), ?, ?)
+            ''', [(result['feedback_id'], result['product_id'], result['created_at'],
+                   result['sentiment'], result['label']) for result in results])
+            
+            conn.executemany('''
+            INSERT OR IGNORE INTO feedback_keywords (feedback_id, product_id, keyword, negative)
+            VALUES (?, ?, ?, ?)
+            ''', [(result['feedback_id'], result['product_id'], keyword, int(result['label'] < 0))
+                  for result in results for keyword in result['keywords']])
+            
+            conn.execute(
+                'INSERT OR REPLACE INTO worker_cursors (name, last_id) VALUES (?, ?)', (name, last_id)
+            )
+
+    def get_sentiment_summary(self, since: Optional[str] = None,
+                              until: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Получение итогов тональности отзывов из агрегатов
+        
+        :param since: Первый день периода в формате 'YYYY-MM-DD' (None - за все время)
+        :param until: День после окончания периода в формате 'YYYY-MM-DD' (None - по сегодняшний день)
+        :return: Словарь с ключами analyzed_count, positive_count, negative_count и avg_sentiment
+        """
+        if since is None and until is None:
+            query = 'SELECT SUM(analyzed_count), SUM(positive_count), SUM(negative_count), SUM(sentiment_sum) ' \
+                    'FROM product_sentiment_stats'
+            params: Tuple = ()
+        else:
+            query = 'SELECT SUM(analyzed_count), SUM(positive_count), SUM(negative_count), SUM(sentiment_sum) ' \
+                    'FROM sentiment_daily WHERE bucket >= ? AND bucket < ?'
+            params = (since or '', until or '9999-12-31')
+        
+        with self.pool.reader() as conn:
+            analyzed, positive, negative, sentiment_sum = conn.execute(query, params).fetchone()
+        
+        return {
+            'analyzed_count': analyzed or 0,
+            'positive_count': positive or 0,
+            'negative_count': negative or 0,
+            'avg_sentiment': sentiment_sum / analyzed if analyzed else None
+        }
+
+    def get_complaint_keywords(self, limit: int = 5, product_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Получение слов, чаще всего встречающихся в отрицательных отзывах
+        
+        :param limit: Количество слов
+        :param product_id: ID продукта (None - по всем продуктам)
+        :return: Список словарей с ключами keyword и negative_mentions
+        """
+        condition = 'WHERE product_id = ?' if product_id is not None else ''
+        params: List[Any] = [product_id] if product_id is not None else []
+        
+        with self.pool.reader() as conn:
+            cursor = conn.execute(f'''
+            SELECT keyword, SUM(negative_mentions) as negative_mentions
+            FROM keyword_stats
+            {condition}
+            GROUP BY keyword
+            HAVING SUM(negative_mentions) > 0
+            ORDER BY negative_mentions DESC, keyword
+            LIMIT ?
+            ''', params + [limit])
+            
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_category_rating_stats(self) -> List[Dict[str, Any]]:
+        """
+        Получение статистики рейтингов по категориям
+        
+        :return: Список словарей с ключами category, products_count,
+                 avg_rating (среднее по средним рейтингам продуктов) и ratings_count
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute('''
+            SELECT p.category,
+                   COUNT(*) as products_count,
+                   AVG(CASE WHEN s.ratings_count > 0 THEN s.ratings_sum * 1.0 / s.ratings_count END) as avg_rating,
+                   COALESCE(SUM(s.ratings_count), 0) as ratings_count
+            FROM products p
+            LEFT JOIN product_rating_stats s ON p.id = s.product_id
+            GROUP BY p.category
+            ''')
+            
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_rating_counts(self) -> Dict[int, int]:
+        """
+        Получение количества оценок по значениям рейтинга из агрегатов продуктов.
+        Учитываются все оценки, в том числе оценки пользователей без записи в users.
+        
+        :return: Словарь рейтинг -> количество оценок (только встречающиеся оценки)
+        """
+        with self.pool.reader() as conn:
+            row = conn.execute('''
+            SELECT SUM(rating_1), SUM(rating_2), SUM(rating_3), SUM(rating_4), SUM(rating_5)
+            FROM product_rating_stats
+            ''').fetchone()
+        
+        return {rating: count for rating, count in enumerate(row, 1) if count}
+
+    def get_data_versions(self) -> Dict[str, str]:
+        """
+        Получение версий данных отзывов и рейтингов для кэширования отчетов.
+        Версия отзывов меняется при добавлении отзыва, версия рейтингов - при любом
+        изменении распределения оценок (она и есть это распределение).
+        
+        :return: Словарь с ключами feedback и ratings
+        """
+        with self.pool.reader() as conn:
+            feedback_max_id = conn.execute('SELECT MAX(id) FROM feedback').fetchone()[0]
+        
+        rating_counts = self.get_rating_counts()
+        return {
+            'feedback': f"{feedback_max_id or 0}",
+            'ratings': ':'.join(str(rating_counts.get(rating, 0)) for rating in range(1, 6))
+        }
+
+    def _iter_chunks(self, query: str, key: str, chunk_size: int,
+                     after: Optional[int]) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Потоковое чтение строк в порядке возрастающего ключа порциями фиксированного размера через fetchmany
+        
+        :param query: Запрос выборки строк без условий и сортировки
+        :param key: Столбец монотонного ключа с псевдонимом таблицы (например, f.id)
+        :param chunk_size: Количество строк в порции
+        :param after: Значение ключа последней прочитанной строки: читать только строки с большим ключом
+        :return: Итератор порций в виде столбцов (имя столбца -> список значений)
+        """
+        params: Tuple = ()
+        if after is not None:
+            query += f' WHERE {key} > ?'
+            params = (after,)
+        query += f' ORDER BY {key}'
+        
+        with self.pool.reader() as conn:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield dict(zip(columns, map(list, zip(*rows))))
+            finally:
+                cursor.close()
+
+    def iter_feedback_chunks(self, chunk_size: int = 10000,
+                             after: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Потоковое чтение отзывов (в порядке добавления) порциями в виде столбцов.
+        Объем памяти ограничен размером одной порции независимо от числа отзывов.
+        
+        :param chunk_size: Количество строк в порции
+        :param after: ID последнего прочитанного отзыва: читать только отзывы, добавленные позже
+        :return: Итератор порций (имя столбца -> список значений)
+        """
+        return self._iter_chunks(self.FEEDBACK_ROWS_QUERY, 'f.id', chunk_size, after)
+
+    def iter_ratings_chunks(self, chunk_size: int = 10000,
+                            after: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Потоковое чтение оценок (в порядке добавления или последнего изменения) порциями в виде столбцов
+        change_id, rating, created_at, user_id и product_id. Измененная оценка получает новый change_id
+        и читается повторно, даже если изменена в ту же секунду, что и прочитанные строки.
+        
+        :param chunk_size: Количество строк в порции
+        :param after: change_id последней прочитанной оценки: читать только оценки, добавленные или измененные позже
+        :return: Итератор порций (имя столбца -> список значений)
+        """
+        return self._iter_chunks(self.RATING_CHANGES_QUERY, 'r.change_id', chunk_size, after)
+
+    def iter_export_chunks(self, source: str, since: Optional[str] = None, until: Optional[str] = None,
+                           product_id: Optional[int] = None,
+                           chunk_size: int = 5000) -> Iterator[Tuple[List[str], List[Tuple]]]:
+        """
+        Потоковое чтение отзывов или рейтингов для выгрузки (от старых к новым) порциями строк.
+        Выборка идет по индексу даты создания (с продуктом - по индексу продукта и даты),
+        объем памяти ограничен размером одной порции.
+        
+        :param source: Источник (feedback или ratings)
+        :param since: Начало периода 'YYYY-MM-DD' включительно (None - без ограничения)
+        :param until: Конец периода 'YYYY-MM-DD' не включительно (None - без ограничения)
+        :param product_id: ID продукта (None - все продукты)
+        :param chunk_size: Количество строк в порции
+        :return: Итератор пар (названия столбцов, список строк)
+        """
+        if source == 'feedback':
+            query, alias = self.FEEDBACK_ROWS_QUERY, 'f'
+        else:
+            query, alias = self.RATINGS_ROWS_QUERY, 'r'
+        
+        conditions = []
+        params: List[Any] = []
+        if since is not None:
+            conditions.append(f'{alias}.created_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append(f'{alias}.created_at < ?')
+            params.append(until)
+        if product_id is not None:
+            conditions.append(f'{alias}.product_id = ?')
+            params.append(product_id)
+        
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY {alias}.created_at, {alias}.id'
+        
+        with self.pool.reader() as conn:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield columns, [tuple(row) for row in rows]
+            finally:
+                cursor.close()
\ No newline at end of file
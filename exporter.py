@@ -0,0 +1,123 @@
+import csv
+import gzip
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    # openpyxl нужен только для выгрузки в XLSX
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Выгружаемые источники и названия файлов/листов
+EXPORT_SOURCES = ('feedback', 'ratings')
+
+# Максимальный размер документа, который бот может отправить в Telegram
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+# Максимальное количество строк на листе XLSX (вместе с заголовком)
+XLSX_MAX_ROWS = 1048576
+
+# Первые символы, с которых Excel и другие табличные редакторы начинают формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def escape_row(row: Sequence[Any]) -> List[Any]:
+    """
+    Экранирование ячеек, которые табличный редактор выполнил бы как формулу
+    (тексты отзывов и имена вводят пользователи): в начало добавляется апостроф
+
+    :param row: Строка выгрузки
+    :return: Строка, безопасная для открытия в табличном редакторе
+    """
+    return [f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for value in row]
+
+def xlsx_available() -> bool:
+    """
+    Доступна ли выгрузка в XLSX (установлен ли openpyxl)
+    """
+    return Workbook is not None
+
+def export_csv(db: Any, directory: str, since: Optional[str] = None, until: Optional[str] = None,
+               product_id: Optional[int] = None, chunk_size: int = 5000) -> List[Dict[str, Any]]:
+    """
+    Выгрузка отзывов и рейтингов в сжатые CSV-файлы (по файлу на источник).
+    Строки читаются и записываются порциями, поэтому объем памяти не зависит
+    от количества строк. Выполняется вне цикла событий.
+
+    :param db: Объект Database
+    :param directory: Каталог для файлов
+    :param since: Начало периода 'YYYY-MM-DD' включительно
+    :param until: Конец периода 'YYYY-MM-DD' не включительно
+    :param product_id: ID продукта
+    :param chunk_size: Количество строк в порции
+    :return: Список словарей с ключами source, path и rows
+    """
+    files = []
+
+    for source in EXPORT_SOURCES:
+        path = os.path.join(directory, f"{source}.csv.gz")
+        rows = 0
+
+        # utf-8-sig: Excel открывает файл с кириллицей без выбора кодировки
+        with gzip.open(path, 'wt', encoding='utf-8-sig', newline='', compresslevel=6) as file:
+            writer = csv.writer(file)
+            header_written = False
+
+            for columns, chunk in db.iter_export_chunks(source, since, until, product_id, chunk_size):
+                if not header_written:
+                    writer.writerow(columns)
+                    header_written = True
+                writer.writerows(escape_row(row) for row in chunk)
+                rows += len(chunk)
+
+        files.append({'source': source, 'path': path, 'rows': rows})
+
+    return files
+
+def export_xlsx(db: Any, directory: str, since: Optional[str] = None, until: Optional[str] = None,
+                product_id: Optional[int] = None, chunk_size: int = 5000) -> List[Dict[str, Any]]:
+    """
+    Выгрузка отзывов и рейтингов в один файл XLSX (по листу на источник).
+    Книга создается в потоковом режиме openpyxl (write_only): строки сразу
+    сбрасываются во временные файлы и не накапливаются в памяти.
+    Источник, не помещающийся на один лист, продолжается на следующем.
+
+    :param db: Объект Database
+    :param directory: Каталог для файла
+    :param since: Начало периода 'YYYY-MM-DD' включительно
+    :param until: Конец периода 'YYYY-MM-DD' не включительно
+    :param product_id: ID продукта
+    :param chunk_size: Количество строк в порции
+    :return: Список из одного словаря с ключами source, path и rows
+    """
+    if Workbook is None:
+        raise RuntimeError("Для выгрузки в XLSX установите openpyxl")
+
+    path = os.path.join(directory, "export.xlsx")
+    workbook = Workbook(write_only=True)
+    total_rows = 0
+
+    for source in EXPORT_SOURCES:
+        sheet = None
+        sheet_number = 0
+        sheet_rows = 0
+
+        for columns, chunk in db.iter_export_chunks(source, since, until, product_id, chunk_size):
+            for row in chunk:
+                if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+                    sheet_number += 1
+                    title = source if sheet_number == 1 else f"{source} ({sheet_number})"
+                    sheet = workbook.create_sheet(title)
+                    sheet.append(columns)
+                    sheet_rows = 1
+                sheet.append(escape_row(row))
+                sheet_rows += 1
+                total_rows += 1
+
+        if sheet is None:
+            # Пустой лист, чтобы в книге были все источники
+            workbook.create_sheet(source)
+
+    workbook.save(path)
+    return [{'source': 'xlsx', 'path': path, 'rows': total_rows}]
\ No newline at end of file
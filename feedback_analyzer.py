@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Optional
+
+from text_analysis import analyze_text
+
+logger = logging.getLogger(__name__)
+
+class FeedbackAnalyzer:
+    """
+    Фоновый анализ текстов отзывов: тональность и ключевые слова.
+
+    Новые отзывы читаются порциями по batch_size строк после курсора,
+    сохраненного в базе данных (worker_cursors), поэтому после перезапуска
+    обработка продолжается с места остановки, а старые тексты повторно не читаются.
+    Результаты каждой порции записываются вместе с курсором в одной транзакции;
+    агрегаты по продуктам, дням и ключевым словам обновляются триггерами.
+    Обработка запускается каждые interval секунд или сразу после нового отзыва.
+    """
+
+    # Имя курсора в таблице worker_cursors
+    CURSOR_NAME = 'feedback_analysis'
+
+    def __init__(self, db: Any, batch_size: int = 500, interval: float = 60.0):
+        """
+        Инициализация обработчика
+
+        :param db: Объект AsyncDatabase
+        :param batch_size: Количество отзывов в одной порции
+        :param interval: Период проверки новых отзывов (в секундах)
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def process_batch(self) -> int:
+        """
+        Анализ одной порции новых отзывов (выполняется вне цикла событий)
+
+        :return: Количество обработанных отзывов
+        """
+        database = self.db.database
+        # Порции обрабатываются по очереди: параллельные вызовы читают и сдвигают один курсор
+        with self._lock:
+            last_id = database.get_worker_cursor(self.CURSOR_NAME)
+            rows = database.get_feedback_after(last_id, self.batch_size)
+            if not rows:
+                return 0
+
+            results = []
+            for row in rows:
+                analysis = analyze_text(row['text'] or '')
+                analysis.update(feedback_id=row['id'], product_id=row['product_id'], created_at=row['created_at'])
+                results.append(analysis)
+
+            database.save_feedback_analysis(self.CURSOR_NAME, rows[-1]['id'], results)
+            return len(rows)
+
+    async def process_pending(self) -> int:
+        """
+        Анализ всех необработанных отзывов порциями
+
+        :return: Количество обработанных отзывов
+        """
+        total = 0
+        while True:
+            processed = await self.db.run(self.process_batch)
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    def start(self) -> None:
+        """
+        Запуск фоновой задачи анализа
+        """
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def note_write(self, kind: str, *_: Any) -> None:
+        """
+        Слушатель записей AsyncDatabase: новый отзыв запускает обработку
+        """
+        if kind == 'feedback' and self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        """
+        Фоновая задача: обработка по таймеру или после новых отзывов
+        """
+        while True:
+            try:
+                processed = await self.process_pending()
+                if processed:
+                    logger.info("Проанализировано отзывов: %d", processed)
+            except Exception:
+                logger.exception("Не удалось проанализировать отзывы")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def close(self) -> None:
+        """
+        Остановка фоновой задачи
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
\ No newline at end of file
@@ -1,24 +1,73 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, CommandStart
+from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile
+from aiogram.filters import Command, CommandStart, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from database import Database
-from analytics import Analytics
+from async_database import AsyncDatabase
+from sql_analytics import SqlAnalytics
+from sketch_analytics import SketchAnalytics
+from chart_cache import ChartCache
+from chart_renderer import ChartRenderer
+from stats_scheduler import StatsScheduler
+from leaderboard import Leaderboard
+from feedback_analyzer import FeedbackAnalyzer
+from exporter import export_csv, export_xlsx, xlsx_available, MAX_DOCUMENT_SIZE
 from keyboards import (
     get_main_keyboard, 
     get_categories_keyboard, 
     get_products_keyboard, 
-    get_rating_keyboard
+    get_rating_keyboard,
+    get_feedback_page_keyboard,
+    get_search_page_keyboard
+)
+from config import (
+    ADMIN_IDS, DB_NAME, DB_READ_POOL_SIZE, DB_TIMEOUT, PRODUCT_CATEGORIES,
+    WRITE_BEHIND_ENABLED, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_DELAY,
+    FEEDBACK_PAGE_SIZE, FEEDBACK_MAX_LENGTH, USER_CACHE_SIZE, SEARCH_PAGE_SIZE,
+    CHART_CACHE_SIZE, CHART_CACHE_DIR,
+    CHART_RENDER_WORKERS, CHART_RENDER_CONCURRENCY, CHART_RENDER_TIMEOUT,
+    CHART_TREND_DAYS, ANALYTICS_MODE,
+    STATS_REFRESH_INTERVAL, STATS_REFRESH_WRITES,
+    LEADERBOARD_PRIOR_WEIGHT, TOP_PRODUCTS_LIMIT,
+    ANALYSIS_BATCH_SIZE, ANALYSIS_INTERVAL, EXPORT_CHUNK_SIZE
 )
-from config import ADMIN_IDS, DB_NAME
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-# Инициализируем базу данных
-db = Database(DB_NAME)
+# Инициализируем базу данных (методы выполняются вне цикла событий)
+db = AsyncDatabase(
+    Database(DB_NAME, DB_READ_POOL_SIZE, DB_TIMEOUT, USER_CACHE_SIZE),
+    write_behind=WRITE_BEHIND_ENABLED,
+    max_batch_size=WRITE_BEHIND_MAX_BATCH,
+    max_delay=WRITE_BEHIND_MAX_DELAY
+)
+
+# Аналитика для текстовых отчетов (агрегатные запросы в базе данных;
+# в приближенном режиме количество пользователей оценивается по скетчам)
+sql_analytics = SqlAnalytics(
+    db.database,
+    sketches=SketchAnalytics(db.database) if ANALYTICS_MODE == 'approximate' else None
+)
+
+# Рейтинг продуктов по байесовской оценке для /top и /stats (обновляется при новых оценках)
+leaderboard = Leaderboard(LEADERBOARD_PRIOR_WEIGHT)
+db.add_write_listener(leaderboard.note_write)
+
+# Кэш отрисованных графиков /stats
+chart_cache = ChartCache(CHART_CACHE_SIZE, CHART_CACHE_DIR)
+
+# Отрисовка графиков в пуле процессов (не блокирует цикл событий)
+chart_renderer = ChartRenderer(CHART_RENDER_WORKERS, CHART_RENDER_CONCURRENCY, CHART_RENDER_TIMEOUT)
 
 # Определяем состояния для FSM (конечного автомата)
 class FeedbackStates(StatesGroup):
@@ -38,7 +87,7 @@ async def cmd_start(message: Message):
     Приветствует пользователя и объясняет функциональность бота
     """
     # Регистрируем пользователя в базе данных
-    db.register_user(
+    await db.register_user(
         message.from_user.id,
         message.from_user.username,
         message.from_user.first_name,
@@ -51,7 +100,8 @@ async def cmd_start(message: Message):
         "Вы можете использовать следующие команды:\n"
         "📝 /leave_feedback - оставить отзыв о продукте или услуге\n"
         "👁️ /view_feedback - просмотреть отзывы о продукте или услуге\n"
-        "⭐ /rate - поставить оценку продукту или услуге\n\n"
+        "⭐ /rate - поставить оценку продукту или услуге\n"
+        "🏆 /top [категория] - лучшие продукты по оценкам пользователей\n\n"
         "Ваше мнение очень важно для нас!",
         reply_markup=get_main_keyboard()
     )
@@ -89,27 +139,119 @@ async def cmd_rate(message: Message):
         reply_markup=get_categories_keyboard()
     )
 
-@router.message(Command("stats"))
-async def cmd_admin_stats(message: Message):
+async def send_cached_chart(message: Message, name: str, version: str,
+                            render: Callable[[], Awaitable[bytes]], caption: str) -> None:
     """
-    Обработчик команды /stats
-    Генерирует и отправляет статистику (только для админов)
+    Отправка графика с использованием кэша
+    
+    Если график для этой версии данных уже отправлялся, он отправляется по file_id
+    из Telegram; если он есть только в кэше - отправляются сохраненные байты;
+    иначе график отрисовывается и сохраняется в кэше.
+    
+    :param message: Сообщение, на которое отвечаем
+    :param name: Имя графика
+    :param version: Версия данных графика
+    :param render: Корутинная функция отрисовки графика (возвращает PNG)
+    :param caption: Подпись к графику
     """
-    # Проверяем, является ли пользователь администратором
-    if message.from_user.id not in ADMIN_IDS:
-        await message.answer("⛔ У вас нет доступа к этой команде.")
+    cached = chart_cache.get(name, version)
+    
+    if cached and cached['file_id']:
+        await message.answer_photo(photo=cached['file_id'], caption=caption)
         return
     
-    await message.answer("📊 Генерирую статистику, пожалуйста, подождите...")
+    if cached:
+        data = cached['data']
+    else:
+        data = await render()
+        chart_cache.put(name, version, data)
+    
+    sent = await message.answer_photo(
+        photo=BufferedInputFile(data, filename=f"{name}.png"),
+        caption=caption
+    )
     
-    # Получаем данные для аналитики
-    db_data = db.get_all_feedback_and_ratings()
+    # Запоминаем file_id, чтобы в следующий раз не загружать картинку заново
+    if sent.photo:
+        chart_cache.set_file_id(name, version, sent.photo[-1].file_id)
+
+def format_sentiment_share(count: int, total: int) -> str:
+    """
+    Доля отзывов в процентах
+    """
+    return f"{round(100 * count / total)}%" if total else "0%"
+
+async def format_sentiment_report() -> str:
+    """
+    Раздел отчета /stats о тональности отзывов: доли по тональности,
+    сравнение последней недели с предыдущей и частые слова в жалобах
+    
+    :return: Текст раздела (пустая строка, если проанализированных отзывов нет)
+    """
+    summary = await db.get_sentiment_summary()
+    total = summary['analyzed_count']
+    if not total:
+        return ""
+    
+    today = datetime.now()
+    week_start = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+    previous_start = (today - timedelta(days=13)).strftime('%Y-%m-%d')
+    last_week = await db.get_sentiment_summary(week_start)
+    previous_week = await db.get_sentiment_summary(previous_start, week_start)
+    
+    text = (
+        "💬 **Тональность отзывов**\n\n"
+        f"🙂 Положительных: {format_sentiment_share(summary['positive_count'], total)}\n"
+        f"😐 Нейтральных: {format_sentiment_share(total - summary['positive_count'] - summary['negative_count'], total)}\n"
+        f"🙁 Отрицательных: {format_sentiment_share(summary['negative_count'], total)}\n"
+        f"📊 Средняя оценка тональности: {round(summary['avg_sentiment'], 2)} (от -1 до 1)\n"
+    )
+    
+    if last_week['analyzed_count']:
+        text += (
+            f"📅 За последнюю неделю: {round(last_week['avg_sentiment'], 2)}, "
+            f"отрицательных {format_sentiment_share(last_week['negative_count'], last_week['analyzed_count'])}"
+        )
+        if previous_week['analyzed_count']:
+            change = last_week['avg_sentiment'] - previous_week['avg_sentiment']
+            text += f" ({'📈' if change >= 0 else '📉'} {change:+.2f} к предыдущей неделе)"
+        text += "\n"
+    
+    keywords = await db.get_complaint_keywords(5)
+    if keywords:
+        text += "⚠️ Частые слова в жалобах: " + ", ".join(
+            f"{row['keyword']} ({row['negative_mentions']})" for row in keywords
+        ) + "\n"
+    
+    return text + "\n"
+
+def format_service_report() -> str:
+    """
+    Раздел отчета /stats о работе бота: обращения к кэшу каталога продуктов
+    и регистрации пользователей, для которых запись в базу не понадобилась
     
-    # Инициализируем аналитику
-    analytics = Analytics(db_data)
+    :return: Текст раздела
+    """
+    catalog = db.database.get_catalog_stats()
+    requests = catalog['hits'] + catalog['misses']
+    registrations = db.database.get_registration_stats()
+    return (
+        "⚙️ **Работа бота**\n\n"
+        f"📦 Кэш каталога: {catalog['hits']} из {requests} обращений без запроса к базе, "
+        f"загрузок из базы: {catalog['misses']}\n"
+        f"👤 Регистрации: пропущено по кэшу {registrations['skipped']}, "
+        f"без изменений профиля {registrations['unchanged']}, записано {registrations['written']}\n\n"
+    )
+
+async def build_stats_report() -> Dict[str, Any]:
+    """
+    Построение отчета /stats: текст и графики
     
-    # Получаем общую статистику
-    stats = analytics.get_general_stats()
+    :return: Словарь с ключами text, charts (список графиков с ключами name, version,
+             caption и data) и chart_error (текст ошибки генерации графиков или None)
+    """
+    # Получаем общую статистику агрегатными запросами в базе данных
+    stats = await db.run(sql_analytics.get_general_stats)
     
     # Формируем текст отчета
     report_text = (
@@ -126,36 +268,552 @@ async def cmd_admin_stats(message: Message):
         f"📊 Средний рейтинг: {stats['avg_rating_last_week']}\n\n"
     )
     
-    # Добавляем топ продуктов
-    top_products = analytics.get_top_products()
+    # Добавляем топ продуктов по байесовской оценке (при пересчете отчета обновляем среднее по всем продуктам)
+    await db.run(leaderboard.load, db.database)
+    top_products = await db.run(leaderboard.top, db.database, 5)
     if top_products:
         report_text += "🏆 **Топ-5 продуктов по рейтингу**\n\n"
         for i, product in enumerate(top_products, 1):
             report_text += (
                 f"{i}. {product['name']} ({product['category']})\n"
-                f"   ⭐ Рейтинг: {product['avg_rating']} (на основе {product['ratings_count']} оценок)\n\n"
+                f"   ⭐ Рейтинг: {round(product['avg_rating'], 2)} (на основе {product['ratings_count']} оценок, "
+                f"итоговый балл {round(product['score'], 2)})\n\n"
             )
     
+    # Добавляем статистику по категориям из агрегатов продуктов
+    category_stats = await db.run(sql_analytics.get_category_stats)
+    if category_stats:
+        report_text += "📂 **Рейтинг по категориям**\n\n"
+        for category in category_stats:
+            report_text += (
+                f"• {category['category']}: ⭐ {category['avg_rating']} "
+                f"({category['products_count']} продуктов, {category['ratings_count']} оценок)\n"
+            )
+        report_text += "\n"
+    
+    # В приближенном режиме добавляем квантили оценок по категориям из гистограмм скетчей
+    # (скетчи обновлены при расчете общей статистики)
+    if sql_analytics.sketches:
+        histograms = await db.run(sql_analytics.sketches.category_histograms)
+        if histograms:
+            report_text += "📐 **Распределение оценок по категориям**\n(по всем выставленным оценкам, включая измененные)\n\n"
+            for category, histogram in sorted(histograms.items(), key=lambda item: item[1].mean() or 0, reverse=True):
+                report_text += (
+                    f"• {category}: медиана {histogram.quantile(0.5)}, "
+                    f"квартили {histogram.quantile(0.25)}-{histogram.quantile(0.75)}, "
+                    f"среднее {round(histogram.mean(), 2)} ({histogram.total} оценок)\n"
+                )
+            report_text += "\n"
+    
+    # Добавляем тональность отзывов из сохраненных агрегатов: новые отзывы анализирует
+    # фоновая задача FeedbackAnalyzer, отчет тексты отзывов не читает
+    report_text += await format_sentiment_report()
+    
+    # Служебные счетчики хранятся в памяти процесса, запрос к базе не нужен
+    report_text += format_service_report()
+    
+    report = {'text': report_text, 'charts': [], 'chart_error': None}
+    
+    # Генерируем графики (из кэша, если данные не изменились)
+    try:
+        versions = await db.get_data_versions()
+        
+        # Распределение оценок берется из агрегатов продуктов, как и итоги в тексте отчета
+        async def render_ratings_chart() -> bytes:
+            rating_counts = await db.get_rating_counts()
+            return await chart_renderer.render('ratings_chart', rating_counts=rating_counts)
+        
+        # Динамика отзывов строится по посуточной сводной таблице за последние CHART_TREND_DAYS дней
+        trend_since = None
+        if CHART_TREND_DAYS > 0:
+            trend_since = (datetime.now() - timedelta(days=CHART_TREND_DAYS - 1)).strftime('%Y-%m-%d')
+        
+        async def render_feedback_chart() -> bytes:
+            daily_activity = await db.get_daily_activity(trend_since)
+            daily_counts = [(row['day'], row['feedback_count']) for row in daily_activity if row['feedback_count']]
+            return await chart_renderer.render('feedback_by_time_chart', daily_counts=daily_counts)
+        
+        charts = [
+            # График распределения рейтингов
+            ('ratings', versions['ratings'], render_ratings_chart, "📊 Распределение рейтингов"),
+            # График отзывов по времени (окно сдвигается каждый день, поэтому дата входит в версию)
+            ('feedback_by_time', f"{versions['feedback']}:{trend_since}", render_feedback_chart,
+             "📊 Динамика отзывов по дням"),
+        ]
+        
+        for name, version, render, caption in charts:
+            cached = chart_cache.get(name, version)
+            if cached:
+                data = cached['data']
+            else:
+                data = await render()
+                chart_cache.put(name, version, data)
+            report['charts'].append({'name': name, 'version': version, 'caption': caption, 'data': data})
+    except asyncio.TimeoutError:
+        report['chart_error'] = "⚠️ Генерация графиков заняла слишком много времени, попробуйте позже"
+    except Exception as e:
+        report['chart_error'] = f"⚠️ Ошибка при генерации графиков: {str(e)}"
+    
+    return report
+
+# Фоновый анализ тональности и ключевых слов новых отзывов
+feedback_analyzer = FeedbackAnalyzer(db, ANALYSIS_BATCH_SIZE, ANALYSIS_INTERVAL)
+db.add_write_listener(feedback_analyzer.note_write)
+
+# Снимок отчета /stats, который пересчитывается в фоне
+stats_scheduler = StatsScheduler(build_stats_report, STATS_REFRESH_INTERVAL, STATS_REFRESH_WRITES)
+db.add_write_listener(stats_scheduler.note_write)
+
+@router.message(Command("stats"))
+async def cmd_admin_stats(message: Message, command: CommandObject):
+    """
+    Обработчик команды /stats
+    Отправляет статистику из последнего снимка (только для админов).
+    /stats fresh пересчитывает статистику перед отправкой.
+    """
+    # Проверяем, является ли пользователь администратором
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("⛔ У вас нет доступа к этой команде.")
+        return
+    
+    fresh = (command.args or '').strip().lower() == 'fresh'
+    # Без фонового пересчета отчет строится при каждом запросе
+    if fresh or stats_scheduler.snapshot is None or STATS_REFRESH_INTERVAL <= 0:
+        await message.answer("📊 Генерирую статистику, пожалуйста, подождите...")
+        report = await stats_scheduler.refresh()
+    else:
+        report = stats_scheduler.snapshot
+    
     # Отправляем текстовую статистику
+    report_text = report['text'] + f"🕒 Данные на {report['built_at'].strftime('%d.%m.%Y %H:%M')}"
     await message.answer(report_text, parse_mode="Markdown")
     
-    # Генерируем и отправляем графики
+    if report['chart_error']:
+        await message.answer(report['chart_error'])
+    
+    # Отправляем графики (по file_id, если они уже отправлялись)
+    for chart in report['charts']:
+        async def render(data: bytes = chart['data']) -> bytes:
+            return data
+        
+        await send_cached_chart(message, chart['name'], chart['version'], render, chart['caption'])
+
+def format_top_products(products: List[Dict[str, Any]], category: Optional[str]) -> str:
+    """
+    Форматирование рейтинга продуктов для /top
+    
+    :param products: Список продуктов из Leaderboard.top
+    :param category: Категория (None - все продукты)
+    :return: Текст сообщения
+    """
+    title = f"🏆 Лучшие продукты в категории «{category}»" if category else "🏆 Лучшие продукты"
+    if not products:
+        return f"{title}\n\nПока нет ни одной оценки."
+    
+    lines = [title, ""]
+    for i, product in enumerate(products, 1):
+        lines.append(f"{i}. {product['name']} ({product['category']})")
+        lines.append(
+            f"   ⭐ {round(product['avg_rating'], 2)} из 5 ({product['ratings_count']} оценок), "
+            f"итоговый балл {round(product['score'], 2)}"
+        )
+    lines.append("")
+    lines.append("Итоговый балл учитывает количество оценок: продукт с немногими оценками "
+                 "не обгоняет продукт с большим числом высоких оценок.")
+    return "\n".join(lines)
+
+@router.message(Command("top"))
+async def cmd_top(message: Message, command: CommandObject):
+    """
+    Обработчик команды /top [категория]
+    Показывает лучшие продукты по байесовской оценке (общий рейтинг или рейтинг категории)
+    """
+    category = (command.args or '').strip() or None
+    if category:
+        # Категорию можно указать без учета регистра
+        categories = {name.lower(): name for name in PRODUCT_CATEGORIES}
+        category = categories.get(category.lower())
+        if category is None:
+            await message.answer(
+                "Неизвестная категория. Доступные категории:\n" + "\n".join(PRODUCT_CATEGORIES)
+            )
+            return
+    
+    products = await db.run(leaderboard.top, db.database, TOP_PRODUCTS_LIMIT, category)
+    await message.answer(format_top_products(products, category))
+
+def summarize_activity(daily_activity: List[Dict[str, Any]], since: str,
+                       until: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Итоги посуточной активности за период
+    
+    :param daily_activity: Строки из get_daily_activity
+    :param since: Первый день периода 'YYYY-MM-DD'
+    :param until: День после окончания периода 'YYYY-MM-DD' (None - по сегодняшний день)
+    :return: Словарь с ключами feedback_count, ratings_count и avg_rating
+    """
+    rows = [row for row in daily_activity if row['day'] >= since and (until is None or row['day'] < until)]
+    ratings_count = sum(row['ratings_count'] for row in rows)
+    ratings_sum = sum(row['ratings_sum'] for row in rows)
+    
+    return {
+        'feedback_count': sum(row['feedback_count'] for row in rows),
+        'ratings_count': ratings_count,
+        'avg_rating': round(ratings_sum / ratings_count, 2) if ratings_count else None
+    }
+
+def group_activity_by_week(daily_activity: List[Dict[str, Any]]) -> List[Tuple[str, int, Optional[float]]]:
+    """
+    Группировка посуточной активности по неделям для графика продукта
+    
+    :param daily_activity: Строки из get_daily_activity
+    :return: Список троек (понедельник недели 'YYYY-MM-DD', количество отзывов, средняя новая оценка или None)
+    """
+    weeks: Dict[str, List[int]] = {}
+    for row in daily_activity:
+        day = datetime.strptime(row['day'], '%Y-%m-%d')
+        week = (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+        totals = weeks.setdefault(week, [0, 0, 0])
+        totals[0] += row['feedback_count']
+        totals[1] += row['ratings_count']
+        totals[2] += row['ratings_sum']
+    
+    return [
+        (week, feedback_count, round(ratings_sum / ratings_count, 2) if ratings_count else None)
+        for week, (feedback_count, ratings_count, ratings_sum) in sorted(weeks.items())
+    ]
+
+def format_product_stats(product: Dict[str, Any], stats: Dict[str, Any], last_week: Dict[str, Any],
+                         previous_week: Dict[str, Any], keywords: List[Dict[str, Any]]) -> str:
+    """
+    Формирование текста отчета /product_stats
+    
+    :param product: Продукт
+    :param stats: Итоги продукта из get_product_stats
+    :param last_week: Итоги последних 7 дней
+    :param previous_week: Итоги предыдущих 7 дней
+    :param keywords: Частые слова в жалобах на продукт
+    :return: Текст отчета
+    """
+    text = f"📦 **{product['name']}** ({product['category']})\n\n"
+    
+    ratings_count = stats['ratings_count']
+    if ratings_count:
+        text += f"⭐ Средний рейтинг: {round(stats['ratings_sum'] / ratings_count, 2)} ({ratings_count} оценок)\n"
+        for rating in range(5, 0, -1):
+            count = stats['rating_counts'][rating]
+            text += f"{rating}⭐ {'█' * round(10 * count / ratings_count)} {count} ({round(100 * count / ratings_count)}%)\n"
+    else:
+        text += "⭐ Оценок пока нет\n"
+    
+    text += f"\n📝 Всего отзывов: {stats['feedback_count']}\n"
+    if stats['analyzed_count']:
+        text += (
+            f"💬 Тональность: 🙂 {format_sentiment_share(stats['positive_count'], stats['analyzed_count'])}, "
+            f"🙁 {format_sentiment_share(stats['negative_count'], stats['analyzed_count'])}, "
+            f"средняя оценка {round(stats['avg_sentiment'], 2)}\n"
+        )
+    if keywords:
+        text += "⚠️ Частые слова в жалобах: " + ", ".join(
+            f"{row['keyword']} ({row['negative_mentions']})" for row in keywords
+        ) + "\n"
+    
+    def movement(current: Any, previous: Any) -> str:
+        return f"{current if current is not None else '—'} (неделей ранее {previous if previous is not None else '—'})"
+    
+    text += (
+        "\n📅 **За последние 7 дней**\n"
+        f"📝 Новых отзывов: {movement(last_week['feedback_count'], previous_week['feedback_count'])}\n"
+        f"⭐ Новых оценок: {movement(last_week['ratings_count'], previous_week['ratings_count'])}\n"
+        f"📊 Средняя новая оценка: {movement(last_week['avg_rating'], previous_week['avg_rating'])}\n"
+    )
+    
+    return text
+
+@router.message(Command("product_stats"))
+async def cmd_product_stats(message: Message, command: CommandObject):
+    """
+    Обработчик команды /product_stats <id>
+    Отчет по одному продукту из агрегатов и сводных таблиц (только для админов)
+    """
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("⛔ У вас нет доступа к этой команде.")
+        return
+    
+    args = (command.args or '').strip()
+    if not args.isdigit():
+        await message.answer("Использование: /product_stats <id продукта>\nНапример: /product_stats 3")
+        return
+    
+    product = await db.get_product_by_id(int(args))
+    if not product:
+        await message.answer("⚠️ Продукт не найден.")
+        return
+    
+    # Сравнение недель требует последних 14 дней, график - последних CHART_TREND_DAYS дней
+    today = datetime.now()
+    week_start = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+    previous_start = (today - timedelta(days=13)).strftime('%Y-%m-%d')
+    since = previous_start
+    if CHART_TREND_DAYS <= 0:
+        since = None
+    elif CHART_TREND_DAYS > 14:
+        since = (today - timedelta(days=CHART_TREND_DAYS - 1)).strftime('%Y-%m-%d')
+    
+    stats = await db.get_product_stats(product['id'])
+    daily_activity = await db.get_daily_activity(since, product['id'])
+    keywords = await db.get_complaint_keywords(5, product['id'])
+    
+    last_week = summarize_activity(daily_activity, week_start)
+    previous_week = summarize_activity(daily_activity, previous_start, week_start)
+    await message.answer(
+        format_product_stats(product, stats, last_week, previous_week, keywords),
+        parse_mode="Markdown"
+    )
+    
+    # График строится из тех же агрегатов; версия - хэш данных графика
+    chart_data = {'rating_counts': stats['rating_counts'], 'weekly': group_activity_by_week(daily_activity)}
+    version = hashlib.sha1(repr(chart_data).encode('utf-8')).hexdigest()
+    try:
+        await send_cached_chart(
+            message, f"product_{product['id']}", version,
+            lambda: chart_renderer.render('product_chart', **chart_data),
+            f"📊 {product['name']}: оценки и динамика по неделям"
+        )
+    except asyncio.TimeoutError:
+        await message.answer("⚠️ Генерация графика заняла слишком много времени, попробуйте позже")
+    except Exception as e:
+        await message.answer(f"⚠️ Ошибка при генерации графика: {str(e)}")
+
+# Выгрузки выполняются по одной, чтобы не занимать несколько потоков и соединений чтения
+export_lock = asyncio.Lock()
+
+def parse_export_args(args: str) -> Dict[str, Any]:
+    """
+    Разбор аргументов команды /export [с] [по] [продукт] [xlsx]
+    
+    Даты задаются в формате ДД.ММ.ГГГГ или ГГГГ-ММ-ДД (первая - начало периода,
+    вторая - конец периода включительно), число - ID продукта, слово xlsx выбирает формат XLSX.
+    
+    :param args: Текст после команды
+    :return: Словарь с ключами since, until, product_id и format
+    :raises ValueError: Если аргумент не распознан
+    """
+    dates = []
+    product_id = None
+    export_format = 'csv'
+    
+    for word in args.split():
+        if word.lower() in ('csv', 'xlsx'):
+            export_format = word.lower()
+        elif word.isdigit():
+            product_id = int(word)
+        else:
+            for date_format in ('%d.%m.%Y', '%Y-%m-%d'):
+                try:
+                    dates.append(datetime.strptime(word, date_format))
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Не удалось разобрать аргумент: {word}")
+    
+    if len(dates) > 2:
+        raise ValueError("Укажите не больше двух дат")
+    
+    since = dates[0].strftime('%Y-%m-%d') if dates else None
+    # Конец периода включительно: выбираем строки до начала следующего дня
+    until = (dates[1] + timedelta(days=1)).strftime('%Y-%m-%d') if len(dates) == 2 else None
+    
+    return {'since': since, 'until': until, 'product_id': product_id, 'format': export_format}
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    """
+    Обработчик команды /export [с] [по] [продукт] [xlsx]
+    Выгрузка отзывов и рейтингов в сжатый CSV или XLSX (только для админов)
+    """
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("⛔ У вас нет доступа к этой команде.")
+        return
+    
     try:
-        # График распределения рейтингов
-        ratings_chart = analytics.generate_ratings_chart()
-        await message.answer_photo(
-            photo=ratings_chart,
-            caption="📊 Распределение рейтингов"
+        params = parse_export_args(command.args or '')
+    except ValueError as e:
+        await message.answer(
+            f"⚠️ {e}\n\n"
+            "Использование: /export [с] [по] [продукт] [xlsx]\n"
+            "Например: /export 01.01.2024 31.01.2024 3"
         )
+        return
+    
+    if params['product_id'] is not None and await db.get_product_by_id(params['product_id']) is None:
+        await message.answer("⚠️ Продукт не найден.")
+        return
+    
+    if params['format'] == 'xlsx' and not xlsx_available():
+        await message.answer("⚠️ Выгрузка в XLSX недоступна: установите пакет openpyxl.")
+        return
+    
+    if export_lock.locked():
+        await message.answer("⏳ Выгрузка уже выполняется, повторите команду позже.")
+        return
+    
+    async with export_lock:
+        await message.answer("📦 Готовлю выгрузку, пожалуйста, подождите...")
+        export = export_xlsx if params['format'] == 'xlsx' else export_csv
+        
+        with tempfile.TemporaryDirectory(prefix='export_') as directory:
+            # Строки читаются и записываются в файл порциями в потоке, цикл событий не блокируется
+            try:
+                files = await db.run(
+                    export, db.database, directory, params['since'], params['until'],
+                    params['product_id'], EXPORT_CHUNK_SIZE
+                )
+            except Exception as e:
+                await message.answer(f"⚠️ Ошибка при выгрузке: {str(e)}")
+                return
+            
+            for file in files:
+                if not file['rows']:
+                    continue
+                
+                if os.path.getsize(file['path']) > MAX_DOCUMENT_SIZE:
+                    await message.answer(
+                        f"⚠️ Файл {os.path.basename(file['path'])} больше 50 МБ и не может быть отправлен. "
+                        "Уменьшите период или выберите продукт."
+                    )
+                    continue
+                
+                await message.answer_document(
+                    FSInputFile(file['path']),
+                    caption=f"📄 {os.path.basename(file['path'])}: {file['rows']} строк"
+                )
+        
+        if not any(file['rows'] for file in files):
+            await message.answer("📭 За выбранный период данных нет.")
+
+def parse_search_args(args: str) -> Dict[str, Any]:
+    """
+    Разбор аргументов команды /search
+    
+    Фильтры задаются словами product:<id> и category:<название> (пробелы в названии
+    категории заменяются на "_"), остальные слова образуют поисковый запрос.
+    
+    :param args: Текст после команды
+    :return: Словарь с ключами query, product_id и category
+    """
+    query_words = []
+    product_id = None
+    category = None
+    
+    for word in args.split():
+        if word.startswith('product:') and word[len('product:'):].isdigit():
+            product_id = int(word[len('product:'):])
+        elif word.startswith('category:') and len(word) > len('category:'):
+            category = word[len('category:'):].replace('_', ' ')
+        else:
+            query_words.append(word)
+    
+    return {'query': ' '.join(query_words), 'product_id': product_id, 'category': category}
+
+def format_search_results(params: Dict[str, Any], results: Dict[str, Any], offset: int) -> str:
+    """
+    Формирование текста страницы результатов поиска
+    
+    :param params: Параметры поиска
+    :param results: Результаты из search_feedback
+    :param offset: Смещение страницы
+    :return: Текст сообщения
+    """
+    message_text = f"🔎 Результаты поиска: {params['query']}\n"
+    
+    if params['product_id'] is not None:
+        message_text += f"Продукт: {params['product_id']}\n"
+    if params['category']:
+        message_text += f"Категория: {params['category']}\n"
+    message_text += "\n"
+    
+    if not results['items']:
+        message_text += "😞 Ничего не найдено."
+        return message_text
+    
+    for i, feedback in enumerate(results['items'], offset + 1):
+        if feedback['username']:
+            user_name = f"@{feedback['username']}"
+        else:
+            user_name = f"{feedback['first_name'] or ''} {feedback['last_name'] or ''}".strip() or str(feedback['user_id'])
         
-        # График отзывов по времени
-        feedback_chart = analytics.generate_feedback_by_time_chart()
-        await message.answer_photo(
-            photo=feedback_chart,
-            caption="📊 Динамика отзывов по дням"
+        message_text += (
+            f"{i}. {feedback['product_name']} ({feedback['category']})\n"
+            f"   От: {user_name}, {feedback['created_at']}\n"
+            f"   {feedback['snippet']}\n\n"
         )
-    except Exception as e:
-        await message.answer(f"⚠️ Ошибка при генерации графиков: {str(e)}")
+    
+    # Проверяем длину сообщения (Telegram ограничивает длину сообщения)
+    if len(message_text) > 4000:
+        message_text = message_text[:3950] + "..."
+    
+    return message_text
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject, state: FSMContext):
+    """
+    Обработчик команды /search <запрос> [product:<id>] [category:<название>]
+    Полнотекстовый поиск по отзывам (только для админов)
+    """
+    # Проверяем, является ли пользователь администратором
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("⛔ У вас нет доступа к этой команде.")
+        return
+    
+    params = parse_search_args(command.args or '')
+    if not params['query']:
+        await message.answer(
+            "Использование: /search <запрос> [product:<id>] [category:<название>]\n"
+            "Например: /search доставка опоздала category:Доставка"
+        )
+        return
+    
+    # Сохраняем параметры поиска для листания страниц
+    await state.update_data(search=params)
+    
+    results = await db.search_feedback(limit=SEARCH_PAGE_SIZE, **params)
+    
+    await message.answer(
+        format_search_results(params, results, 0),
+        reply_markup=get_search_page_keyboard(0, SEARCH_PAGE_SIZE, results['has_more'])
+    )
+
+@router.callback_query(F.data.startswith('search_page_'))
+async def process_search_page(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Обработчик листания результатов поиска
+    
+    :param callback_query: Объект callback_query
+    :param state: Состояние FSM
+    """
+    if callback_query.from_user.id not in ADMIN_IDS:
+        await callback_query.answer("⛔ У вас нет доступа к этой команде.")
+        return
+    
+    data = await state.get_data()
+    params = data.get('search')
+    
+    if not params:
+        await callback_query.answer("Поиск устарел, повторите команду /search")
+        return
+    
+    offset = max(0, int(callback_query.data.rsplit('_', 1)[1]))
+    results = await db.search_feedback(limit=SEARCH_PAGE_SIZE, offset=offset, **params)
+    
+    await callback_query.message.edit_text(
+        format_search_results(params, results, offset),
+        reply_markup=get_search_page_keyboard(offset, SEARCH_PAGE_SIZE, results['has_more'])
+    )
+    
+    # Отвечаем на колбэк
+    await callback_query.answer()
 
 # Обработчики инлайн кнопок
 @router.callback_query(F.data.startswith('category_'))
@@ -170,7 +828,7 @@ async def process_category_selection(callback_query: CallbackQuery, state: FSMCo
     category = callback_query.data.split('_', 1)[1]
     
     # Получаем продукты выбранной категории
-    products = db.get_products_by_category(category)
+    products = await db.get_products_by_category(category)
     
     if not products:
         await callback_query.answer("В этой категории нет продуктов")
@@ -211,7 +869,7 @@ async def process_product_selection_for_feedback(callback_query: CallbackQuery,
     product_id = int(callback_query.data.split('_')[1])
     
     # Получаем информацию о продукте
-    product = db.get_product_by_id(product_id)
+    product = await db.get_product_by_id(product_id)
     
     if not product:
         await callback_query.answer("Продукт не найден")
@@ -243,17 +901,17 @@ async def process_product_selection_for_rating(callback_query: CallbackQuery, st
     product_id = int(callback_query.data.split('_')[1])
     
     # Получаем информацию о продукте
-    product = db.get_product_by_id(product_id)
+    product = await db.get_product_by_id(product_id)
     
     if not product:
         await callback_query.answer("Продукт не найден")
         return
     
     # Получаем текущий рейтинг пользователя для этого продукта
-    user_rating = db.get_user_rating(callback_query.from_user.id, product_id)
+    user_rating = await db.get_user_rating(callback_query.from_user.id, product_id)
     
     # Получаем средний рейтинг продукта
-    avg_rating = db.get_average_rating(product_id)
+    avg_rating = await db.get_average_rating(product_id)
     
     # Сохраняем выбранный продукт в состоянии
     await state.update_data(product_id=product_id, product_name=product['name'])
@@ -278,6 +936,108 @@ async def process_product_selection_for_rating(callback_query: CallbackQuery, st
     # Отвечаем на колбэк
     await callback_query.answer()
 
+# Максимальная длина сообщения Telegram
+MESSAGE_MAX_LENGTH = 4096
+
+def telegram_length(text: str) -> int:
+    """
+    Длина текста так, как ее считает Telegram (в единицах UTF-16: эмодзи занимают две)
+    """
+    return len(text.encode('utf-16-le')) // 2
+
+def truncate_to_length(text: str, length: int) -> str:
+    """
+    Начало текста длиной не больше length единиц UTF-16
+    """
+    used = 0
+    for index, char in enumerate(text):
+        used += 2 if ord(char) > 0xFFFF else 1
+        if used > length:
+            return text[:index]
+    return text
+
+def format_feedback_entry(number: int, feedback: Dict[str, Any], text: Optional[str] = None) -> str:
+    """
+    Формирование отзыва на странице отзывов
+    
+    :param number: Номер отзыва на странице
+    :param feedback: Отзыв из get_feedback_page
+    :param text: Текст вместо текста отзыва (для сокращенного отзыва)
+    :return: Текст отзыва
+    """
+    # Формируем имя пользователя
+    if feedback['username']:
+        user_name = f"@{feedback['username']}"
+    else:
+        user_name = f"{feedback['first_name']} {feedback['last_name'] or ''}".strip()
+    
+    return (
+        f"{number}. От: {user_name}\n"
+        f"   {feedback['text'] if text is None else text}\n"
+        f"   Дата: {feedback['created_at']}\n\n"
+    )
+
+def format_feedback_page(product: Dict[str, Any], page: Dict[str, Any], avg_rating: Optional[float],
+                         toward_newer: bool = False) -> Tuple[str, Optional[Tuple[str, int]], Optional[Tuple[str, int]]]:
+    """
+    Формирование текста страницы отзывов о продукте.
+    
+    Страница заполняется целыми отзывами, пока текст помещается в одно сообщение Telegram;
+    не поместившиеся отзывы переносятся на соседнюю страницу сдвигом курсора,
+    поэтому каждый отзыв можно прочитать полностью.
+    
+    :param product: Информация о продукте
+    :param page: Страница отзывов из get_feedback_page
+    :param avg_rating: Средний рейтинг продукта
+    :param toward_newer: Страница получена листанием к более новым отзывам
+                         (сохраняются отзывы, ближайшие к курсору, то есть самые старые)
+    :return: Текст сообщения и курсоры (newer, older) для кнопок листания
+    """
+    message_text = f"📝 Отзывы о продукте: {product['name']}\n\n"
+    
+    if avg_rating:
+        message_text += f"⭐ Средний рейтинг: {avg_rating}\n\n"
+    else:
+        message_text += "⭐ Рейтинг отсутствует\n\n"
+    
+    items = page['items']
+    newer, older = page['newer'], page['older']
+    
+    if not items:
+        return message_text + "😞 Пока нет отзывов об этом продукте.", newer, older
+    
+    # Набираем отзывы от курсора, пока они помещаются в сообщение
+    budget = MESSAGE_MAX_LENGTH - telegram_length(message_text)
+    candidates = list(reversed(items)) if toward_newer else list(items)
+    kept = []
+    for feedback in candidates:
+        length = telegram_length(format_feedback_entry(len(items), feedback))
+        if kept and length > budget:
+            break
+        kept.append(feedback)
+        budget -= length
+    
+    if toward_newer:
+        kept.reverse()
+    
+    # Не поместившиеся отзывы показываются на соседней странице
+    if len(kept) < len(items):
+        if toward_newer:
+            newer = (kept[0]['created_at'], kept[0]['id'])
+        else:
+            older = (kept[-1]['created_at'], kept[-1]['id'])
+    
+    for i, feedback in enumerate(kept, 1):
+        if budget < 0:
+            # Единственный отзыв длиннее сообщения (сохранен до ограничения FEEDBACK_MAX_LENGTH) сокращаем
+            note = "… (отзыв сокращен)"
+            length = telegram_length(feedback['text']) + budget - telegram_length(note)
+            message_text += format_feedback_entry(i, feedback, truncate_to_length(feedback['text'], length) + note)
+        else:
+            message_text += format_feedback_entry(i, feedback)
+    
+    return message_text, newer, older
+
 @router.callback_query(F.data.startswith('view_'))
 async def process_product_selection_for_view(callback_query: CallbackQuery, state: FSMContext):
     """
@@ -290,58 +1050,58 @@ async def process_product_selection_for_view(callback_query: CallbackQuery, stat
     product_id = int(callback_query.data.split('_')[1])
     
     # Получаем информацию о продукте
-    product = db.get_product_by_id(product_id)
+    product = await db.get_product_by_id(product_id)
     
     if not product:
         await callback_query.answer("Продукт не найден")
         return
     
-    # Получаем отзывы о продукте
-    feedback_list = db.get_feedback_by_product(product_id)
+    # Получаем первую страницу отзывов о продукте
+    page = await db.get_feedback_page(product_id, limit=FEEDBACK_PAGE_SIZE)
     
     # Получаем средний рейтинг продукта
-    avg_rating = db.get_average_rating(product_id)
+    avg_rating = await db.get_average_rating(product_id)
     
-    # Формируем сообщение
-    message_text = f"📝 Отзывы о продукте: {product['name']}\n\n"
+    # Отправляем сообщение с отзывами и кнопками листания
+    text, newer, older = format_feedback_page(product, page, avg_rating)
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=get_feedback_page_keyboard(product_id, newer, older)
+    )
     
-    if avg_rating:
-        message_text += f"⭐ Средний рейтинг: {avg_rating}\n\n"
-    else:
-        message_text += "⭐ Рейтинг отсутствует\n\n"
+    # Отвечаем на колбэк
+    await callback_query.answer()
+
+@router.callback_query(F.data.startswith('fbpage_'))
+async def process_feedback_page(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Обработчик листания отзывов о продукте
     
-    if feedback_list:
-        for i, feedback in enumerate(feedback_list, 1):
-            # Формируем имя пользователя
-            if feedback['username']:
-                user_name = f"@{feedback['username']}"
-            else:
-                user_name = f"{feedback['first_name']} {feedback['last_name'] or ''}".strip()
-            
-            # Добавляем отзыв в сообщение
-            message_text += (
-                f"{i}. От: {user_name}\n"
-                f"   {feedback['text']}\n"
-                f"   Дата: {feedback['created_at']}\n\n"
-            )
-    else:
-        message_text += "😞 Пока нет отзывов об этом продукте."
+    :param callback_query: Объект callback_query
+    :param state: Состояние FSM
+    """
+    # Извлекаем продукт, направление и курсор из данных колбэка
+    _, product_id, direction, cursor_id, cursor_created_at = callback_query.data.split('_', 4)
+    product_id = int(product_id)
+    cursor = (cursor_created_at, int(cursor_id))
     
-    # Проверяем длину сообщения и обрезаем при необходимости (Telegram ограничивает длину сообщения)
-    if len(message_text) > 4000:
-        message_text = message_text[:3950] + "...\n\n(Показаны не все отзывы)"
+    product = await db.get_product_by_id(product_id)
     
-    # Создаем кнопку "Назад к категориям"
-    builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(
-        text="◀️ Назад к категориям",
-        callback_data="back_to_categories"
-    ))
+    if not product:
+        await callback_query.answer("Продукт не найден")
+        return
     
-    # Отправляем сообщение с отзывами
+    if direction == 'n':
+        page = await db.get_feedback_page(product_id, after=cursor, limit=FEEDBACK_PAGE_SIZE)
+    else:
+        page = await db.get_feedback_page(product_id, before=cursor, limit=FEEDBACK_PAGE_SIZE)
+    
+    avg_rating = await db.get_average_rating(product_id)
+    
+    text, newer, older = format_feedback_page(product, page, avg_rating, toward_newer=direction == 'n')
     await callback_query.message.edit_text(
-        message_text,
-        reply_markup=builder.as_markup()
+        text,
+        reply_markup=get_feedback_page_keyboard(product_id, newer, older)
     )
     
     # Отвечаем на колбэк
@@ -365,8 +1125,16 @@ async def process_feedback_text(message: Message, state: FSMContext):
         await state.clear()
         return
     
+    # Слишком длинный отзыв не поместится на страницу просмотра отзывов
+    if message.text and telegram_length(message.text) > FEEDBACK_MAX_LENGTH:
+        await message.answer(
+            f"⚠️ Отзыв слишком длинный ({telegram_length(message.text)} символов, "
+            f"максимум {FEEDBACK_MAX_LENGTH}). Пожалуйста, сократите его и отправьте еще раз."
+        )
+        return
+    
     # Сохраняем отзыв в базе данных
-    feedback_id = db.add_feedback(message.from_user.id, product_id, message.text)
+    feedback_id = await db.add_feedback(message.from_user.id, product_id, message.text)
     
     # Сбрасываем состояние
     await state.clear()
@@ -392,17 +1160,17 @@ async def process_rating_selection(callback_query: CallbackQuery, state: FSMCont
     rating = int(parts[3])
     
     # Получаем информацию о продукте
-    product = db.get_product_by_id(product_id)
+    product = await db.get_product_by_id(product_id)
     
     if not product:
         await callback_query.answer("Продукт не найден")
         return
     
     # Сохраняем рейтинг в базе данных
-    db.add_rating(callback_query.from_user.id, product_id, rating)
+    await db.add_rating(callback_query.from_user.id, product_id, rating)
     
     # Получаем обновленный средний рейтинг
-    avg_rating = db.get_average_rating(product_id)
+    avg_rating = await db.get_average_rating(product_id)
     
     # Формируем текст благодарности
     stars = "⭐" * rating
@@ -1,6 +1,6 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
@@ -83,4 +83,73 @@ def get_rating_keyboard(product_id: int) -> InlineKeyboardMarkup:
     ))
     
     builder.adjust(5, 1)
+    return builder.as_markup()
+
+def get_feedback_page_keyboard(product_id: int, newer: Optional[Tuple[str, int]],
+                               older: Optional[Tuple[str, int]]) -> InlineKeyboardMarkup:
+    """
+    Создание инлайн-клавиатуры для листания отзывов о продукте
+    
+    :param product_id: ID продукта
+    :param newer: Курсор (created_at, id) страницы с более новыми отзывами или None
+    :param older: Курсор (created_at, id) страницы с более старыми отзывами или None
+    :return: Объект инлайн-клавиатуры
+    """
+    builder = InlineKeyboardBuilder()
+    navigation = 0
+    
+    # Курсор передаем в данных колбэка: fbpage_<продукт>_<направление>_<id>_<created_at>
+    if newer:
+        builder.add(InlineKeyboardButton(
+            text="◀️ Новее",
+            callback_data=f"fbpage_{product_id}_n_{newer[1]}_{newer[0]}"
+        ))
+        navigation += 1
+    
+    if older:
+        builder.add(InlineKeyboardButton(
+            text="Старше ▶️",
+            callback_data=f"fbpage_{product_id}_o_{older[1]}_{older[0]}"
+        ))
+        navigation += 1
+    
+    # Добавляем кнопку "Назад к категориям"
+    builder.add(InlineKeyboardButton(
+        text="◀️ Назад к категориям",
+        callback_data="back_to_categories"
+    ))
+    
+    if navigation:
+        builder.adjust(navigation, 1)
+    else:
+        builder.adjust(1)
+    return builder.as_markup()
+
+def get_search_page_keyboard(offset: int, page_size: int, has_more: bool) -> Optional[InlineKeyboardMarkup]:
+    """
+    Создание инлайн-клавиатуры для листания результатов поиска
+    
+    :param offset: Смещение текущей страницы
+    :param page_size: Количество результатов на странице
+    :param has_more: Есть ли следующая страница
+    :return: Объект инлайн-клавиатуры или None, если листать некуда
+    """
+    builder = InlineKeyboardBuilder()
+    
+    if offset > 0:
+        builder.add(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=f"search_page_{max(0, offset - page_size)}"
+        ))
+    
+    if has_more:
+        builder.add(InlineKeyboardButton(
+            text="Далее ▶️",
+            callback_data=f"search_page_{offset + page_size}"
+        ))
+    
+    if offset == 0 and not has_more:
+        return None
+    
+    builder.adjust(2)
     return builder.as_markup()
\ No newline at end of file
@@ -0,0 +1,148 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+class Leaderboard:
+    """
+    Рейтинг продуктов по байесовской оценке, общий и по категориям.
+
+    Оценка продукта - среднее его оценок, «притянутое» к среднему по всем
+    продуктам: (prior_weight * prior_mean + сумма оценок) / (prior_weight + количество).
+    Продукт с одной пятеркой не обгоняет продукт с тысячами оценок около 4.8.
+
+    Продукты хранятся в отсортированных списках, поэтому топ-k выдается за O(k).
+    Новые оценки только помечают продукт как измененный; перед выдачей топа
+    для измененных продуктов перечитываются агрегаты из базы данных.
+    Среднее по всем продуктам (prior_mean) пересчитывается при полной загрузке.
+    """
+
+    def __init__(self, prior_weight: float = 10.0):
+        """
+        Инициализация пустого рейтинга
+
+        :param prior_weight: Вес среднего по всем продуктам (в количестве оценок)
+        """
+        self.prior_weight = prior_weight
+        self.prior_mean = 0.0
+        self.loaded = False
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        # Отсортированные ключи (-оценка, ID продукта): общий список и списки категорий
+        self._overall: List[Tuple[float, int]] = []
+        self._by_category: Dict[str, List[Tuple[float, int]]] = {}
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def _score(self, ratings_count: int, ratings_sum: int) -> float:
+        """
+        Байесовская оценка продукта
+        """
+        return (self.prior_weight * self.prior_mean + ratings_sum) / (self.prior_weight + ratings_count)
+
+    def _remove(self, product_id: int) -> None:
+        """
+        Удаление продукта из отсортированных списков
+        """
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return
+
+        key = (-entry['score'], product_id)
+        for keys in (self._overall, self._by_category.get(entry['category'], [])):
+            index = bisect.bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index]
+
+    def _put(self, db: Any, product_id: int, ratings_count: int, ratings_sum: int) -> None:
+        """
+        Добавление или обновление продукта в отсортированных списках
+        """
+        self._remove(product_id)
+
+        product = db.get_product_by_id(product_id)
+        if product is None or not ratings_count:
+            return
+
+        score = self._score(ratings_count, ratings_sum)
+        self._entries[product_id] = {
+            'id': product_id,
+            'name': product['name'],
+            'category': product['category'],
+            'avg_rating': ratings_sum / ratings_count,
+            'ratings_count': ratings_count,
+            'score': score
+        }
+
+        key = (-score, product_id)
+        bisect.insort(self._overall, key)
+        bisect.insort(self._by_category.setdefault(product['category'], []), key)
+
+    def load(self, db: Any) -> None:
+        """
+        Полная загрузка рейтинга из агрегатов и пересчет среднего по всем продуктам
+
+        :param db: Объект Database
+        """
+        totals = db.get_rating_totals()
+        ratings_count = sum(row['ratings_count'] for row in totals)
+        ratings_sum = sum(row['ratings_sum'] for row in totals)
+
+        with self._lock:
+            self.prior_mean = ratings_sum / ratings_count if ratings_count else 0.0
+            self._entries = {}
+            self._overall = []
+            self._by_category = {}
+            self._dirty.clear()
+            for row in totals:
+                self._put(db, row['product_id'], row['ratings_count'], row['ratings_sum'])
+            self.loaded = True
+
+    def note_write(self, kind: str, row: Tuple) -> None:
+        """
+        Слушатель записей AsyncDatabase: помечает продукт новой оценки как измененный
+
+        :param kind: Тип записи (feedback или ratings)
+        :param row: Параметры записи (user_id, product_id, rating)
+        """
+        if kind == 'ratings':
+            with self._lock:
+                self._dirty.add(row[1])
+
+    def refresh(self, db: Any) -> None:
+        """
+        Перечитывание агрегатов измененных продуктов (при первом вызове - полная загрузка)
+
+        :param db: Объект Database
+        """
+        if not self.loaded:
+            self.load(db)
+            return
+
+        with self._lock:
+            dirty = list(self._dirty)
+            self._dirty.clear()
+        if not dirty:
+            return
+
+        totals = {row['product_id']: row for row in db.get_rating_totals(dirty)}
+        with self._lock:
+            for product_id in dirty:
+                row = totals.get(product_id)
+                if row:
+                    self._put(db, product_id, row['ratings_count'], row['ratings_sum'])
+                else:
+                    self._remove(product_id)
+
+    def top(self, db: Any, limit: int = 5, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Получение лучших продуктов по байесовской оценке
+
+        :param db: Объект Database
+        :param limit: Количество продуктов
+        :param category: Категория (None - все продукты)
+        :return: Список словарей с ключами id, name, category, avg_rating, ratings_count и score
+        """
+        self.refresh(db)
+
+        with self._lock:
+            keys = self._overall if category is None else self._by_category.get(category, [])
+            return [dict(self._entries[product_id]) for _, product_id in keys[:limit]]
\ No newline at end of file
@@ -1,10 +1,21 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN, DB_NAME
-from database import Database
-from handlers import router  # Импортируем роутер из handlers
+import secrets
+import signal
+from typing import TYPE_CHECKING
+from config import (
+    BOT_TOKEN, ADMIN_IDS, STATS_REFRESH_INTERVAL, ANALYSIS_INTERVAL,
+    DELIVERY_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONCURRENCY, WEBHOOK_DRAIN_TIMEOUT
+)
+
+# aiogram, обработчики и база данных импортируются внутри функций: процессы отрисовки
+# графиков запускаются методом spawn и заново импортируют запущенный файл (main.py),
+# им нужен только модуль chart_worker
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+    from feedback_analyzer import FeedbackAnalyzer
+    from stats_scheduler import StatsScheduler
 
 # Настройка логирования
 logging.basicConfig(
@@ -13,14 +24,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def start_background_tasks(stats_scheduler: 'StatsScheduler', feedback_analyzer: 'FeedbackAnalyzer') -> None:
+    """
+    Запуск фоновых задач бота (в работающем цикле событий)
+    
+    :param stats_scheduler: Планировщик пересчета отчета /stats
+    :param feedback_analyzer: Фоновый анализ отзывов
+    """
+    if ANALYSIS_INTERVAL > 0:
+        # Тональность и ключевые слова новых отзывов анализируются в фоне порциями
+        feedback_analyzer.start()
+    if STATS_REFRESH_INTERVAL > 0 and ADMIN_IDS:
+        # Отчет /stats пересчитывается в фоне и отправляется из готового снимка;
+        # без администраторов запрашивать его некому, и он не пересчитывается
+        stats_scheduler.start()
+
+async def run_webhook(bot: 'Bot', dp: 'Dispatcher') -> None:
+    """
+    Получение обновлений через вебхук до сигнала остановки.
+    Вебхук не удаляется при остановке, поэтому Telegram накапливает обновления
+    до следующего запуска и не теряет их.
+    """
+    from webhook_server import WebhookServer
+    
+    if not WEBHOOK_URL:
+        raise RuntimeError("Для режима webhook укажите WEBHOOK_URL")
+    
+    secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    server = WebhookServer(dp, bot, WEBHOOK_PATH, secret_token, WEBHOOK_MAX_CONCURRENCY, WEBHOOK_DRAIN_TIMEOUT)
+    
+    # Остановка по SIGINT/SIGTERM (в Windows - по Ctrl+C через отмену задачи)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        await server.start(WEBHOOK_HOST, WEBHOOK_PORT)
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(max(WEBHOOK_MAX_CONCURRENCY, 1), 100),
+            drop_pending_updates=False
+        )
+        await stop.wait()
+    finally:
+        logger.info("Остановка вебхука...")
+        await server.close()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await bot.session.close()
+
 async def main():
     """
     Асинхронная функция запуска бота
     """
+    from aiogram import Bot, Dispatcher
+    from aiogram.fsm.storage.memory import MemoryStorage
+    # Импортируем роутер, базу данных и отрисовку графиков из handlers
+    from handlers import router, db, chart_renderer, stats_scheduler, feedback_analyzer
+    
     # Инициализация базы данных
     logger.info("Инициализация базы данных...")
-    db = Database(DB_NAME)
-    db.create_tables()
+    await db.create_tables()
+    # Загружаем каталог продуктов в кэш, чтобы выбор продуктов не обращался к базе
+    await db.get_products()
     logger.info("База данных инициализирована")
     
     # Инициализация бота и диспетчера
@@ -32,8 +104,22 @@ async def main():
     
     # Запуск поллинга
     logger.info("Бот запущен и готов к работе!")
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        start_background_tasks(stats_scheduler, feedback_analyzer)
+        if DELIVERY_MODE == 'webhook':
+            await run_webhook(bot, dp)
+        else:
+            # Обновления, накопленные при работе через вебхук, не сбрасываем - их заберет поллинг
+            await bot.delete_webhook(drop_pending_updates=False)
+            await dp.start_polling(bot)
+    finally:
+        await stats_scheduler.close()
+        await feedback_analyzer.close()
+        # Закрываем соединения с базой данных
+        await db.close()
+        logger.info("Соединения с базой данных закрыты")
+        # Останавливаем процессы отрисовки графиков
+        chart_renderer.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,158 @@
+import argparse
+import sys
+
+from config import DB_NAME, DB_READ_POOL_SIZE, DB_TIMEOUT
+from database import Database
+from sketch_analytics import SketchAnalytics
+
+def verify_rating_stats(db: Database) -> int:
+    """
+    Сверка агрегатов рейтингов с таблицей ratings
+
+    :param db: Объект базы данных
+    :return: Код завершения (0 - расхождений нет)
+    """
+    mismatches = db.verify_rating_stats()
+    if not mismatches:
+        print("Агрегаты рейтингов совпадают с таблицей ratings")
+        return 0
+
+    for mismatch in mismatches:
+        print(f"Продукт {mismatch['product_id']}: ожидалось {mismatch['expected']}, в агрегате {mismatch['actual']}")
+    print(f"Найдено расхождений: {len(mismatches)}")
+    return 1
+
+def rebuild_rating_stats(db: Database) -> int:
+    """
+    Пересчет агрегатов рейтингов по таблице ratings
+
+    :param db: Объект базы данных
+    :return: Код завершения
+    """
+    db.rebuild_rating_stats()
+    print("Агрегаты рейтингов пересчитаны")
+    return 0
+
+def verify_user_stats(db: Database) -> int:
+    """
+    Сверка счетчиков активности пользователей с исходными таблицами
+
+    :param db: Объект базы данных
+    :return: Код завершения (0 - расхождений нет)
+    """
+    mismatch = db.verify_user_stats()
+    if not mismatch:
+        print("Счетчики активности пользователей совпадают с исходными таблицами")
+        return 0
+
+    print(f"Ожидалось {mismatch['expected']}, в счетчиках {mismatch['actual']}")
+    return 1
+
+def rebuild_user_stats(db: Database) -> int:
+    """
+    Пересчет счетчиков активности пользователей
+
+    :param db: Объект базы данных
+    :return: Код завершения
+    """
+    db.rebuild_user_stats()
+    print("Счетчики активности пользователей пересчитаны")
+    return 0
+
+def verify_activity_rollups(db: Database) -> int:
+    """
+    Сверка почасовых и посуточных сводных таблиц с таблицами feedback и ratings
+
+    :param db: Объект базы данных
+    :return: Код завершения (0 - расхождений нет)
+    """
+    mismatches = db.verify_activity_rollups()
+    if not mismatches:
+        print("Сводные таблицы активности совпадают с таблицами feedback и ratings")
+        return 0
+
+    for mismatch in mismatches:
+        print(f"{mismatch['table']} {mismatch['bucket']}, продукт {mismatch['product_id']}: "
+              f"ожидалось {mismatch['expected']}, в сводной таблице {mismatch['actual']}")
+    print(f"Найдено расхождений: {len(mismatches)}")
+    return 1
+
+def rebuild_activity_rollups(db: Database) -> int:
+    """
+    Пересчет почасовых и посуточных сводных таблиц
+
+    :param db: Объект базы данных
+    :return: Код завершения
+    """
+    db.rebuild_activity_rollups()
+    print("Сводные таблицы активности пересчитаны")
+    return 0
+
+def verify_sketches(db: Database) -> int:
+    """
+    Обновление скетчей и сверка оценок количества пользователей с точным подсчетом.
+    Оценка считается корректной, если ошибка не превышает трех стандартных ошибок HyperLogLog.
+
+    :param db: Объект базы данных
+    :return: Код завершения (0 - все оценки в пределах погрешности)
+    """
+    sketches = SketchAnalytics(db)
+    sketches.refresh()
+    exact = db.count_user_stats()
+
+    code = 0
+    for source, column in (('feedback', 'users_with_feedback'), ('ratings', 'users_with_ratings')):
+        result = sketches.distinct_users(source)
+        expected = exact[column]
+        error = abs(result['estimate'] - expected) / expected if expected else float(result['estimate'] != 0)
+        ok = error <= 3 * result['relative_error']
+        print(f"{column}: точно {expected}, оценка {result['estimate']}, ошибка {error:.2%} "
+              f"(допустимо {3 * result['relative_error']:.2%}){'' if ok else ' - ПРЕВЫШЕНА'}")
+        if not ok:
+            code = 1
+
+    return code
+
+def rebuild_sketches(db: Database) -> int:
+    """
+    Построение скетчей заново по всем отзывам и рейтингам
+
+    :param db: Объект базы данных
+    :return: Код завершения
+    """
+    sketches = SketchAnalytics(db)
+    sketches.reset()
+    sketches.refresh()
+    print("Скетчи построены заново")
+    return 0
+
+# Доступные команды обслуживания
+COMMANDS = {
+    'verify-rating-stats': verify_rating_stats,
+    'rebuild-rating-stats': rebuild_rating_stats,
+    'verify-user-stats': verify_user_stats,
+    'rebuild-user-stats': rebuild_user_stats,
+    'verify-activity-rollups': verify_activity_rollups,
+    'rebuild-activity-rollups': rebuild_activity_rollups,
+    'verify-sketches': verify_sketches,
+    'rebuild-sketches': rebuild_sketches,
+}
+
+def main() -> int:
+    """
+    Запуск команды обслуживания базы данных
+    """
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных бота")
+    parser.add_argument('command', choices=sorted(COMMANDS), help="Команда")
+    parser.add_argument('--db', default=DB_NAME, help="Файл базы данных")
+    args = parser.parse_args()
+
+    db = Database(args.db, DB_READ_POOL_SIZE, DB_TIMEOUT)
+    try:
+        db.create_tables()
+        return COMMANDS[args.command](db)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
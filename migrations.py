@@ -0,0 +1,694 @@
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    """
+    Создание основных таблиц и заполнение каталога продуктов
+
+    :param conn: Соединение с базой данных
+    """
+    # Таблица пользователей
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER UNIQUE,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Таблица продуктов/услуг
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE,
+        category TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Предварительное заполнение таблицы продуктов
+    conn.execute('''
+    INSERT OR IGNORE INTO products (name, category) VALUES
+    ('iPhone 15', 'Смартфоны'),
+    ('Samsung Galaxy S23', 'Смартфоны'),
+    ('MacBook Pro', 'Ноутбуки'),
+    ('Dell XPS 13', 'Ноутбуки'),
+    ('AirPods Pro', 'Наушники'),
+    ('Apple Watch Series 9', 'Умные часы'),
+    ('iPad Pro', 'Планшеты'),
+    ('Доставка курьером', 'Доставка'),
+    ('Техническая поддержка', 'Обслуживание клиентов')
+    ''')
+
+    # Таблица отзывов
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        product_id INTEGER,
+        text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''')
+
+    # Таблица рейтингов
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ratings (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        product_id INTEGER,
+        rating INTEGER CHECK (rating BETWEEN 1 AND 5),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id),
+        FOREIGN KEY (product_id) REFERENCES products (id),
+        UNIQUE (user_id, product_id)
+    )
+    ''')
+
+def _add_query_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Индексы под запросы из database.py
+
+    :param conn: Соединение с базой данных
+    """
+    # Отзывы о продукте, отсортированные по дате (get_feedback_page)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_feedback_product_created ON feedback (product_id, created_at)')
+    # Отзывы пользователя (статистика по пользователям)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_feedback_user ON feedback (user_id)')
+    # Рейтинги продукта (get_average_rating и агрегаты по продуктам)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ratings_product ON ratings (product_id)')
+
+def rebuild_rating_stats(conn: sqlite3.Connection) -> None:
+    """
+    Пересчет агрегатов рейтингов по продуктам из таблицы ratings
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('DELETE FROM product_rating_stats')
+    conn.execute('''
+    INSERT INTO product_rating_stats
+        (product_id, ratings_count, ratings_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+    SELECT product_id, COUNT(*), SUM(rating),
+           SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+    FROM ratings
+    GROUP BY product_id
+    ''')
+
+def _add_rating_stats(conn: sqlite3.Connection) -> None:
+    """
+    Агрегаты рейтингов по продуктам (количество, сумма и гистограмма 1-5),
+    поддерживаемые триггерами на таблице ratings.
+    Изменение оценки выполняется через UPDATE (INSERT ... ON CONFLICT DO UPDATE),
+    INSERT OR REPLACE для рейтингов не используется: без PRAGMA recursive_triggers
+    он не вызывает триггер удаления старой строки.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS product_rating_stats (
+        product_id INTEGER PRIMARY KEY,
+        ratings_count INTEGER NOT NULL DEFAULT 0,
+        ratings_sum INTEGER NOT NULL DEFAULT 0,
+        rating_1 INTEGER NOT NULL DEFAULT 0,
+        rating_2 INTEGER NOT NULL DEFAULT 0,
+        rating_3 INTEGER NOT NULL DEFAULT 0,
+        rating_4 INTEGER NOT NULL DEFAULT 0,
+        rating_5 INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_insert AFTER INSERT ON ratings
+    BEGIN
+        INSERT INTO product_rating_stats
+            (product_id, ratings_count, ratings_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+        VALUES (NEW.product_id, 1, NEW.rating,
+                NEW.rating = 1, NEW.rating = 2, NEW.rating = 3, NEW.rating = 4, NEW.rating = 5)
+        ON CONFLICT (product_id) DO UPDATE SET
+            ratings_count = ratings_count + 1,
+            ratings_sum = ratings_sum + excluded.ratings_sum,
+            rating_1 = rating_1 + excluded.rating_1,
+            rating_2 = rating_2 + excluded.rating_2,
+            rating_3 = rating_3 + excluded.rating_3,
+            rating_4 = rating_4 + excluded.rating_4,
+            rating_5 = rating_5 + excluded.rating_5;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_delete AFTER DELETE ON ratings
+    BEGIN
+        UPDATE product_rating_stats SET
+            ratings_count = ratings_count - 1,
+            ratings_sum = ratings_sum - OLD.rating,
+            rating_1 = rating_1 - (OLD.rating = 1),
+            rating_2 = rating_2 - (OLD.rating = 2),
+            rating_3 = rating_3 - (OLD.rating = 3),
+            rating_4 = rating_4 - (OLD.rating = 4),
+            rating_5 = rating_5 - (OLD.rating = 5)
+        WHERE product_id = OLD.product_id;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_update AFTER UPDATE OF rating, product_id ON ratings
+    BEGIN
+        UPDATE product_rating_stats SET
+            ratings_count = ratings_count - 1,
+            ratings_sum = ratings_sum - OLD.rating,
+            rating_1 = rating_1 - (OLD.rating = 1),
+            rating_2 = rating_2 - (OLD.rating = 2),
+            rating_3 = rating_3 - (OLD.rating = 3),
+            rating_4 = rating_4 - (OLD.rating = 4),
+            rating_5 = rating_5 - (OLD.rating = 5)
+        WHERE product_id = OLD.product_id;
+
+        INSERT INTO product_rating_stats
+            (product_id, ratings_count, ratings_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+        VALUES (NEW.product_id, 1, NEW.rating,
+                NEW.rating = 1, NEW.rating = 2, NEW.rating = 3, NEW.rating = 4, NEW.rating = 5)
+        ON CONFLICT (product_id) DO UPDATE SET
+            ratings_count = ratings_count + 1,
+            ratings_sum = ratings_sum + excluded.ratings_sum,
+            rating_1 = rating_1 + excluded.rating_1,
+            rating_2 = rating_2 + excluded.rating_2,
+            rating_3 = rating_3 + excluded.rating_3,
+            rating_4 = rating_4 + excluded.rating_4,
+            rating_5 = rating_5 + excluded.rating_5;
+    END
+    ''')
+
+    rebuild_rating_stats(conn)
+
+def _add_created_at_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Индексы для потокового чтения отзывов и рейтингов в порядке (created_at, id)
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback (created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ratings_created ON ratings (created_at)')
+
+def rebuild_user_stats(conn: sqlite3.Connection) -> None:
+    """
+    Пересчет счетчиков активности пользователей отдельными индексными подзапросами
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    INSERT OR REPLACE INTO user_activity_stats (id, total_users, users_with_feedback, users_with_ratings)
+    SELECT 1,
+           (SELECT COUNT(*) FROM users),
+           (SELECT COUNT(*) FROM users u WHERE EXISTS (SELECT 1 FROM feedback f WHERE f.user_id = u.user_id)),
+           (SELECT COUNT(*) FROM users u WHERE EXISTS (SELECT 1 FROM ratings r WHERE r.user_id = u.user_id))
+    ''')
+
+def _add_user_stats(conn: sqlite3.Connection) -> None:
+    """
+    Счетчики активности пользователей (всего, с отзывами, с рейтингами),
+    поддерживаемые триггерами. Каждый триггер проверяет только строки одного
+    пользователя по индексу, поэтому стоимость записи не зависит от его активности.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS user_activity_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_users INTEGER NOT NULL DEFAULT 0,
+        users_with_feedback INTEGER NOT NULL DEFAULT 0,
+        users_with_ratings INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users
+    BEGIN
+        UPDATE user_activity_stats SET
+            total_users = total_users + 1,
+            users_with_feedback = users_with_feedback
+                + EXISTS (SELECT 1 FROM feedback WHERE user_id = NEW.user_id),
+            users_with_ratings = users_with_ratings
+                + EXISTS (SELECT 1 FROM ratings WHERE user_id = NEW.user_id)
+        WHERE id = 1;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE user_activity_stats SET
+            total_users = total_users - 1,
+            users_with_feedback = users_with_feedback
+                - EXISTS (SELECT 1 FROM feedback WHERE user_id = OLD.user_id),
+            users_with_ratings = users_with_ratings
+                - EXISTS (SELECT 1 FROM ratings WHERE user_id = OLD.user_id)
+        WHERE id = 1;
+    END
+    ''')
+
+    # Первый отзыв или рейтинг зарегистрированного пользователя увеличивает счетчик,
+    # удаление последнего - уменьшает
+    for table, column in (('feedback', 'users_with_feedback'), ('ratings', 'users_with_ratings')):
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_user_stats_insert AFTER INSERT ON {table}
+        WHEN EXISTS (SELECT 1 FROM users WHERE user_id = NEW.user_id)
+         AND NOT EXISTS (SELECT 1 FROM {table} WHERE user_id = NEW.user_id AND id != NEW.id)
+        BEGIN
+            UPDATE user_activity_stats SET {column} = {column} + 1 WHERE id = 1;
+        END
+        ''')
+
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_user_stats_delete AFTER DELETE ON {table}
+        WHEN EXISTS (SELECT 1 FROM users WHERE user_id = OLD.user_id)
+         AND NOT EXISTS (SELECT 1 FROM {table} WHERE user_id = OLD.user_id)
+        BEGIN
+            UPDATE user_activity_stats SET {column} = {column} - 1 WHERE id = 1;
+        END
+        ''')
+
+    rebuild_user_stats(conn)
+
+def _add_feedback_search(conn: sqlite3.Connection) -> None:
+    """
+    Полнотекстовый индекс FTS5 по текстам отзывов.
+    Таблица хранит только индекс (content='feedback'), тексты берутся из feedback,
+    а синхронизация выполняется триггерами при вставке, изменении и удалении отзывов.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+        text,
+        content = 'feedback',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_insert AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO feedback_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_delete AFTER DELETE ON feedback
+    BEGIN
+        INSERT INTO feedback_fts (feedback_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_update AFTER UPDATE OF text ON feedback
+    BEGIN
+        INSERT INTO feedback_fts (feedback_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+        INSERT INTO feedback_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END
+    ''')
+
+    # Индексируем уже существующие отзывы
+    conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+
+# Сводные таблицы активности по интервалам времени: (таблица, выражение начала интервала)
+ACTIVITY_ROLLUPS = (
+    ('activity_hourly', "strftime('%Y-%m-%d %H:00:00', {created_at})"),
+    ('activity_daily', "date({created_at})"),
+)
+
+def rebuild_activity_rollups(conn: sqlite3.Connection) -> None:
+    """
+    Пересчет почасовых и посуточных сводных таблиц из таблиц feedback и ratings
+
+    :param conn: Соединение с базой данных
+    """
+    for table, bucket in ACTIVITY_ROLLUPS:
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'''
+        INSERT INTO {table} (bucket, product_id, feedback_count, ratings_count, ratings_sum)
+        SELECT bucket, product_id, SUM(feedback_count), SUM(ratings_count), SUM(ratings_sum)
+        FROM (
+            SELECT {bucket.format(created_at='created_at')} as bucket, product_id,
+                   COUNT(*) as feedback_count, 0 as ratings_count, 0 as ratings_sum
+            FROM feedback
+            GROUP BY 1, 2
+            UNION ALL
+            SELECT {bucket.format(created_at='created_at')}, product_id, 0, COUNT(*), SUM(rating)
+            FROM ratings
+            GROUP BY 1, 2
+        )
+        GROUP BY bucket, product_id
+        ''')
+
+def _add_activity_rollups(conn: sqlite3.Connection) -> None:
+    """
+    Почасовые и посуточные сводные таблицы: количество отзывов, количество
+    и сумма рейтингов по продуктам, поддерживаемые триггерами.
+    Графики по времени и статистика за период читают только нужные интервалы.
+
+    Рейтинги учитываются так же, как в таблице ratings: измененная оценка
+    вычитается из интервала старой строки и добавляется в интервал новой.
+
+    :param conn: Соединение с базой данных
+    """
+    for table, _ in ACTIVITY_ROLLUPS:
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            bucket TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            feedback_count INTEGER NOT NULL DEFAULT 0,
+            ratings_count INTEGER NOT NULL DEFAULT 0,
+            ratings_sum INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, product_id)
+        ) WITHOUT ROWID
+        ''')
+
+    def add(row: str, feedback: str, ratings: str, ratings_sum: str) -> str:
+        # Добавление значений в интервалы строки row (NEW или OLD) во всех сводных таблицах
+        return '\n'.join(f'''
+            INSERT INTO {table} (bucket, product_id, feedback_count, ratings_count, ratings_sum)
+            VALUES ({bucket.format(created_at=f'{row}.created_at')}, {row}.product_id,
+                    {feedback}, {ratings}, {ratings_sum})
+            ON CONFLICT (bucket, product_id) DO UPDATE SET
+                feedback_count = feedback_count + excluded.feedback_count,
+                ratings_count = ratings_count + excluded.ratings_count,
+                ratings_sum = ratings_sum + excluded.ratings_sum;''' for table, bucket in ACTIVITY_ROLLUPS)
+
+    def subtract(row: str, feedback: str, ratings: str, ratings_sum: str) -> str:
+        # Вычитание значений из интервалов строки row во всех сводных таблицах
+        return '\n'.join(f'''
+            UPDATE {table} SET
+                feedback_count = feedback_count - {feedback},
+                ratings_count = ratings_count - {ratings},
+                ratings_sum = ratings_sum - {ratings_sum}
+            WHERE bucket = {bucket.format(created_at=f'{row}.created_at')} AND product_id = {row}.product_id;'''
+            for table, bucket in ACTIVITY_ROLLUPS)
+
+    triggers = {
+        'trg_feedback_rollup_insert': ('AFTER INSERT ON feedback', add('NEW', '1', '0', '0')),
+        'trg_feedback_rollup_delete': ('AFTER DELETE ON feedback', subtract('OLD', '1', '0', '0')),
+        'trg_feedback_rollup_update': (
+            'AFTER UPDATE OF product_id, created_at ON feedback',
+            subtract('OLD', '1', '0', '0') + add('NEW', '1', '0', '0')
+        ),
+        'trg_ratings_rollup_insert': ('AFTER INSERT ON ratings', add('NEW', '0', '1', 'NEW.rating')),
+        'trg_ratings_rollup_delete': ('AFTER DELETE ON ratings', subtract('OLD', '0', '1', 'OLD.rating')),
+        'trg_ratings_rollup_update': (
+            'AFTER UPDATE OF rating, product_id, created_at ON ratings',
+            subtract('OLD', '0', '1', 'OLD.rating') + add('NEW', '0', '1', 'NEW.rating')
+        ),
+    }
+
+    for name, (event, body) in triggers.items():
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {name} {event}
+        BEGIN{body}
+        END
+        ''')
+
+    rebuild_activity_rollups(conn)
+
+def _add_sketch_tables(conn: sqlite3.Connection) -> None:
+    """
+    Таблицы приближенной аналитики: суточные скетчи (HyperLogLog пользователей
+    и гистограммы оценок) и курсоры (created_at, id), до которых строки уже учтены.
+    Скетчи заполняются SketchAnalytics.refresh по мере чтения новых строк.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS daily_sketches (
+        metric TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        PRIMARY KEY (metric, bucket, product_id)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS sketch_cursors (
+        source TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        last_id INTEGER NOT NULL
+    )
+    ''')
+
+def _add_feedback_analysis(conn: sqlite3.Connection) -> None:
+    """
+    Результаты анализа текстов отзывов (тональность и ключевые слова) и их агрегаты
+    по продуктам и дням, поддерживаемые триггерами. Результаты записывает фоновый
+    обработчик FeedbackAnalyzer, курсор обработки хранится в worker_cursors.
+    Удаление отзыва удаляет его результаты анализа.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS feedback_analysis (
+        feedback_id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        sentiment REAL NOT NULL,
+        label INTEGER NOT NULL
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS feedback_keywords (
+        feedback_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        keyword TEXT NOT NULL,
+        negative INTEGER NOT NULL,
+        PRIMARY KEY (feedback_id, keyword)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS product_sentiment_stats (
+        product_id INTEGER PRIMARY KEY,
+        analyzed_count INTEGER NOT NULL DEFAULT 0,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        sentiment_sum REAL NOT NULL DEFAULT 0
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS sentiment_daily (
+        bucket TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        analyzed_count INTEGER NOT NULL DEFAULT 0,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        sentiment_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, product_id)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS keyword_stats (
+        product_id INTEGER NOT NULL,
+        keyword TEXT NOT NULL,
+        mentions INTEGER NOT NULL DEFAULT 0,
+        negative_mentions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (product_id, keyword)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS worker_cursors (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+    ''')
+
+    # Агрегаты тональности: (таблица, ключ, значения ключа новой строки, условие для старой строки)
+    sentiment_rollups = (
+        ('product_sentiment_stats', 'product_id', 'NEW.product_id', 'product_id = OLD.product_id'),
+        ('sentiment_daily', 'bucket, product_id', 'NEW.bucket, NEW.product_id',
+         'bucket = OLD.bucket AND product_id = OLD.product_id'),
+    )
+
+    for table, key, values, condition in sentiment_rollups:
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_analysis_{table}_insert AFTER INSERT ON feedback_analysis
+        BEGIN
+            INSERT INTO {table} ({key}, analyzed_count, positive_count, negative_count, sentiment_sum)
+            VALUES ({values}, 1, NEW.label = 1, NEW.label = -1, NEW.sentiment)
+            ON CONFLICT ({key}) DO UPDATE SET
+                analyzed_count = analyzed_count + 1,
+                positive_count = positive_count + excluded.positive_count,
+                negative_count = negative_count + excluded.negative_count,
+                sentiment_sum = sentiment_sum + excluded.sentiment_sum;
+        END
+        ''')
+
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_analysis_{table}_delete AFTER DELETE ON feedback_analysis
+        BEGIN
+            UPDATE {table} SET
+                analyzed_count = analyzed_count - 1,
+                positive_count = positive_count - (OLD.label = 1),
+                negative_count = negative_count - (OLD.label = -1),
+                sentiment_sum = sentiment_sum - OLD.sentiment
+            WHERE {condition};
+        END
+        ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_keywords_stats_insert AFTER INSERT ON feedback_keywords
+    BEGIN
+        INSERT INTO keyword_stats (product_id, keyword, mentions, negative_mentions)
+        VALUES (NEW.product_id, NEW.keyword, 1, NEW.negative)
+        ON CONFLICT (product_id, keyword) DO UPDATE SET
+            mentions = mentions + 1,
+            negative_mentions = negative_mentions + excluded.negative_mentions;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_keywords_stats_delete AFTER DELETE ON feedback_keywords
+    BEGIN
+        UPDATE keyword_stats SET
+            mentions = mentions - 1,
+            negative_mentions = negative_mentions - OLD.negative
+        WHERE product_id = OLD.product_id AND keyword = OLD.keyword;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_feedback_analysis_delete AFTER DELETE ON feedback
+    BEGIN
+        DELETE FROM feedback_analysis WHERE feedback_id = OLD.id;
+        DELETE FROM feedback_keywords WHERE feedback_id = OLD.id;
+    END
+    ''')
+
+def _add_product_rollup_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Индексы посуточных сводных таблиц по продукту для отчета /product_stats:
+    ключ сводных таблиц начинается с дня, поэтому без индекса выборка
+    по одному продукту просматривает дни всех продуктов
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_activity_daily_product ON activity_daily (product_id, bucket)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sentiment_daily_product ON sentiment_daily (product_id, bucket)')
+
+def _add_rating_change_ids(conn: sqlite3.Connection) -> None:
+    """
+    Монотонный номер изменения оценки (change_id) для курсоров скетчей.
+    Курсор (created_at, id) пропускал оценку, измененную в ту же секунду, что и курсор:
+    created_at хранится с точностью до секунды, а ID измененной строки не меняется.
+    Триггеры присваивают change_id больше всех существующих при добавлении и при
+    изменении оценки. Курсоры скетчей хранят ID отзыва или change_id оценки, поэтому
+    сохраненные скетчи удаляются и строятся заново при следующем обновлении.
+
+    :param conn: Соединение с базой данных
+    """
+    conn.execute('ALTER TABLE ratings ADD COLUMN change_id INTEGER')
+    conn.execute('UPDATE ratings SET change_id = id')
+    # Индекс нужен и для выборки новых изменений, и для MAX(change_id) в триггерах
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_ratings_change ON ratings (change_id)')
+
+    next_change_id = '(SELECT COALESCE(MAX(change_id), 0) + 1 FROM ratings)'
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_change_insert AFTER INSERT ON ratings
+    WHEN NEW.change_id IS NULL
+    BEGIN
+        UPDATE ratings SET change_id = {next_change_id} WHERE id = NEW.id;
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_change_update AFTER UPDATE OF rating, product_id ON ratings
+    BEGIN
+        UPDATE ratings SET change_id = {next_change_id} WHERE id = NEW.id;
+    END
+    ''')
+
+    conn.execute('DELETE FROM daily_sketches')
+    conn.execute('DROP TABLE sketch_cursors')
+    conn.execute('''
+    CREATE TABLE sketch_cursors (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+    ''')
+
+# Упорядоченный список миграций: (версия, описание, функция)
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, 'Основные таблицы и каталог продуктов', _create_base_tables),
+    (2, 'Индексы под запросы отзывов и рейтингов', _add_query_indexes),
+    (3, 'Агрегаты рейтингов по продуктам', _add_rating_stats),
+    (4, 'Индексы по дате создания отзывов и рейтингов', _add_created_at_indexes),
+    (5, 'Счетчики активности пользователей', _add_user_stats),
+    (6, 'Полнотекстовый поиск по отзывам', _add_feedback_search),
+    (7, 'Почасовые и посуточные сводные таблицы активности', _add_activity_rollups),
+    (8, 'Скетчи приближенной аналитики', _add_sketch_tables),
+    (9, 'Анализ тональности и ключевых слов отзывов', _add_feedback_analysis),
+    (10, 'Индексы сводных таблиц по продуктам', _add_product_rollup_indexes),
+    (11, 'Номера изменений оценок для курсоров скетчей', _add_rating_change_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Получение текущей версии схемы базы данных
+
+    :param conn: Соединение с базой данных
+    :return: Номер последней примененной миграции (0 для пустой базы)
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+
+    version = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0]
+    return version or 0
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """
+    Применение всех миграций новее текущей версии схемы.
+    Каждая миграция выполняется в отдельной транзакции.
+
+    :param conn: Соединение с базой данных (без открытой транзакции)
+    :return: Список примененных версий
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.commit()
+
+    current = get_schema_version(conn)
+    applied = []
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        logger.info("Применяется миграция %d: %s", version, description)
+        conn.execute('BEGIN')
+        migrate(conn)
+        conn.execute(
+            'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+            (version, description)
+        )
+        conn.commit()
+        applied.append(version)
+
+    return applied
\ No newline at end of file
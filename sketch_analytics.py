@@ -0,0 +1,175 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sketches import HyperLogLog, RatingHistogram
+
+class SketchAnalytics:
+    """
+    Приближенная аналитика на скетчах с постоянным объемом памяти.
+
+    Для каждого дня в базе хранятся скетч HyperLogLog авторов отзывов,
+    скетч HyperLogLog авторов оценок и гистограммы оценок по продуктам;
+    скетчи пользователей за все время хранятся отдельно, чтобы не объединять все дни.
+    Обновление читает только строки, добавленные после сохраненного курсора
+    (ID отзыва или change_id оценки, который растет и при изменении оценки),
+    по одной порции, и объединяет их с сохраненными скетчами. Скетчи периода, продукта
+    или категории получаются объединением суточных скетчей.
+
+    Количество различных пользователей оценивается с погрешностью HyperLogLog
+    (см. HyperLogLog). Гистограммы считают все выставленные оценки: измененная
+    оценка учитывается и в дне старой, и в дне новой оценки, поэтому при изменениях
+    гистограмма больше, чем агрегаты по текущим рейтингам, на число изменений.
+    """
+
+    # Источник -> метрика скетчей пользователей; метрика гистограмм оценок
+    USER_METRICS = {'feedback': 'feedback_users', 'ratings': 'rating_users'}
+    RATINGS_METRIC = 'ratings'
+    # Источник -> столбец порции с монотонным ключом курсора
+    CURSOR_COLUMNS = {'feedback': 'id', 'ratings': 'change_id'}
+    # День скетча пользователей за все время (меньше любой даты при сравнении строк)
+    ALL_TIME_BUCKET = '*'
+
+    def __init__(self, db: Any, precision: int = 12, chunk_size: int = 10000):
+        """
+        Инициализация аналитики
+
+        :param db: Объект Database
+        :param precision: Точность скетчей HyperLogLog
+        :param chunk_size: Количество строк в одной порции при чтении из базы
+        """
+        self.db = db
+        self.precision = precision
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+    def _iter_source_chunks(self, source: str, cursor: Optional[int]) -> Iterable[Dict[str, List[Any]]]:
+        """
+        Порции новых строк источника
+        """
+        if source == 'feedback':
+            return self.db.iter_feedback_chunks(self.chunk_size, after=cursor)
+        return self.db.iter_ratings_chunks(self.chunk_size, after=cursor)
+
+    def _fold_chunk(self, source: str, chunk: Dict[str, List[Any]]) -> None:
+        """
+        Объединение порции строк с сохраненными скетчами ее дней
+        """
+        metric = self.USER_METRICS[source]
+        days = [created_at[:10] for created_at in chunk['created_at']]
+
+        users: Dict[str, HyperLogLog] = {}
+        histograms: Dict[Tuple[str, int], RatingHistogram] = {}
+
+        for row in self.db.get_sketches(metric, buckets=[self.ALL_TIME_BUCKET] + sorted(set(days))):
+            users[row['bucket']] = HyperLogLog(self.precision, row['data'])
+        all_time = users.setdefault(self.ALL_TIME_BUCKET, HyperLogLog(self.precision))
+        for day, user_id in zip(days, chunk['user_id']):
+            users.setdefault(day, HyperLogLog(self.precision)).add(user_id)
+            all_time.add(user_id)
+
+        sketches = [(metric, day, 0, sketch.to_bytes()) for day, sketch in users.items()]
+
+        if source == 'ratings':
+            for row in self.db.get_sketches(self.RATINGS_METRIC, buckets=sorted(set(days))):
+                histograms[(row['bucket'], row['product_id'])] = RatingHistogram.from_bytes(row['data'])
+            for day, product_id, rating in zip(days, chunk['product_id'], chunk['rating']):
+                histograms.setdefault((day, product_id), RatingHistogram()).add(rating)
+
+            sketches.extend(
+                (self.RATINGS_METRIC, day, product_id, histogram.to_bytes())
+                for (day, product_id), histogram in histograms.items()
+            )
+
+        self.db.save_sketches(source, int(chunk[self.CURSOR_COLUMNS[source]][-1]), sketches)
+
+    def refresh(self) -> None:
+        """
+        Учет в скетчах строк, добавленных с прошлого обновления.
+        Каждая порция сохраняется вместе с курсором в отдельной транзакции.
+        """
+        with self._lock:
+            for source in self.USER_METRICS:
+                cursor = self.db.get_sketch_cursor(source)
+                for chunk in self._iter_source_chunks(source, cursor):
+                    if chunk['user_id']:
+                        self._fold_chunk(source, chunk)
+
+    def reset(self) -> None:
+        """
+        Удаление скетчей: следующее обновление построит их заново
+        """
+        with self._lock:
+            self.db.reset_sketches()
+
+    @staticmethod
+    def _since(days: Optional[int]) -> Optional[str]:
+        """
+        Первый день периода из последних days дней (None - все время)
+        """
+        if not days:
+            return None
+        return (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    def distinct_users(self, source: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Оценка количества различных пользователей, оставивших отзывы или оценки
+
+        :param source: Источник (feedback или ratings)
+        :param days: Количество последних дней (None - за все время)
+        :return: Словарь с ключами estimate и relative_error
+        """
+        metric = self.USER_METRICS[source]
+        rows = self.db.get_sketches(metric, since=self._since(days)) if days \
+            else self.db.get_sketches(metric, buckets=[self.ALL_TIME_BUCKET])
+
+        merged = HyperLogLog(self.precision)
+        for row in rows:
+            merged.merge(HyperLogLog(self.precision, row['data']))
+
+        return {'estimate': merged.count(), 'relative_error': merged.relative_error}
+
+    def rating_histograms(self, days: Optional[int] = None) -> Dict[int, RatingHistogram]:
+        """
+        Гистограммы оценок по продуктам
+
+        :param days: Количество последних дней (None - за все время)
+        :return: Словарь ID продукта -> гистограмма
+        """
+        histograms: Dict[int, RatingHistogram] = {}
+        for row in self.db.get_sketches(self.RATINGS_METRIC, since=self._since(days)):
+            histograms.setdefault(row['product_id'], RatingHistogram()).merge(
+                RatingHistogram.from_bytes(row['data'])
+            )
+        return histograms
+
+    def category_histograms(self, days: Optional[int] = None) -> Dict[str, RatingHistogram]:
+        """
+        Гистограммы оценок по категориям (объединение гистограмм продуктов)
+
+        :param days: Количество последних дней (None - за все время)
+        :return: Словарь категория -> гистограмма
+        """
+        categories = {product['id']: product['category'] for product in self.db.get_products()}
+
+        histograms: Dict[str, RatingHistogram] = {}
+        for product_id, histogram in self.rating_histograms(days).items():
+            category = categories.get(product_id)
+            if category is not None:
+                histograms.setdefault(category, RatingHistogram()).merge(histogram)
+        return histograms
+
+    def get_user_stats(self) -> Dict[str, int]:
+        """
+        Статистика пользователей в том же виде, что и Database.get_user_stats:
+        общее количество берется из счетчика, количество пользователей
+        с отзывами и оценками - из скетчей HyperLogLog
+
+        :return: Словарь со статистикой пользователей
+        """
+        self.refresh()
+        return {
+            'total_users': self.db.get_user_stats()['total_users'],
+            'users_with_feedback': self.distinct_users('feedback')['estimate'],
+            'users_with_ratings': self.distinct_users('ratings')['estimate']
+        }
\ No newline at end of file
@@ -0,0 +1,201 @@
+import hashlib
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+class HyperLogLog:
+    """
+    Приближенный подсчет количества различных значений (HyperLogLog).
+
+    Занимает 2^precision байт независимо от числа значений. Два скетча с одинаковой
+    точностью объединяются поэлементным максимумом регистров, поэтому скетчи
+    суточных интервалов можно складывать в скетч любого периода.
+
+    Границы погрешности: относительная стандартная ошибка 1.04 / sqrt(2^precision),
+    для точности 12 (4096 регистров) - около 1.6%; с вероятностью 99.7% ошибка
+    не превышает трех стандартных ошибок (около 4.9%). Для небольших количеств
+    (до 2.5 * 2^precision) используется линейный подсчет, и ошибка обычно
+    значительно меньше. Удаление значений не поддерживается.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        """
+        Инициализация скетча
+
+        :param precision: Количество бит индекса регистра (4-16)
+        :param registers: Сохраненные регистры (результат to_bytes)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("Точность HyperLogLog должна быть от 4 до 16")
+
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.size)
+        elif len(registers) != self.size:
+            raise ValueError("Размер регистров не соответствует точности HyperLogLog")
+        else:
+            self.registers = bytearray(registers)
+
+    @property
+    def relative_error(self) -> float:
+        """
+        Относительная стандартная ошибка оценки
+        """
+        return 1.04 / math.sqrt(self.size)
+
+    @staticmethod
+    def _hash(value: int) -> int:
+        """
+        64-битный хеш целого значения
+        """
+        digest = hashlib.blake2b(str(value).encode('ascii'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, value: int) -> None:
+        """
+        Добавление значения
+
+        :param value: Значение (например, ID пользователя)
+        """
+        hashed = self._hash(value)
+        index = hashed >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rest = hashed & ((1 << rest_bits) - 1)
+        # Позиция первой единицы в оставшихся битах
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[int]) -> None:
+        """
+        Добавление нескольких значений
+
+        :param values: Значения
+        """
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Объединение с другим скетчем той же точности
+
+        :param other: Скетч, значения которого добавляются
+        """
+        if other.precision != self.precision:
+            raise ValueError("Нельзя объединить скетчи HyperLogLog разной точности")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """
+        Оценка количества различных значений
+
+        :return: Оценка количества
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+
+        # Поправка для небольших количеств (линейный подсчет по пустым регистрам)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализация регистров для хранения в базе данных
+        """
+        return bytes(self.registers)
+
+class RatingHistogram:
+    """
+    Гистограмма оценок 1-5.
+
+    Оценки дискретны, поэтому гистограмма из пяти счетчиков хранит распределение
+    без погрешности и дает точные квантили. Гистограммы объединяются сложением
+    счетчиков, поэтому суточные гистограммы продуктов складываются в гистограмму
+    любого периода, продукта или категории.
+    """
+
+    RATINGS = (1, 2, 3, 4, 5)
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        """
+        Инициализация гистограммы
+
+        :param counts: Количество оценок по значениям рейтинга
+        """
+        self.counts = {rating: 0 for rating in self.RATINGS}
+        if counts:
+            for rating, count in counts.items():
+                self.counts[int(rating)] += count
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'RatingHistogram':
+        """
+        Восстановление гистограммы из сохраненных байтов
+
+        :param data: Результат to_bytes
+        :return: Гистограмма
+        """
+        return cls(dict(zip(cls.RATINGS, struct.unpack('<5Q', data))))
+
+    def add(self, rating: int, count: int = 1) -> None:
+        """
+        Добавление оценки
+
+        :param rating: Значение рейтинга (1-5)
+        :param count: Количество оценок
+        """
+        self.counts[rating] += count
+
+    def merge(self, other: 'RatingHistogram') -> None:
+        """
+        Объединение с другой гистограммой
+
+        :param other: Гистограмма, оценки которой добавляются
+        """
+        for rating in self.RATINGS:
+            self.counts[rating] += other.counts[rating]
+
+    @property
+    def total(self) -> int:
+        """
+        Общее количество оценок
+        """
+        return sum(self.counts.values())
+
+    def mean(self) -> Optional[float]:
+        """
+        Средняя оценка (None, если оценок нет)
+        """
+        total = self.total
+        if not total:
+            return None
+        return sum(rating * count for rating, count in self.counts.items()) / total
+
+    def quantile(self, q: float) -> Optional[int]:
+        """
+        Квантиль распределения оценок
+
+        :param q: Уровень квантиля от 0 до 1 (0.5 - медиана)
+        :return: Значение рейтинга или None, если оценок нет
+        """
+        total = self.total
+        if not total:
+            return None
+
+        threshold = q * total
+        seen = 0
+        for rating in self.RATINGS:
+            seen += self.counts[rating]
+            if seen >= threshold and seen:
+                return rating
+        return self.RATINGS[-1]
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализация счетчиков для хранения в базе данных
+        """
+        return struct.pack('<5Q', *(self.counts[rating] for rating in self.RATINGS))
\ No newline at end of file
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+class SqlAnalytics:
+    """
+    Аналитика для текстовых отчетов /stats, вычисляемая агрегатными запросами
+    к сводным таблицам базы данных. Строки отзывов и рейтингов в Python не загружаются.
+    """
+
+    def __init__(self, db: Any, sketches: Optional[Any] = None):
+        """
+        Инициализация аналитики
+
+        :param db: Объект Database
+        :param sketches: Объект SketchAnalytics для приближенного подсчета пользователей (None - точный подсчет)
+        """
+        self.db = db
+        self.sketches = sketches
+
+    def get_general_stats(self) -> Dict[str, Any]:
+        """
+        Получение общей статистики по отзывам и рейтингам
+
+        :return: Словарь с общей статистикой
+        """
+        user_stats = self.sketches.get_user_stats() if self.sketches else self.db.get_user_stats()
+
+        # Статистика за последнюю неделю
+        week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+        totals = self.db.get_activity_totals(week_ago)
+
+        total_ratings = totals['total_ratings']
+        ratings_last_week = totals['ratings_since']
+
+        return {
+            'total_users': user_stats['total_users'],
+            'users_with_feedback': user_stats['users_with_feedback'],
+            'users_with_ratings': user_stats['users_with_ratings'],
+            'total_feedback': totals['total_feedback'],
+            'total_ratings': total_ratings,
+            'avg_rating_all_products': round(totals['ratings_sum'] / total_ratings, 2) if total_ratings else 0,
+            'feedback_last_week': totals['feedback_since'],
+            'ratings_last_week': ratings_last_week,
+            'avg_rating_last_week': round(totals['ratings_sum_since'] / ratings_last_week, 2) if ratings_last_week else 0,
+        }
+
+    def get_category_stats(self) -> List[Dict[str, Any]]:
+        """
+        Получение статистики по категориям продуктов
+
+        :return: Список словарей со статистикой по категориям
+        """
+        result = []
+        for row in self.db.get_category_rating_stats():
+            result.append({
+                'category': row['category'],
+                'products_count': row['products_count'],
+                'avg_rating': round(row['avg_rating'], 2) if row['avg_rating'] is not None else 0,
+                'ratings_count': row['ratings_count']
+            })
+
+        return sorted(result, key=lambda x: x['avg_rating'], reverse=True)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StatsScheduler:
+    """
+    Фоновый пересчет отчета /stats в готовый снимок.
+
+    Отчет пересчитывается каждые interval секунд или раньше, если с прошлого
+    пересчета накопилось write_threshold записей (отзывов и рейтингов).
+    /stats отвечает из последнего снимка, а пересчет по требованию
+    выполняется через refresh. Если снимок уже построен, фоновая задача
+    начинает с ожидания, а не с повторного пересчета.
+    """
+
+    def __init__(self, build: Callable[[], Awaitable[Dict[str, Any]]],
+                 interval: float = 600.0, write_threshold: int = 1000):
+        """
+        Инициализация планировщика
+
+        :param build: Корутинная функция, строящая отчет
+        :param interval: Период пересчета (в секундах)
+        :param write_threshold: Количество записей, после которого отчет пересчитывается досрочно (0 - только по времени)
+        """
+        self.build = build
+        self.interval = interval
+        self.write_threshold = write_threshold
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._writes = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_primitives(self) -> None:
+        """
+        Создание примитивов синхронизации в цикле событий
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+
+    def start(self) -> None:
+        """
+        Запуск фоновой задачи пересчета
+        """
+        self._ensure_primitives()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def note_write(self, *_: Any) -> None:
+        """
+        Учет новой записи; при достижении порога пересчет запускается досрочно
+        """
+        self._writes += 1
+        if self._wake is not None and self.write_threshold and self._writes >= self.write_threshold:
+            self._wake.set()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Пересчет отчета и сохранение снимка
+
+        :return: Новый снимок (словарь отчета с ключом built_at)
+        """
+        self._ensure_primitives()
+        async with self._lock:
+            writes = self._writes
+            snapshot = await self.build()
+            snapshot['built_at'] = datetime.now()
+            self.snapshot = snapshot
+            # Записи, пришедшие во время пересчета, учитываются в следующем
+            self._writes -= writes
+            return snapshot
+
+    async def _run(self) -> None:
+        """
+        Фоновая задача: пересчет по таймеру или по количеству записей
+        """
+        wait = self.snapshot is not None
+        while True:
+            if wait:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            wait = True
+
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Не удалось пересчитать отчет /stats")
+
+    async def close(self) -> None:
+        """
+        Остановка фоновой задачи
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
\ No newline at end of file
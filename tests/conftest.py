@@ -0,0 +1,130 @@
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Модули бота лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+def _seed_database(db: Database, users: int, feedback_per_user: int = 1, ratings_per_user: int = 1,
+                  days: int = 30, seed: int = 1) -> None:
+    """
+    Заполнение базы синтетическими пользователями, отзывами и рейтингами
+    через соединение записи пула (триггеры агрегатов срабатывают как в боте)
+
+    :param db: Объект Database с созданными таблицами
+    :param users: Количество пользователей
+    :param feedback_per_user: Количество отзывов каждого пользователя
+    :param ratings_per_user: Количество рейтингов каждого пользователя (не больше числа продуктов)
+    :param days: Количество последних дней, по которым распределяются даты
+    :param seed: Начальное значение генератора случайных чисел
+    """
+    rnd = random.Random(seed)
+    product_ids = [product['id'] for product in db.get_products()]
+    now = datetime.now()
+
+    def created_at() -> str:
+        return (now - timedelta(seconds=rnd.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    with db.pool.writer() as conn:
+        conn.executemany(
+            'INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)',
+            ((user_id, f'user{user_id}', 'Имя', None) for user_id in range(1, users + 1))
+        )
+        conn.executemany(
+            'INSERT INTO feedback (user_id, product_id, text, created_at) VALUES (?, ?, ?, ?)',
+            ((user_id, rnd.choice(product_ids), f'Отзыв {user_id}-{i}', created_at())
+             for user_id in range(1, users + 1) for i in range(feedback_per_user))
+        )
+        conn.executemany(
+            'INSERT INTO ratings (user_id, product_id, rating, created_at) VALUES (?, ?, ?, ?)',
+            ((user_id, product_id, rnd.randint(1, 5), created_at())
+             for user_id in range(1, users + 1)
+             for product_id in rnd.sample(product_ids, min(ratings_per_user, len(product_ids))))
+        )
+
+@pytest.fixture
+def make_database(tmp_path):
+    """
+    Фабрика баз данных во временном каталоге; базы закрываются после теста
+    """
+    databases = []
+
+    def factory(name: str = 'test.db', **kwargs) -> Database:
+        db = Database(str(tmp_path / name), **kwargs)
+        db.create_tables()
+        databases.append(db)
+        return db
+
+    yield factory
+
+    for db in databases:
+        db.close()
+
+@pytest.fixture
+def seed_database():
+    """
+    Функция заполнения базы синтетическими данными (см. _seed_database)
+    """
+    return _seed_database
+
+class RecordingRenderer:
+    """
+    Отрисовка, которая запоминает данные графиков вместо запуска процессов
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    async def render(self, chart, **data):
+        self.calls[chart] = data
+        return b'png'
+
+@pytest.fixture
+def patch_handlers(monkeypatch):
+    """
+    Подмена базы, аналитики и отрисовки в handlers.
+    Возвращает функцию patch(db, analytics=None) -> (AsyncDatabase, RecordingRenderer)
+    """
+    import handlers
+    from async_database import AsyncDatabase
+    from chart_cache import ChartCache
+    from feedback_analyzer import FeedbackAnalyzer
+    from sql_analytics import SqlAnalytics
+
+    executors = []
+
+    def patch(db: Database, analytics=None):
+        async_db = AsyncDatabase(db)
+        executors.append(async_db._executor)
+        renderer = RecordingRenderer()
+        monkeypatch.setattr(handlers, 'db', async_db)
+        monkeypatch.setattr(handlers, 'sql_analytics', analytics or SqlAnalytics(db))
+        monkeypatch.setattr(handlers, 'feedback_analyzer', FeedbackAnalyzer(async_db))
+        monkeypatch.setattr(handlers, 'chart_renderer', renderer)
+        monkeypatch.setattr(handlers, 'chart_cache', ChartCache())
+        return async_db, renderer
+
+    yield patch
+
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+@pytest.fixture
+def build_report(patch_handlers):
+    """
+    Построение отчета /stats по временной базе.
+    Возвращает функцию build(db, analytics=None) -> (отчет, RecordingRenderer)
+    """
+    import handlers
+
+    def build(db: Database, analytics=None):
+        _, renderer = patch_handlers(db, analytics)
+        return asyncio.run(handlers.build_stats_report()), renderer
+
+    return build
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+import statistics
+import tempfile
+import time
+
+from async_database import AsyncDatabase
+from exporter import export_csv
+
+# Время ответа коротких запросов, пока выполняется долгая выгрузка (в секундах)
+MAX_CONCURRENT_LATENCY = 0.2
+
+def test_short_queries_not_blocked_by_long_load(make_database, seed_database):
+    db = make_database()
+    seed_database(db, users=20000, feedback_per_user=3, ratings_per_user=2)
+    async_db = AsyncDatabase(db)
+
+    async def scenario(directory):
+        loop = asyncio.get_running_loop()
+        # Долгая выгрузка /export выполняется в том же пуле потоков
+        long_load = asyncio.create_task(async_db.run(export_csv, db, directory))
+        # Даем долгой выгрузке начаться в пуле потоков
+        await asyncio.sleep(0.05)
+
+        latencies = []
+        loop_lags = []
+        while not long_load.done():
+            started = loop.time()
+            await asyncio.sleep(0)
+            loop_lags.append(loop.time() - started)
+
+            started = time.perf_counter()
+            product, rating = await asyncio.gather(
+                async_db.get_product_by_id(1),
+                async_db.get_user_rating(1, 1)
+            )
+            latencies.append(time.perf_counter() - started)
+            assert product['id'] == 1
+
+        files = await long_load
+        return files, latencies, loop_lags
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            files, latencies, loop_lags = asyncio.run(scenario(directory))
+    finally:
+        async_db._executor.shutdown(wait=True)
+
+    rows = {file['source']: file['rows'] for file in files}
+    assert rows['feedback'] == 60000
+    # Пока шла выгрузка, короткие запросы выполнялись многократно и быстро
+    assert len(latencies) >= 5
+    # Единичные паузы планировщика ОС не считаются блокировкой: проверяется 99-й процентиль
+    assert statistics.quantiles(latencies, n=100)[98] < MAX_CONCURRENT_LATENCY
+    assert statistics.quantiles(loop_lags, n=100)[98] < MAX_CONCURRENT_LATENCY
\ No newline at end of file
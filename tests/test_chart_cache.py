@@ -0,0 +1,25 @@
+import os
+
+from chart_cache import ChartCache
+
+def test_disk_cache_keeps_only_latest_version(tmp_path):
+    cache = ChartCache(max_entries=2, directory=str(tmp_path))
+
+    for version in range(5):
+        cache.put('ratings', f'v{version}', b'png%d' % version)
+        cache.set_file_id('ratings', f'v{version}', f'file{version}')
+    cache.put('product_3', 'v1', b'p3')
+    cache.put('product_30', 'v1', b'p30')
+    cache.put('product_3', 'v2', b'p3-new')
+
+    files = sorted(os.listdir(tmp_path))
+    # По одному PNG на график, file_id - только у последней версии ratings
+    assert len([name for name in files if name.endswith('.png')]) == 3
+    assert len([name for name in files if name.startswith('ratings-')]) == 2
+
+    # Последние версии читаются с диска новым экземпляром кэша
+    reloaded = ChartCache(directory=str(tmp_path))
+    assert reloaded.get('ratings', 'v4') == {'data': b'png4', 'file_id': 'file4'}
+    assert reloaded.get('ratings', 'v3') is None
+    assert reloaded.get('product_3', 'v2')['data'] == b'p3-new'
+    assert reloaded.get('product_30', 'v1')['data'] == b'p30'
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import types
+
+import pytest
+
+import handlers
+from async_database import AsyncDatabase
+from chart_renderer import ChartRenderer
+
+# Корень репозитория с модулями бота
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Время ответа на колбэк, пока в пуле процессов рисуется график (в секундах)
+MAX_CALLBACK_LATENCY = 0.2
+
+RATING_COUNTS = {1: 3, 2: 5, 3: 10, 4: 20, 5: 12}
+
+class FakeCallbackQuery:
+    """
+    Колбэк, который запоминает ответы обработчика
+    """
+
+    def __init__(self, data: str, user_id: int = 1):
+        self.data = data
+        self.from_user = types.SimpleNamespace(id=user_id)
+        self.message = types.SimpleNamespace(edit_text=self._edit_text)
+        self.edited = []
+        self.answered = False
+
+    async def _edit_text(self, text, **kwargs):
+        self.edited.append(text)
+
+    async def answer(self, text=None, **kwargs):
+        self.answered = True
+
+class FakeState:
+    """
+    Состояние FSM в памяти
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def update_data(self, **kwargs):
+        self.data.update(kwargs)
+
+def test_callbacks_answered_while_chart_renders(make_database, monkeypatch):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    db.add_rating(1, 1, 4)
+    async_db = AsyncDatabase(db)
+    monkeypatch.setattr(handlers, 'db', async_db)
+    renderer = ChartRenderer(max_workers=1, timeout=120)
+
+    async def scenario():
+        # Первая отрисовка запускает процесс и импортирует matplotlib - это заметно дольше ответа на колбэк
+        render = asyncio.create_task(renderer.render('ratings_chart', rating_counts=RATING_COUNTS))
+        await asyncio.sleep(0)
+
+        latencies = []
+        while not render.done():
+            callback_query = FakeCallbackQuery('rate_1')
+            state = FakeState()
+            started = time.perf_counter()
+            await handlers.process_product_selection_for_rating(callback_query, state)
+            latencies.append(time.perf_counter() - started)
+
+            assert callback_query.answered
+            assert 'Ваша текущая оценка: 4' in callback_query.edited[0]
+            assert state.data['product_id'] == 1
+            await asyncio.sleep(0.01)
+
+        return await render, latencies
+
+    try:
+        image, latencies = asyncio.run(scenario())
+    finally:
+        renderer.close()
+        async_db._executor.shutdown(wait=True)
+
+    assert image.startswith(b'\x89PNG')
+    assert len(latencies) >= 5
+    assert max(latencies) < MAX_CALLBACK_LATENCY
+
+def test_timeout_discards_pool():
+    renderer = ChartRenderer(max_workers=1, timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(renderer.render('ratings_chart', rating_counts=RATING_COUNTS))
+
+    # Пул сброшен, а рабочий процесс завершается, дорисовав текущий график
+    assert renderer._executor is None
+    deadline = time.monotonic() + 60
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not multiprocessing.active_children()
+
+    # Следующая отрисовка работает в новом пуле
+    renderer.timeout = 120
+    try:
+        image = asyncio.run(renderer.render('ratings_chart', rating_counts=RATING_COUNTS))
+    finally:
+        renderer.close()
+    assert image.startswith(b'\x89PNG')
+
+def test_worker_imports_skip_bot_modules():
+    # Рабочий процесс spawn импортирует запущенный файл (main.py) и модуль функции отрисовки
+    probe = (
+        "import sys, main, chart_worker; "
+        "print(sorted(name for name in ('aiogram', 'handlers', 'database', 'matplotlib') if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
\ No newline at end of file
@@ -0,0 +1,53 @@
+import csv
+import gzip
+
+import pytest
+
+from exporter import escape_row, export_csv, export_xlsx
+
+FORMULAS = ['=HYPERLINK("http://example.com","Нажмите")', '+7 999 000-00-00', '-1+1', '@SUM(A1:A9)', '\t=1+1']
+
+def test_escape_row():
+    assert escape_row(['=1+1', '+1', '-1', '@A1', 'Отзыв', '', None, -5, 4.5]) == \
+        ["'=1+1", "'+1", "'-1", "'@A1", 'Отзыв', '', None, -5, 4.5]
+
+def seed_formulas(db):
+    for number, text in enumerate(FORMULAS, 1):
+        db.register_user(number, None, text, None)
+        db.add_feedback(number, 1, text)
+    db.add_rating(1, 1, 5)
+
+def test_csv_export_escapes_formulas(make_database, tmp_path):
+    db = make_database()
+    seed_formulas(db)
+
+    files = {file['source']: file for file in export_csv(db, str(tmp_path))}
+
+    with gzip.open(files['feedback']['path'], 'rt', encoding='utf-8-sig', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == len(FORMULAS)
+    for row in rows:
+        for value in row.values():
+            assert not value.startswith(('=', '+', '-', '@', '\t'))
+    assert sorted(row['text'] for row in rows) == sorted(f"'{text}" for text in FORMULAS)
+
+    # Числа и даты выгружаются без изменений
+    with gzip.open(files['ratings']['path'], 'rt', encoding='utf-8-sig', newline='') as file:
+        rating = next(csv.DictReader(file))
+    assert rating['rating'] == '5'
+    assert rating['created_at'][0].isdigit()
+
+def test_xlsx_export_escapes_formulas(make_database, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    db = make_database()
+    seed_formulas(db)
+
+    path = export_xlsx(db, str(tmp_path))[0]['path']
+
+    sheet = openpyxl.load_workbook(path)['feedback']
+    rows = list(sheet.iter_rows(min_row=2))
+    assert len(rows) == len(FORMULAS)
+    for row in rows:
+        for cell in row:
+            # Строки с апострофом сохраняются как текст, а не как формулы
+            assert cell.data_type != 'f'
\ No newline at end of file
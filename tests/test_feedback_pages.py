@@ -0,0 +1,79 @@
+from handlers import FEEDBACK_MAX_LENGTH, MESSAGE_MAX_LENGTH, format_feedback_page, telegram_length
+
+def _walk_older(db, product, texts):
+    """
+    Листание всех страниц от новых отзывов к старым; возвращает тексты отзывов в порядке показа
+    """
+    page = db.get_feedback_page(product['id'], limit=5)
+    seen = []
+
+    while True:
+        message, _, older = format_feedback_page(product, page, None)
+        assert telegram_length(message) <= MESSAGE_MAX_LENGTH
+        shown = [text for text in texts if text in message]
+        assert shown
+        seen.extend(sorted(shown, key=texts.index, reverse=True))
+
+        if older is None:
+            return seen
+        page = db.get_feedback_page(product['id'], before=older, limit=5)
+
+def test_long_reviews_are_reachable_in_full(make_database):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    product = db.get_product_by_id(1)
+
+    # Отзывы максимальной длины вперемешку с короткими (эмодзи занимают две единицы UTF-16)
+    texts = []
+    for i in range(14):
+        prefix = f"<{i}>"
+        if i % 3 == 0:
+            body = '🙂' * ((FEEDBACK_MAX_LENGTH - len(prefix)) // 2)
+        elif i % 3 == 1:
+            body = 'ж' * (FEEDBACK_MAX_LENGTH - len(prefix))
+        else:
+            body = 'коротко'
+        texts.append(prefix + body)
+        db.add_feedback(1, 1, texts[-1])
+
+    # Каждый отзыв показан полностью ровно один раз, от новых к старым
+    assert _walk_older(db, product, texts) == list(reversed(texts))
+
+def test_walking_back_to_newer_reviews(make_database):
+    db = make_database()
+    db.register_user(1, 'ivan', 'Иван', None)
+    product = db.get_product_by_id(1)
+    texts = [f"<{i}>" + ('я' * (FEEDBACK_MAX_LENGTH - 5) if i % 2 else 'ok') for i in range(9)]
+    for text in texts:
+        db.add_feedback(1, 1, text)
+
+    # Доходим до последней страницы, затем листаем к новым отзывам
+    page = db.get_feedback_page(1, limit=5)
+    while True:
+        _, newer, older = format_feedback_page(product, page, 4.5)
+        if older is None:
+            break
+        page = db.get_feedback_page(1, before=older, limit=5)
+    last_message, newer, _ = format_feedback_page(product, page, 4.5)
+    assert texts[0] in last_message
+
+    seen = [text for text in texts if text in last_message]
+    while newer is not None:
+        page = db.get_feedback_page(1, after=newer, limit=5)
+        message, newer, _ = format_feedback_page(product, page, 4.5, toward_newer=True)
+        assert telegram_length(message) <= MESSAGE_MAX_LENGTH
+        seen.extend(text for text in texts if text in message)
+
+    assert sorted(seen, key=texts.index) == texts
+    assert len(seen) == len(texts)
+
+def test_legacy_review_longer_than_message_is_shortened(make_database):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    product = db.get_product_by_id(1)
+    db.add_feedback(1, 1, 'ы' * 5000)
+
+    message, newer, older = format_feedback_page(product, db.get_feedback_page(1, limit=5), None)
+    assert telegram_length(message) <= MESSAGE_MAX_LENGTH
+    assert "(отзыв сокращен)" in message
+    assert newer is None and older is None
\ No newline at end of file
@@ -0,0 +1,39 @@
+import sqlite3
+
+from database import ConnectionPool
+
+def test_rating_changes_keep_aggregates_without_recursive_triggers(make_database):
+    db = make_database()
+    # Агрегаты не должны зависеть от настроек соединения
+    assert all('recursive_triggers' not in pragma for pragma in ConnectionPool.PRAGMAS)
+
+    db.register_user(1, 'a', 'A', None)
+    db.register_user(2, 'b', 'B', None)
+
+    first_id = db.add_rating(1, 1, 2)
+    assert db.add_rating(1, 1, 5) == first_id
+    db.apply_write_batch([], [], [(2, 1, 4), (2, 1, 1), (1, 2, 3)])
+    db.add_rating(2, 2, 5)
+
+    assert db.get_user_rating(1, 1) == 5
+    assert db.get_user_rating(2, 1) == 1
+    assert db.get_average_rating(1) == 3.0
+    assert db.verify_rating_stats() == []
+    assert db.verify_activity_rollups() == []
+    assert db.verify_user_stats() is None
+
+def test_upsert_from_plain_connection_keeps_aggregates(make_database):
+    db = make_database()
+    db.register_user(1, 'a', 'A', None)
+    db.add_rating(1, 1, 1)
+
+    # Запись внешним соединением без настроек пула (например, скриптом или sqlite3 CLI)
+    conn = sqlite3.connect(db.db_name)
+    with conn:
+        conn.execute(db.UPSERT_RATING_QUERY, (1, 1, 4))
+        conn.execute(db.UPSERT_RATING_QUERY, (1, 3, 2))
+    conn.close()
+
+    assert db.verify_rating_stats() == []
+    assert db.verify_activity_rollups() == []
+    assert db.verify_user_stats() is None
\ No newline at end of file
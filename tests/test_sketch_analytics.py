@@ -0,0 +1,127 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from sketch_analytics import SketchAnalytics
+from sketches import HyperLogLog
+from sql_analytics import SqlAnalytics
+
+# Допустимое отклонение оценки: три стандартные ошибки HyperLogLog
+SIGMAS = 3
+
+def assert_within_bounds(result, exact):
+    assert abs(result['estimate'] - exact) <= SIGMAS * result['relative_error'] * exact
+
+# Точность 8 проверяет оценку HyperLogLog, точность 12 - линейный подсчет для небольших количеств
+@pytest.mark.parametrize('precision', [8, 12])
+def test_distinct_users_match_exact_counts(make_database, seed_database, precision):
+    db = make_database()
+    seed_database(db, users=5000, feedback_per_user=2, ratings_per_user=2)
+    # Небольшие порции: скетчи каждой порции объединяются с сохраненными
+    sketches = SketchAnalytics(db, precision=precision, chunk_size=1000)
+    sketches.refresh()
+
+    exact = db.count_user_stats()
+    assert_within_bounds(sketches.distinct_users('feedback'), exact['users_with_feedback'])
+    assert_within_bounds(sketches.distinct_users('ratings'), exact['users_with_ratings'])
+
+    approximate = sketches.get_user_stats()
+    assert approximate['total_users'] == exact['total_users']
+
+@pytest.mark.parametrize('days', [1, 7, 30])
+def test_day_buckets_merge_into_period(make_database, seed_database, days):
+    db = make_database()
+    seed_database(db, users=3000, feedback_per_user=5, ratings_per_user=1, days=30)
+    sketches = SketchAnalytics(db, precision=8, chunk_size=2000)
+    sketches.refresh()
+
+    since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    with db.pool.reader() as conn:
+        user_ids = [row[0] for row in conn.execute(
+            'SELECT DISTINCT user_id FROM feedback WHERE created_at >= ?', (since,)
+        )]
+        daily_users = conn.execute('''
+        SELECT COUNT(*) FROM (SELECT DISTINCT date(created_at), user_id FROM feedback WHERE created_at >= ?)
+        ''', (since,)).fetchone()[0]
+
+    # Объединение суточных скетчей совпадает со скетчем, построенным сразу по всем пользователям периода
+    direct = HyperLogLog(8)
+    direct.update(user_ids)
+    result = sketches.distinct_users('feedback', days)
+    assert result['estimate'] == direct.count()
+    assert_within_bounds(result, len(user_ids))
+
+    if days > 1:
+        # Пользователи повторяются в разных днях: сумма по дням вышла бы за границы погрешности
+        assert daily_users - len(user_ids) > SIGMAS * result['relative_error'] * len(user_ids)
+
+def test_incremental_refresh_matches_full_rebuild(make_database, seed_database):
+    db = make_database()
+    seed_database(db, users=2000, feedback_per_user=2, ratings_per_user=2, seed=1)
+    sketches = SketchAnalytics(db, chunk_size=500)
+    sketches.refresh()
+
+    # Новые строки попадают в уже сохраненные суточные скетчи
+    with db.pool.writer() as conn:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.executemany('INSERT INTO feedback (user_id, product_id, text, created_at) VALUES (?, ?, ?, ?)',
+                         [(user_id, 1, 'Еще отзыв', now) for user_id in range(1, 2001, 3)])
+        conn.executemany('INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)',
+                         [(user_id, None, 'Новый', None) for user_id in range(5001, 5301)])
+        conn.executemany('INSERT INTO ratings (user_id, product_id, rating, created_at) VALUES (?, ?, ?, ?)',
+                         [(user_id, 1, 4, now) for user_id in range(5001, 5301)])
+    sketches.refresh()
+    incremental = {source: sketches.distinct_users(source, days)['estimate']
+                   for source in ('feedback', 'ratings') for days in (None, 1, 7)}
+    histograms = {product_id: histogram.counts for product_id, histogram in sketches.rating_histograms().items()}
+
+    sketches.reset()
+    sketches.refresh()
+    assert incremental == {source: sketches.distinct_users(source, days)['estimate']
+                           for source in ('feedback', 'ratings') for days in (None, 1, 7)}
+    assert histograms == {product_id: histogram.counts for product_id, histogram in sketches.rating_histograms().items()}
+
+    # Без изменений оценок гистограммы совпадают с агрегатами продуктов
+    with db.pool.reader() as conn:
+        for row in conn.execute('SELECT * FROM product_rating_stats WHERE ratings_count > 0'):
+            assert histograms[row['product_id']] == {
+                rating: row[f'rating_{rating}'] for rating in range(1, 6)
+            }
+
+def test_rating_changed_in_same_second_is_counted(make_database):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    db.register_user(2, None, 'Петр', None)
+    db.add_rating(1, 1, 1)
+    db.add_rating(2, 1, 5)
+    sketches = SketchAnalytics(db)
+    sketches.refresh()
+
+    # Оценка с меньшим ID меняется в ту же секунду, в которую записан курсор
+    db.add_rating(1, 1, 5)
+    with db.pool.writer() as conn:
+        conn.execute('UPDATE ratings SET created_at = (SELECT MAX(created_at) FROM ratings)')
+    sketches.refresh()
+
+    # Гистограмма учитывает все выставленные оценки: прежнюю 1 и обе оценки 5
+    assert sketches.rating_histograms()[1].counts == {1: 1, 2: 0, 3: 0, 4: 0, 5: 2}
+    assert db.get_rating_counts() == {5: 2}
+
+def test_approximate_report_within_bounds(make_database, seed_database, build_report):
+    db = make_database()
+    seed_database(db, users=3000, feedback_per_user=1, ratings_per_user=2)
+
+    report, renderer = build_report(db, SqlAnalytics(db, sketches=SketchAnalytics(db)))
+
+    assert report['chart_error'] is None
+    exact = db.count_user_stats()
+    with_ratings = int(re.search(r'оставивших рейтинги: (\d+)', report['text']).group(1))
+    assert abs(with_ratings - exact['users_with_ratings']) <= SIGMAS * 0.0163 * exact['users_with_ratings']
+    assert sum(renderer.calls['ratings_chart']['rating_counts'].values()) == 3000 * 2
+
+    # Квантили оценок по категориям из гистограмм скетчей
+    assert 'Распределение оценок по категориям' in report['text']
+    shown = sum(int(count) for count in re.findall(r'медиана \d, квартили \d-\d, среднее [\d.]+ \((\d+) оценок\)',
+                                                    report['text']))
+    assert shown == 3000 * 2
\ No newline at end of file
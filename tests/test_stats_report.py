@@ -0,0 +1,97 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import handlers
+
+def test_ratings_chart_matches_report_text(make_database, seed_database, build_report):
+    db = make_database()
+    seed_database(db, users=50, feedback_per_user=2, ratings_per_user=3)
+    # Оценки пользователей без записи в users тоже входят в итоги
+    with db.pool.writer() as conn:
+        conn.executemany('INSERT INTO ratings (user_id, product_id, rating) VALUES (?, ?, ?)',
+                         [(1000, 1, 5), (1001, 2, 1), (1001, 3, 2)])
+
+    report, renderer = build_report(db)
+
+    assert report['chart_error'] is None
+    rating_counts = renderer.calls['ratings_chart']['rating_counts']
+    total_ratings = int(re.search(r'Всего рейтингов: (\d+)', report['text']).group(1))
+    assert sum(rating_counts.values()) == total_ratings == 50 * 3 + 3
+    with db.pool.reader() as conn:
+        expected = dict(conn.execute('SELECT rating, COUNT(*) FROM ratings GROUP BY rating').fetchall())
+    assert rating_counts == expected
+
+def test_ratings_chart_version_follows_distribution(make_database):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    db.register_user(2, None, 'Петр', None)
+    db.add_rating(1, 1, 1)
+    db.add_rating(2, 1, 3)
+    version = db.get_data_versions()['ratings']
+
+    # Сумма и количество оценок не меняются, а распределение меняется
+    db.add_rating(1, 1, 2)
+    db.add_rating(2, 1, 2)
+
+    assert db.get_rating_counts() == {2: 2}
+    assert db.get_data_versions()['ratings'] != version
+
+def test_catalog_counters_exact_under_threads(make_database, build_report):
+    db = make_database()
+    db.invalidate_catalog()
+    before = db.get_catalog_stats()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: db.get_product_by_id(1), range(8000)))
+
+    stats = db.get_catalog_stats()
+    assert stats['hits'] + stats['misses'] - before['hits'] - before['misses'] == 8000
+    assert stats['misses'] - before['misses'] == 1
+
+    report, _ = build_report(db)
+    assert f"Кэш каталога: {stats['hits']} из" in report['text']
+
+def test_registration_counters_in_report(make_database, build_report):
+    db = make_database()
+    db.register_user(1, 'ivan', 'Иван', None)
+    db.register_user(1, 'ivan', 'Иван', None)
+    db.register_user(2, None, 'Петр', None)
+
+    assert db.get_registration_stats() == {'skipped': 1, 'unchanged': 0, 'written': 2}
+    report, _ = build_report(db)
+    assert "пропущено по кэшу 1, без изменений профиля 0, записано 2" in report['text']
+
+def test_category_section_matches_ratings(make_database, seed_database, build_report):
+    db = make_database()
+    seed_database(db, users=40, feedback_per_user=1, ratings_per_user=4)
+
+    report, _ = build_report(db)
+
+    with db.pool.reader() as conn:
+        expected = conn.execute('''
+        SELECT p.category, COUNT(*), AVG(r.rating)
+        FROM ratings r JOIN products p ON p.id = r.product_id
+        GROUP BY p.category
+        ''').fetchall()
+    assert expected
+    for category, count, _ in expected:
+        assert re.search(rf"• {re.escape(category)}: ⭐ [\d.]+ \(\d+ продуктов, {count} оценок\)", report['text'])
+
+def test_report_reads_only_analyzed_feedback(make_database, patch_handlers):
+    db = make_database()
+    db.register_user(1, None, 'Иван', None)
+    db.add_feedback(1, 1, 'Отличный телефон, все нравится')
+    patch_handlers(db)
+
+    # Отчет не анализирует отзывы сам: пока фоновая задача их не обработала, раздела тональности нет
+    report = asyncio.run(handlers.build_stats_report())
+    assert 'Тональность отзывов' not in report['text']
+    assert db.get_sentiment_summary()['analyzed_count'] == 0
+
+    async def analyze_and_report():
+        await handlers.feedback_analyzer.process_pending()
+        return await handlers.build_stats_report()
+
+    report = asyncio.run(analyze_and_report())
+    assert 'Тональность отзывов' in report['text']
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+import types
+
+import handlers
+from stats_scheduler import StatsScheduler
+
+class FakeMessage:
+    """
+    Сообщение, которое запоминает ответы обработчика
+    """
+
+    def __init__(self, user_id: int):
+        self.from_user = types.SimpleNamespace(id=user_id)
+        self.sent = []
+
+    async def answer(self, text, **kwargs):
+        self.sent.append(text)
+
+    async def answer_photo(self, photo, caption=None, **kwargs):
+        self.sent.append(caption)
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id='file')])
+
+def test_scheduler_waits_when_snapshot_exists():
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {}
+
+    async def scenario():
+        scheduler = StatsScheduler(build, interval=600, write_threshold=3)
+        await scheduler.refresh()
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        # Снимок уже построен запросом /stats - повторный пересчет не нужен
+        assert len(builds) == 1
+
+        for _ in range(3):
+            scheduler.note_write()
+        await asyncio.sleep(0.05)
+        assert len(builds) == 2
+        await scheduler.close()
+
+    asyncio.run(scenario())
+
+def test_scheduler_started_at_startup_only_with_admins(monkeypatch):
+    import main
+
+    class FakeAnalyzer:
+        def start(self):
+            pass
+
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {}
+
+    async def scenario(admin_ids):
+        monkeypatch.setattr(main, 'ADMIN_IDS', admin_ids)
+        monkeypatch.setattr(main, 'STATS_REFRESH_INTERVAL', 600)
+        scheduler = StatsScheduler(build, interval=600, write_threshold=0)
+        main.start_background_tasks(scheduler, FakeAnalyzer())
+        await asyncio.sleep(0.05)
+        started = scheduler._task is not None
+        await scheduler.close()
+        return started
+
+    # Без администраторов отчет некому запрашивать: пересчет не запускается
+    assert not asyncio.run(scenario([]))
+    assert builds == []
+
+    # С администраторами снимок строится сразу при запуске
+    assert asyncio.run(scenario([1]))
+    assert builds == [1]
+
+def test_stats_answers_from_startup_snapshot(make_database, patch_handlers, monkeypatch):
+    db = make_database()
+    patch_handlers(db)
+    scheduler = StatsScheduler(handlers.build_stats_report, interval=600, write_threshold=0)
+    monkeypatch.setattr(handlers, 'stats_scheduler', scheduler)
+    monkeypatch.setattr(handlers, 'ADMIN_IDS', [1])
+    monkeypatch.setattr(handlers, 'STATS_REFRESH_INTERVAL', 600)
+    command = types.SimpleNamespace(args=None)
+
+    async def scenario():
+        scheduler.start()
+        for _ in range(100):
+            if scheduler.snapshot is not None:
+                break
+            await asyncio.sleep(0.05)
+        built_at = scheduler.snapshot['built_at']
+
+        # Обычные пользователи статистику не получают
+        message = FakeMessage(2)
+        await handlers.cmd_admin_stats(message, command)
+        assert not any('Всего рейтингов' in text for text in message.sent if text)
+
+        # /stats отвечает из снимка, построенного фоновой задачей, без пересчета
+        message = FakeMessage(1)
+        await handlers.cmd_admin_stats(message, command)
+        assert any('Всего рейтингов' in text for text in message.sent if text)
+        assert scheduler.snapshot['built_at'] == built_at
+        await scheduler.close()
+
+    asyncio.run(scenario())
\ No newline at end of file
@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message
+
+from webhook_server import WebhookServer
+
+SECRET = 'secret'
+
+class FakeDispatcher:
+    """
+    Диспетчер, который обрабатывает обновление за update['delay'] секунд
+    """
+
+    def __init__(self):
+        self.started = []
+        self.processed = []
+        self.active = 0
+        self.max_active = 0
+
+    async def feed_raw_update(self, bot, update):
+        self.started.append(update['update_id'])
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(update.get('delay', 0))
+            if update.get('fail'):
+                raise RuntimeError("Ошибка обработчика")
+            self.processed.append(update['update_id'])
+        finally:
+            self.active -= 1
+
+    async def silent_call_request(self, bot, result):
+        pass
+
+class StubSession(BaseSession):
+    """
+    Сессия бота без сети: записывает вызванные методы API
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        if isinstance(method, SendMessage):
+            return Message(message_id=len(self.requests), date=int(time.time()),
+                           chat=Chat(id=method.chat_id, type='private'), text=method.text)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        pass
+
+async def start_server(**kwargs):
+    dispatcher = FakeDispatcher()
+    server = WebhookServer(dispatcher, bot=None, secret_token=SECRET, **kwargs)
+    await server.start('127.0.0.1', 0)
+    port = server._runner.addresses[0][1]
+    return server, dispatcher, f'http://127.0.0.1:{port}/webhook'
+
+async def post(session, url, update, secret=SECRET):
+    """
+    Отправка обновления; возвращает код ответа и время ответа
+    """
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret is not None else {}
+    started = time.perf_counter()
+    if isinstance(update, dict):
+        response = await session.post(url, json=update, headers=headers)
+    else:
+        response = await session.post(url, data=update, headers=dict(headers, **{'Content-Type': 'application/json'}))
+    await response.read()
+    return response.status, time.perf_counter() - started
+
+def test_rejects_bad_secret_and_bad_json():
+    async def scenario():
+        server, dispatcher, url = await start_server()
+        try:
+            async with aiohttp.ClientSession() as session:
+                assert (await post(session, url, {'update_id': 1}, secret='wrong'))[0] == 401
+                assert (await post(session, url, {'update_id': 2}, secret=None))[0] == 401
+                assert (await post(session, url, b'{not json'))[0] == 400
+                assert (await post(session, url, {'update_id': 3}))[0] == 200
+        finally:
+            await server.close()
+        assert dispatcher.started == [3]
+
+    asyncio.run(scenario())
+
+def test_responds_after_processing():
+    async def scenario():
+        server, dispatcher, url = await start_server()
+        try:
+            async with aiohttp.ClientSession() as session:
+                status, elapsed = await post(session, url, {'update_id': 1, 'delay': 0.2})
+                # Ответ приходит только после обработки, без лишней задержки
+                assert status == 200 and dispatcher.processed == [1]
+                assert 0.2 <= elapsed < 0.5
+
+                # Ошибка обработчика подтверждается, чтобы обновление не доставлялось бесконечно
+                assert (await post(session, url, {'update_id': 2, 'fail': True}))[0] == 200
+                assert server.pending == 0
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+def test_concurrency_cap():
+    async def scenario():
+        server, dispatcher, url = await start_server(max_concurrent=2)
+        try:
+            async with aiohttp.ClientSession() as session:
+                started = time.perf_counter()
+                results = await asyncio.gather(*(
+                    post(session, url, {'update_id': update_id, 'delay': 0.2}) for update_id in range(6)
+                ))
+                elapsed = time.perf_counter() - started
+        finally:
+            await server.close()
+
+        assert [status for status, _ in results] == [200] * 6
+        assert dispatcher.max_active == 2
+        # Шесть обновлений по два одновременно - три волны
+        assert elapsed >= 0.6
+        assert sorted(dispatcher.processed) == list(range(6))
+
+    asyncio.run(scenario())
+
+def test_drain_on_shutdown():
+    async def scenario():
+        server, dispatcher, url = await start_server(drain_timeout=0.5)
+        async with aiohttp.ClientSession() as session:
+            requests = [
+                asyncio.create_task(post(session, url, {'update_id': 1, 'delay': 0.2})),
+                asyncio.create_task(post(session, url, {'update_id': 2, 'delay': 10})),
+            ]
+            while len(dispatcher.started) < 2:
+                await asyncio.sleep(0.01)
+
+            closing = asyncio.create_task(server.close())
+            await asyncio.sleep(0.05)
+            # Во время остановки новые обновления не принимаются
+            late_status, _ = await post(session, url, {'update_id': 3})
+
+            results = await asyncio.gather(*requests)
+            await closing
+
+        return late_status, results
+
+    late_status, results = asyncio.run(scenario())
+
+    assert late_status == 503
+    # Успевшее обновление подтверждено, прерванное получает 503 и будет доставлено повторно
+    assert results[0][0] == 200
+    assert results[1][0] == 503
+    assert results[1][1] < 2
+
+def test_handler_answer_sent_before_acknowledge():
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        # Ответ возвращается методом API, не отправленным обработчиком
+        return message.answer('pong')
+
+    async def scenario():
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        session = StubSession()
+        bot = Bot('42:TEST', session=session)
+        server = WebhookServer(dispatcher, bot, secret_token=SECRET)
+        await server.start('127.0.0.1', 0)
+        url = f'http://127.0.0.1:{server._runner.addresses[0][1]}/webhook'
+        update = {
+            'update_id': 1,
+            'message': {
+                'message_id': 1, 'date': int(time.time()), 'text': 'ping',
+                'chat': {'id': 7, 'type': 'private'},
+                'from': {'id': 7, 'is_bot': False, 'first_name': 'Test'},
+            },
+        }
+        try:
+            async with aiohttp.ClientSession() as client:
+                status, _ = await post(client, url, update)
+                # К моменту подтверждения ответ обработчика уже отправлен
+                sent = list(session.requests)
+        finally:
+            await server.close()
+        return status, sent
+
+    status, sent = asyncio.run(scenario())
+
+    assert status == 200
+    assert len(sent) == 1 and isinstance(sent[0], SendMessage)
+    assert sent[0].chat_id == 7 and sent[0].text == 'pong'
\ No newline at end of file
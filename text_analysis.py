@@ -0,0 +1,108 @@
+import re
+from typing import Any, Dict, List
+
+# Основы слов с положительной и отрицательной окраской (сравнение по началу слова)
+POSITIVE_STEMS = (
+    'отлич', 'хорош', 'прекрас', 'супер', 'класс', 'нрав', 'рекоменд', 'удоб', 'быстр',
+    'довол', 'люблю', 'лучш', 'замечат', 'качествен', 'спасиб', 'идеал', 'восторг',
+    'великолеп', 'приятн', 'вежлив', 'надежн', 'шикар', 'работает', 'good', 'great', 'excellent',
+    'love', 'perfect', 'fast', 'nice', 'awesome',
+)
+
+NEGATIVE_STEMS = (
+    'плох', 'ужас', 'отврат', 'медлен', 'слома', 'брак', 'разочаров', 'проблем',
+    'дорог', 'опозд', 'груб', 'хуж', 'недовол', 'глюч', 'тормоз', 'нагрева', 'возврат',
+    'обман', 'кошмар', 'неудоб', 'жалоб', 'дефект', 'царапа', 'царапин', 'зависа',
+    'bad', 'slow', 'broken', 'terrible', 'awful', 'worst', 'refund',
+)
+
+# Отрицания меняют окраску следующего слова
+NEGATIONS = {'не', 'нет', 'ни', 'без', 'not', 'no', 'never'}
+
+# Служебные и общие слова, которые не считаются ключевыми
+STOPWORDS = {
+    'это', 'этот', 'эта', 'эти', 'того', 'тоже', 'также', 'очень', 'было', 'были', 'быть',
+    'есть', 'если', 'когда', 'чтобы', 'только', 'уже', 'еще', 'всего', 'весь', 'все', 'всех',
+    'свой', 'своей', 'который', 'которая', 'которые', 'после', 'перед', 'через', 'потом',
+    'можно', 'нужно', 'может', 'будет', 'даже', 'вообще', 'просто', 'какой',
+    'какая', 'такой', 'такая', 'так', 'там', 'тут', 'здесь', 'него', 'нее', 'них', 'мне',
+    'меня', 'вам', 'вас', 'нас', 'они', 'она', 'оно', 'его', 'ее', 'мой',
+    'моя', 'мои', 'для', 'про', 'под', 'над', 'при', 'или', 'как', 'что', 'чем', 'где',
+    'раз', 'два', 'день', 'дня', 'дней', 'продукт', 'товар', 'товара', 'покупка',
+    'this', 'that', 'with', 'have', 'very', 'from', 'they', 'were', 'been',
+}
+
+# Слово из букв (дефис внутри слова сохраняется)
+WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*", re.UNICODE)
+
+# Минимальная длина ключевого слова и количество ключевых слов одного отзыва
+MIN_KEYWORD_LENGTH = 4
+MAX_KEYWORDS = 10
+
+# Порог оценки, начиная с которого отзыв считается положительным или отрицательным
+SENTIMENT_THRESHOLD = 0.2
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбиение текста на слова в нижнем регистре (ё заменяется на е)
+
+    :param text: Текст отзыва
+    :return: Список слов
+    """
+    return WORD_RE.findall(text.lower().replace('ё', 'е'))
+
+def _polarity(word: str) -> int:
+    """
+    Окраска слова по словарю: 1 - положительная, -1 - отрицательная, 0 - нейтральная
+    """
+    # Отрицательные основы проверяем первыми: «неудобно» не должно совпасть с «удоб»
+    if word.startswith(NEGATIVE_STEMS):
+        return -1
+    if word.startswith(POSITIVE_STEMS):
+        return 1
+    return 0
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """
+    Оценка тональности и выделение ключевых слов отзыва по словарю.
+    Работает без внешних сервисов и моделей.
+
+    Оценка равна (положительные - отрицательные) / (положительные + отрицательные)
+    и лежит в диапазоне от -1 до 1; отрицание перед словом меняет его окраску.
+
+    :param text: Текст отзыва
+    :return: Словарь с ключами sentiment (оценка), label (1, 0 или -1) и keywords (список слов)
+    """
+    positive = negative = 0
+    negated = False
+    keywords: List[str] = []
+
+    for word in tokenize(text):
+        if word in NEGATIONS:
+            negated = True
+            continue
+
+        polarity = _polarity(word)
+        if negated:
+            polarity = -polarity
+            negated = False
+
+        if polarity > 0:
+            positive += 1
+        elif polarity < 0:
+            negative += 1
+        elif (len(word) >= MIN_KEYWORD_LENGTH and word not in STOPWORDS
+              and word not in keywords and len(keywords) < MAX_KEYWORDS):
+            keywords.append(word)
+
+    total = positive + negative
+    sentiment = (positive - negative) / total if total else 0.0
+
+    if sentiment >= SENTIMENT_THRESHOLD:
+        label = 1
+    elif sentiment <= -SENTIMENT_THRESHOLD:
+        label = -1
+    else:
+        label = 0
+
+    return {'sentiment': round(sentiment, 4), 'label': label, 'keywords': keywords}
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+class WebhookServer:
+    """
+    Прием обновлений Telegram через вебхук на встроенном сервере aiohttp.
+
+    Запрос без правильного секретного токена отклоняется (401), запрос
+    с некорректным JSON - (400). Ответ 200 отправляется только после обработки
+    обновления, поэтому обновление, обработка которого не завершилась,
+    Telegram доставит повторно. Ошибка обработчика записывается в журнал,
+    а обновление подтверждается, чтобы Telegram не доставлял его бесконечно.
+    Одновременно обрабатывается не больше max_concurrent обновлений, при
+    заполнении лимита ответ задерживается, и Telegram замедляет доставку.
+
+    При остановке новые обновления получают ответ 503, а обрабатываемые
+    дорабатываются, но не дольше drain_timeout секунд; прерванные обновления
+    тоже получают ответ 503, и Telegram доставит их после перезапуска.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, path: str = '/webhook',
+                 secret_token: Optional[str] = None, max_concurrent: int = 32,
+                 drain_timeout: float = 30.0):
+        """
+        Инициализация сервера
+
+        :param dispatcher: Диспетчер aiogram
+        :param bot: Бот, для которого принимаются обновления
+        :param path: Путь вебхука
+        :param secret_token: Секретный токен из заголовка X-Telegram-Bot-Api-Secret-Token (None - без проверки)
+        :param max_concurrent: Максимальное количество одновременно обрабатываемых обновлений
+        :param drain_timeout: Максимальное время ожидания обработки принятых обновлений при остановке (в секундах)
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.drain_timeout = drain_timeout
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._tasks: Set[asyncio.Task] = set()
+        self._closing = False
+        self._runner: Optional[web.AppRunner] = None
+
+    def create_app(self) -> web.Application:
+        """
+        Создание приложения aiohttp с маршрутом вебхука
+        """
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080) -> None:
+        """
+        Запуск сервера
+
+        :param host: Адрес для входящих соединений
+        :param port: Порт для входящих соединений
+        """
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("Вебхук принимает обновления на %s:%d%s", host, port, self.path)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Обработчик запроса Telegram с обновлением
+        """
+        if self.secret_token is not None:
+            token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+            if not hmac.compare_digest(token.encode('utf-8'), self.secret_token.encode('utf-8')):
+                return web.Response(status=401, text='Unauthorized')
+
+        if self._closing:
+            return web.Response(status=503, text='Shutting down')
+
+        try:
+            update = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400, text='Bad Request')
+
+        # Ждем свободного места: пока лимит занят, Telegram не получает ответ и не шлет новые обновления
+        await self._semaphore.acquire()
+        if self._closing:
+            self._semaphore.release()
+            return web.Response(status=503, text='Shutting down')
+
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+        # Отвечаем после обработки: подтвержденное обновление Telegram больше не доставит
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            # Обработка прервана при остановке - Telegram доставит обновление повторно
+            return web.Response(status=503, text='Shutting down')
+        return web.json_response({})
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        """
+        Освобождение места после обработки обновления
+        """
+        self._tasks.discard(task)
+        self._semaphore.release()
+
+    async def _process(self, update: Dict[str, Any]) -> None:
+        """
+        Передача обновления диспетчеру
+        """
+        try:
+            result = await self.dispatcher.feed_raw_update(self.bot, update)
+            # Ответ обработчика в виде метода API отправляется отдельным запросом
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(self.bot, result)
+        except Exception:
+            logger.exception("Ошибка при обработке обновления %s", update.get('update_id'))
+
+    @property
+    def pending(self) -> int:
+        """
+        Количество обновлений в обработке
+        """
+        return len(self._tasks)
+
+    async def close(self) -> None:
+        """
+        Остановка сервера с ожиданием обработки принятых обновлений.
+        Запросы с прерванными обновлениями получают ответ 503 до закрытия соединений.
+        """
+        self._closing = True
+
+        if self._tasks:
+            logger.info("Ожидание обработки принятых обновлений: %d", len(self._tasks))
+            _, pending = await asyncio.wait(set(self._tasks), timeout=self.drain_timeout)
+            if pending:
+                logger.warning("Обработка %d обновлений прервана при остановке", len(pending))
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
\ No newline at end of file
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """
+    Очередь отложенной записи (write-behind) с групповой фиксацией.
+
+    Регистрации пользователей, отзывы и рейтинги складываются в очередь внутри
+    процесса, а фоновая задача записывает их пачками одной транзакцией: пачка
+    закрывается при достижении max_batch_size элементов или через max_delay
+    секунд после первого элемента. Еще не записанные рейтинги доступны через
+    get_pending_rating, чтобы пользователь сразу видел свою оценку.
+    """
+
+    def __init__(self, async_db: Any, max_batch_size: int = 500, max_delay: float = 0.05):
+        """
+        Инициализация очереди
+
+        :param async_db: Объект AsyncDatabase, через который выполняется запись
+        :param max_batch_size: Максимальное количество элементов в одной транзакции
+        :param max_delay: Максимальное время ожидания пачки (в секундах)
+        """
+        self.async_db = async_db
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._written: Optional[asyncio.Condition] = None
+        self._seq = 0
+        self._written_seq = 0
+        # (user_id, product_id) -> (номер в очереди, рейтинг)
+        self._pending_ratings: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        # product_id -> номер последнего рейтинга продукта в очереди
+        self._pending_products: Dict[int, int] = {}
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        """
+        Запуск фоновой задачи записи при первом обращении
+        """
+        if self._task is not None:
+            return
+        if self._closed:
+            raise RuntimeError("Очередь отложенной записи уже закрыта")
+
+        self._queue = asyncio.Queue()
+        self._written = asyncio.Condition()
+        self._task = asyncio.create_task(self._writer_loop())
+
+    def _put(self, kind: str, row: Tuple) -> int:
+        """
+        Добавление элемента в очередь
+
+        :param kind: Тип записи (users, feedback или ratings)
+        :param row: Параметры запроса
+        :return: Порядковый номер элемента
+        """
+        self._ensure_started()
+        self._seq += 1
+        self._queue.put_nowait((self._seq, kind, row))
+        return self._seq
+
+    def register_user(self, user_id: int, username: str, first_name: str, last_name: str) -> None:
+        """
+        Постановка регистрации пользователя в очередь
+        """
+        self._put('users', (user_id, username, first_name, last_name))
+
+    def add_feedback(self, user_id: int, product_id: int, text: str) -> None:
+        """
+        Постановка отзыва в очередь
+        """
+        self._put('feedback', (user_id, product_id, text))
+
+    def add_rating(self, user_id: int, product_id: int, rating: int) -> None:
+        """
+        Постановка рейтинга в очередь
+        """
+        seq = self._put('ratings', (user_id, product_id, rating))
+        self._pending_ratings[(user_id, product_id)] = (seq, rating)
+        self._pending_products[product_id] = seq
+
+    def get_pending_rating(self, user_id: int, product_id: int) -> Optional[int]:
+        """
+        Получение еще не записанного рейтинга пользователя
+
+        :return: Рейтинг из очереди или None
+        """
+        pending = self._pending_ratings.get((user_id, product_id))
+        return pending[1] if pending else None
+
+    async def wait_for_product(self, product_id: int) -> None:
+        """
+        Ожидание записи всех рейтингов продукта, поставленных в очередь до вызова
+
+        :param product_id: ID продукта
+        """
+        seq = self._pending_products.get(product_id)
+        if seq is not None:
+            await self._wait_written(seq)
+
+    async def flush(self) -> None:
+        """
+        Ожидание записи всех элементов, поставленных в очередь до вызова
+        """
+        if self._task is not None:
+            await self._wait_written(self._seq)
+
+    async def close(self) -> None:
+        """
+        Запись оставшихся элементов и остановка фоновой задачи
+        """
+        await self.flush()
+        self._closed = True
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _wait_written(self, seq: int) -> None:
+        """
+        Ожидание, пока фоновая задача запишет элемент с указанным номером
+        """
+        async with self._written:
+            await self._written.wait_for(lambda: self._written_seq >= seq)
+
+    async def _collect_batch(self) -> List[Tuple[int, str, Tuple]]:
+        """
+        Сбор пачки: ждем первый элемент, затем добираем остальные до лимита или таймаута
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            # Сначала забираем все, что уже лежит в очереди
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write(self, batch: List[Tuple[int, str, Tuple]]) -> None:
+        """
+        Запись пачки одной транзакцией; при ошибке элементы записываются по одному,
+        чтобы один некорректный элемент не терял всю пачку
+        """
+        rows: Dict[str, List[Tuple]] = {'users': [], 'feedback': [], 'ratings': []}
+        for _, kind, row in batch:
+            rows[kind].append(row)
+
+        database = self.async_db.database
+        try:
+            await self.async_db.run(database.apply_write_batch, rows['users'], rows['feedback'], rows['ratings'])
+        except Exception:
+            if len(batch) == 1:
+                logger.exception("Не удалось записать элемент %s: %s", batch[0][1], batch[0][2])
+                return
+            logger.exception("Не удалось записать пачку из %d элементов, записываем по одному", len(batch))
+        else:
+            # Оповещаем слушателей о записанных отзывах и рейтингах
+            for _, kind, row in batch:
+                if kind != 'users':
+                    self.async_db.notify_write(kind, row)
+            return
+
+        for item in batch:
+            await self._write([item])
+
+    def _forget_written(self, batch: List[Tuple[int, str, Tuple]]) -> None:
+        """
+        Удаление записанных рейтингов из списка ожидающих
+        """
+        for seq, kind, row in batch:
+            if kind != 'ratings':
+                continue
+            user_id, product_id, _ = row
+            pending = self._pending_ratings.get((user_id, product_id))
+            if pending and pending[0] == seq:
+                del self._pending_ratings[(user_id, product_id)]
+            if self._pending_products.get(product_id) == seq:
+                del self._pending_products[product_id]
+
+    async def _writer_loop(self) -> None:
+        """
+        Фоновая задача, записывающая очередь пачками
+        """
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._write(batch)
+            finally:
+                self._forget_written(batch)
+                async with self._written:
+                    self._written_seq = batch[-1][0]
+                    self._written.notify_all()
\ No newline at end of file